@@ -0,0 +1,128 @@
+"""
+    Local package index
+    ~~~~~~~~~~~~~~~~~~~
+
+    Serve a directory of wheel files as a PEP 503 "simple" package index
+    via the stdlib HTTP server. Used as PyPi stand-in by the benchmarks.
+
+    e.g.:
+        index = LocalPackageIndex(wheel_dir)
+        index.start()
+        ... PIP_INDEX_URL=index.url ...
+        index.stop()
+
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+import functools
+import html
+import http.server
+import re
+import shutil
+import socketserver
+import tempfile
+import threading
+from pathlib import Path
+
+
+def normalize_project_name(name):
+    # https://www.python.org/dev/peps/pep-0503/#normalized-names
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def build_simple_index(wheel_dir, index_dir):
+    """
+    Create the static files of a "simple" index in 'index_dir':
+        simple/index.html
+        simple/<project>/index.html
+        packages/<wheel files> (hardlinks or copies)
+
+    :return: dict with project name -> list of wheel filenames
+    """
+    packages_dir = Path(index_dir, "packages")
+    packages_dir.mkdir(parents=True)
+
+    projects = {}
+    for wheel_path in sorted(Path(wheel_dir).glob("*.whl")):
+        project = normalize_project_name(wheel_path.name.split("-", 1)[0])
+        projects.setdefault(project, []).append(wheel_path.name)
+
+        target = Path(packages_dir, wheel_path.name)
+        try:
+            target.symlink_to(wheel_path.resolve())
+        except OSError:
+            shutil.copyfile(str(wheel_path), str(target))
+
+    simple_dir = Path(index_dir, "simple")
+    simple_dir.mkdir()
+
+    links = [
+        '<a href="%s/">%s</a><br>' % (html.escape(project), html.escape(project))
+        for project in sorted(projects)
+    ]
+    with Path(simple_dir, "index.html").open("w") as f:
+        f.write("<!DOCTYPE html>\n<html><body>\n%s\n</body></html>\n" % "\n".join(links))
+
+    for project, filenames in projects.items():
+        project_dir = Path(simple_dir, project)
+        project_dir.mkdir()
+        links = [
+            '<a href="../../packages/%s">%s</a><br>' % (html.escape(filename), html.escape(filename))
+            for filename in filenames
+        ]
+        with Path(project_dir, "index.html").open("w") as f:
+            f.write("<!DOCTYPE html>\n<html><body>\n%s\n</body></html>\n" % "\n".join(links))
+
+    return projects
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass # Don't flood the benchmark output
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class LocalPackageIndex:
+    """
+    PEP 503 "simple" index for all wheels in 'wheel_dir' on a free localhost port.
+    """
+    def __init__(self, wheel_dir):
+        self.wheel_dir = Path(wheel_dir)
+        self.index_dir = None
+        self.server = None
+        self.projects = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return "http://%s:%i/simple/" % (host, port)
+
+    def start(self):
+        self.index_dir = tempfile.mkdtemp(prefix="bootstrap_env_index_")
+        self.projects = build_simple_index(self.wheel_dir, self.index_dir)
+
+        # 'directory' argument is new in Python 3.7:
+        handler = functools.partial(QuietHandler, directory=self.index_dir)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.index_dir is not None:
+            shutil.rmtree(self.index_dir)
+            self.index_dir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+
+"""
+    Boot and update benchmarks
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measure the wall clock time of:
+
+        cold_boot..............: 'boot' with empty pip and bootstrap_env caches
+        warm_boot..............: 'boot' with a filled pip cache
+        update_env_noop........: 'bootstrap_env_admin.py update_env' without any change
+        update_env_changed_pin.: 'update_env' after one pin in the requirements file changed
+        admin_startup..........: 'bootstrap_env_admin.py help'
+
+    All packages are installed from a local PEP 503 index (see: local_index.py)
+    with a fixed set of wheels, so the network and PyPi are not measured:
+
+        * bootstrap_env: built from the current source tree on every run
+        * all requirements: downloaded once into benchmarks/wheels/ (delete it to refresh)
+        * bench-probe 1.0 and 1.1: generated wheels for the 'changed pin' benchmark
+
+    usage:
+        ./benchmarks/run_benchmarks.py [--repeat N] [--output FILE] [--baseline FILE] [--threshold PERCENT]
+
+    The results are written as JSON (default: benchmarks/results/<timestamp>.json).
+    With --baseline the median of every benchmark is compared with a older result file
+    and the exit code is 1, if one benchmark is slower than the threshold.
+
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+# Benchmarks
+from local_index import LocalPackageIndex
+
+BENCHMARKS_PATH = Path(__file__).resolve().parent
+ROOT_PATH = BENCHMARKS_PATH.parent
+WHEELS_PATH = Path(BENCHMARKS_PATH, "wheels")
+RESULTS_PATH = Path(BENCHMARKS_PATH, "results")
+
+BOOT_FILE = Path(ROOT_PATH, "bootstrap_env", "boot_bootstrap_env.py")
+REQUIREMENTS_FILE = Path(ROOT_PATH, "bootstrap_env", "requirements", "normal_installation.txt")
+
+PROBE_NAME = "bench_probe"
+PROBE_VERSIONS = ("1.0", "1.1")
+
+BENCHMARK_NAMES = (
+    "cold_boot", "warm_boot", "update_env_noop", "update_env_changed_pin", "admin_startup"
+)
+
+
+def create_probe_wheel(directory, version):
+    """
+    Create a minimal pure python wheel (with a valid RECORD) to change a pin.
+    """
+    dist_info = "%s-%s.dist-info" % (PROBE_NAME, version)
+    files = [
+        ("%s/__init__.py" % PROBE_NAME, "__version__ = %r\n" % version),
+        ("%s/METADATA" % dist_info, "Metadata-Version: 2.1\nName: bench-probe\nVersion: %s\n" % version),
+        ("%s/WHEEL" % dist_info, "Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n"),
+    ]
+    wheel_path = Path(directory, "%s-%s-py3-none-any.whl" % (PROBE_NAME, version))
+    with zipfile.ZipFile(str(wheel_path), "w") as wheel:
+        records = []
+        for filename, content in files:
+            content = content.encode("utf-8")
+            wheel.writestr(filename, content)
+            digest = base64.urlsafe_b64encode(hashlib.sha256(content).digest()).rstrip(b"=").decode("ascii")
+            records.append("%s,sha256=%s,%i\n" % (filename, digest, len(content)))
+        records.append("%s/RECORD,,\n" % dist_info)
+        wheel.writestr("%s/RECORD" % dist_info, "".join(records))
+    return wheel_path
+
+
+def get_wheel_set_hash(wheel_dir):
+    """
+    Hash of the fixed wheel set: Results are only comparable with the same wheels.
+    """
+    hash_obj = hashlib.sha256()
+    for wheel_path in sorted(wheel_dir.glob("*.whl")):
+        hash_obj.update(wheel_path.name.encode("utf-8"))
+        with wheel_path.open("rb") as f:
+            hash_obj.update(hashlib.sha256(f.read()).digest())
+    return hash_obj.hexdigest()
+
+
+def check_call(args, log_path, **kwargs):
+    """
+    Run a subprocess and write the output into 'log_path'. Exit on errors.
+    """
+    with log_path.open("a") as log:
+        log.write("\n$ %s\n" % " ".join(str(arg) for arg in args))
+        log.flush()
+        return_code = subprocess.call(
+            [str(arg) for arg in args], stdout=log, stderr=subprocess.STDOUT, **kwargs
+        )
+    if return_code:
+        print("ERROR: %r exit code: %i (see: %s)" % (" ".join(str(arg) for arg in args), return_code, log_path))
+        with log_path.open("r") as f:
+            print("".join(f.readlines()[-30:]))
+        sys.exit(return_code)
+
+
+def fill_wheel_cache(log_path):
+    if WHEELS_PATH.is_dir() and list(WHEELS_PATH.glob("*.whl")):
+        return
+
+    print("Download requirement wheels into: %s" % WHEELS_PATH)
+    WHEELS_PATH.mkdir(exist_ok=True)
+    check_call([
+        sys.executable, "-m", "pip", "download",
+        "--only-binary", ":all:", "--dest", WHEELS_PATH,
+        "pip", "--requirement", REQUIREMENTS_FILE
+    ], log_path)
+
+
+class BenchmarkRunner:
+    def __init__(self, work_path, repeat):
+        self.work_path = work_path
+        self.repeat = repeat
+        self.log_path = Path(work_path, "benchmark.log")
+
+        self.wheel_dir = Path(work_path, "wheels")
+        self.wheel_dir.mkdir()
+
+        self.results = {}
+
+    def prepare_wheels(self):
+        fill_wheel_cache(self.log_path)
+        for wheel_path in WHEELS_PATH.glob("*.whl"):
+            os.link(str(wheel_path), str(Path(self.wheel_dir, wheel_path.name)))
+
+        for version in PROBE_VERSIONS:
+            create_probe_wheel(self.wheel_dir, version)
+
+        self.wheel_set_hash = get_wheel_set_hash(self.wheel_dir)
+
+        print("Build bootstrap_env wheel from: %s" % ROOT_PATH)
+        check_call([
+            sys.executable, "-m", "pip", "wheel", "--no-deps", "--wheel-dir", self.wheel_dir, ROOT_PATH
+        ], self.log_path)
+
+    def get_env(self, index, cache_name, virtualenv=None):
+        env = dict(os.environ)
+        env.pop("VIRTUAL_ENV", None)
+        env.pop("PYTHONPATH", None)
+        env.update({
+            "PIP_INDEX_URL": index.url,
+            "PIP_DISABLE_PIP_VERSION_CHECK": "1",
+            "PIP_CACHE_DIR": str(Path(self.work_path, cache_name, "pip")),
+            "BOOTSTRAP_ENV_CACHE_DIR": str(Path(self.work_path, cache_name, "bootstrap_env")),
+        })
+        if virtualenv is not None:
+            bin_path = Path(virtualenv, "bin")
+            env["VIRTUAL_ENV"] = str(virtualenv)
+            env["PATH"] = "%s%s%s" % (bin_path, os.pathsep, env["PATH"])
+        return env
+
+    def measure(self, name, func, setup=None):
+        """
+        Call 'func' self.repeat times and store the wall clock times.
+        :param setup: called before every run (not measured)
+        """
+        timings = []
+        for number in range(self.repeat):
+            args = setup(number) if setup is not None else ()
+            start = time.perf_counter()
+            func(*args)
+            timings.append(time.perf_counter() - start)
+
+        self.results[name] = {
+            "runs": timings,
+            "median": statistics.median(timings),
+            "min": min(timings),
+        }
+        print("%-25s median: %.3f sec. (min: %.3f sec.)" % (name, self.results[name]["median"], min(timings)))
+
+    def boot(self, index, destination, cache_name):
+        check_call(
+            [sys.executable, BOOT_FILE, "boot", destination],
+            self.log_path, env=self.get_env(index, cache_name), cwd=str(self.work_path)
+        )
+
+    def admin(self, index, virtualenv, *args):
+        admin_path = Path(virtualenv, "bin", "bootstrap_env_admin.py")
+        check_call(
+            [Path(virtualenv, "bin", "python"), admin_path] + list(args),
+            self.log_path, env=self.get_env(index, "warm", virtualenv=virtualenv)
+        )
+
+    def set_probe_pin(self, virtualenv, version):
+        requirements_file = next(
+            Path(virtualenv, "lib").glob("python*/site-packages/bootstrap_env/requirements/normal_installation.txt")
+        )
+        with requirements_file.open("r") as f:
+            lines = [line for line in f if not line.startswith("bench-probe")]
+        lines.append("bench-probe==%s\n" % version)
+        with requirements_file.open("w") as f:
+            f.writelines(lines)
+
+    def run(self):
+        self.prepare_wheels()
+
+        with LocalPackageIndex(self.wheel_dir) as index:
+            print("Local package index: %s (%i projects)" % (index.url, len(index.projects)))
+
+            def cold_setup(number):
+                return (Path(self.work_path, "cold_%i" % number), "cold_%i" % number)
+
+            self.measure("cold_boot", lambda destination, cache_name: self.boot(index, destination, cache_name),
+                         setup=cold_setup)
+
+            # Fill the pip cache (not measured):
+            virtualenv = Path(self.work_path, "env")
+            self.boot(index, virtualenv, "warm")
+
+            def warm_setup(number):
+                return (Path(self.work_path, "warm_%i" % number),)
+
+            self.measure("warm_boot", lambda destination: self.boot(index, destination, "warm"), setup=warm_setup)
+
+            # First 'update_env' stores all fingerprints (not measured):
+            self.admin(index, virtualenv, "update_env")
+            self.measure("update_env_noop", lambda: self.admin(index, virtualenv, "update_env"))
+
+            def pin_setup(number):
+                # Alternate between the two probe versions, the first run starts with the new pin:
+                self.set_probe_pin(virtualenv, PROBE_VERSIONS[number % 2])
+                self.admin(index, virtualenv, "update_env")
+                self.set_probe_pin(virtualenv, PROBE_VERSIONS[(number + 1) % 2])
+                return ()
+
+            self.measure(
+                "update_env_changed_pin", lambda: self.admin(index, virtualenv, "update_env"), setup=pin_setup
+            )
+
+            self.measure("admin_startup", lambda: self.admin(index, virtualenv, "help"))
+
+        return {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version,
+            "platform": platform.platform(),
+            "repeat": self.repeat,
+            "wheel_set_hash": self.wheel_set_hash,
+            "results": self.results,
+        }
+
+
+def compare_with_baseline(result, baseline, threshold):
+    """
+    Print a table with the changes of all medians.
+    :return: list of benchmark names, that are slower than 'threshold' percent
+    """
+    if result["wheel_set_hash"] != baseline.get("wheel_set_hash"):
+        print("WARNING: Baseline was made with a other wheel set!")
+
+    print("\n%-25s %10s %10s %8s" % ("benchmark", "baseline", "current", "change"))
+    regressions = []
+    for name in BENCHMARK_NAMES:
+        if name not in baseline["results"]:
+            print("%-25s %10s %9.3fs" % (name, "-", result["results"][name]["median"]))
+            continue
+
+        old = baseline["results"][name]["median"]
+        new = result["results"][name]["median"]
+        change = (new - old) / old * 100
+        marker = ""
+        if change > threshold:
+            marker = " REGRESSION"
+            regressions.append(name)
+        print("%-25s %9.3fs %9.3fs %+7.1f%%%s" % (name, old, new, change, marker))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="bootstrap_env boot and update benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs per benchmark (default: 3)")
+    parser.add_argument("--output", help="JSON result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="compare with this JSON result file")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0,
+        help="a median slower than this percent is a regression (default: 10)"
+    )
+    parser.add_argument("--keep", action="store_true", help="don't delete the temp directory with all virtualenvs")
+    options = parser.parse_args(argv)
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline, "r") as f:
+            baseline = json.load(f)
+
+    work_path = Path(tempfile.mkdtemp(prefix="bootstrap_env_benchmarks_"))
+    print("Work directory: %s" % work_path)
+    try:
+        result = BenchmarkRunner(work_path, repeat=options.repeat).run()
+    finally:
+        if not options.keep:
+            shutil.rmtree(str(work_path))
+
+    if options.output:
+        output_path = Path(options.output)
+    else:
+        RESULTS_PATH.mkdir(exist_ok=True)
+        output_path = Path(RESULTS_PATH, "%s.json" % time.strftime("%Y%m%d-%H%M%S"))
+
+    with output_path.open("w") as f:
+        json.dump(result, f, indent=4, sort_keys=True)
+    print("\nResults written to: %s" % output_path)
+
+    if baseline is not None:
+        regressions = compare_with_baseline(result, baseline, options.threshold)
+        if regressions:
+            print("\nERROR: %i regression(s): %s" % (len(regressions), ", ".join(regressions)))
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+"""
+    Admin daemon
+    ~~~~~~~~~~~~
+
+    Opt-in: Keep a warm admin shell process (all modules imported and PathHelper
+    initialized) and run commands send via a unix domain socket.
+
+    start the daemon (in a activated virtualenv):
+        $ bootstrap_env_admin.py --daemon [--idle-timeout SEC]
+
+    use the client (starts the daemon on demand):
+        $ bootstrap_env_admin_client.py update_env
+        $ bootstrap_env_admin_client.py "pip_freeze; update_env"
+
+    Every request runs in a forked child process of the daemon, so every
+    command gets a fresh copy of the warm process and many clients can be
+    served at the same time. The output is streamed back to the client.
+    The daemon exits after the idle timeout and re-exec itself if the
+    installed packages or the bootstrap_env version changed.
+
+    Only stdlib imports here: The client should start fast!
+
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import selectors
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+# Set in the environment of every command that runs in the daemon:
+DAEMON_ENV_NAME = "BOOTSTRAP_ENV_ADMIN_DAEMON"
+
+DEFAULT_IDLE_TIMEOUT = 15 * 60 # sec.
+CLIENT_START_TIMEOUT = 30 # sec. to wait for a new started daemon
+
+# Every message is a frame: <kind: 1 byte><length: 4 bytes><data>
+FRAME_HEADER = struct.Struct("!cI")
+REQUEST = b"r" # JSON: argv, cwd, env and stdin of the client
+STDOUT = b"1"
+STDERR = b"2"
+EXIT = b"x" # exit code of the command as ascii
+
+
+def get_socket_path(prefix=None):
+    """
+    Returns the Path of the socket for the given virtualenv in a private directory, e.g.:
+        /run/user/1000/bootstrap_env/admin_<hash of the virtualenv path>.sock
+    """
+    prefix = prefix or os.environ.get("VIRTUAL_ENV") or sys.prefix
+    digest = hashlib.sha256(os.path.realpath(prefix).encode("utf-8")).hexdigest()[:16]
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    socket_dir = Path(runtime_dir, "bootstrap_env-%i" % os.getuid())
+    socket_dir.mkdir(mode=0o700, exist_ok=True)
+    if socket_dir.stat().st_uid != os.getuid():
+        raise PermissionError("Socket directory %s is not owned by us!" % socket_dir)
+    return Path(socket_dir, "admin_%s.sock" % digest)
+
+
+def send_frame(sock, kind, data):
+    sock.sendall(FRAME_HEADER.pack(kind, len(data)) + data)
+
+
+def _recv_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def recv_frame(sock):
+    """
+    :return: (kind, data) or (None, None) if the connection is closed
+    """
+    header = _recv_exactly(sock, FRAME_HEADER.size)
+    if header is None:
+        return None, None
+    kind, size = FRAME_HEADER.unpack(header)
+    data = _recv_exactly(sock, size) if size else b""
+    if data is None:
+        return None, None
+    return kind, data
+
+
+def connect(socket_path):
+    """
+    :return: connected socket or None if no daemon is listening
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return sock
+
+
+def get_default_fingerprint():
+    """
+    The installed distributions (incl. versions) and the bootstrap_env version file.
+    """
+    # Bootstrap-Env
+    import bootstrap_env
+    from bootstrap_env.utils.fingerprint_utils import get_installed_distributions, hash_file
+
+    return (
+        get_installed_distributions(),
+        hash_file(Path(Path(bootstrap_env.__file__).parent, "version.py")),
+    )
+
+
+class AdminDaemon:
+    """
+    Listen on the unix socket and run every request in a forked child process.
+    """
+    def __init__(self, run_shell, socket_path=None, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 poll_interval=5, get_fingerprint=get_default_fingerprint):
+        """
+        :param run_shell: callable that runs the shell with sys.argv (in the child process)
+        :param idle_timeout: exit after this seconds without a request
+        :param poll_interval: check every x seconds for changed packages
+        :param get_fingerprint: callable, the daemon re-exec itself if the return value changed
+        """
+        self.run_shell = run_shell
+        self.socket_path = Path(socket_path or get_socket_path())
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.get_fingerprint = get_fingerprint
+
+        self.argv = list(sys.argv) # for re-exec
+        self.server = None
+        self.handler_pids = set() # forked processes that serve a connection
+
+    def bind(self):
+        """
+        :return: False if another daemon is listening on the socket
+        """
+        sock = connect(self.socket_path)
+        if sock is not None:
+            sock.close()
+            return False
+
+        try:
+            self.socket_path.unlink() # stale socket file of a killed daemon
+        except FileNotFoundError:
+            pass
+
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077) # Only we should be able to connect
+        try:
+            self.server.bind(str(self.socket_path))
+        finally:
+            os.umask(old_umask)
+        self.server.listen(16)
+        return True
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def serve_forever(self):
+        if not self.bind():
+            print("Admin daemon is already running on: %s" % self.socket_path)
+            return
+
+        print("Admin daemon listen on: %s (idle timeout: %s sec.)" % (self.socket_path, self.idle_timeout))
+        sys.stdout.flush()
+
+        fingerprint = self.get_fingerprint()
+        selector = selectors.DefaultSelector()
+        selector.register(self.server, selectors.EVENT_READ)
+        deadline = time.monotonic() + self.idle_timeout
+        try:
+            while True:
+                if selector.select(timeout=min(self.poll_interval, self.idle_timeout)):
+                    connection, _ = self.server.accept()
+                    with connection:
+                        self.start_handler(connection)
+
+                self.reap_handlers()
+                if self.handler_pids:
+                    # A running command is not idle and must not be killed by a re-exec
+                    deadline = time.monotonic() + self.idle_timeout
+                    continue
+
+                if time.monotonic() >= deadline:
+                    print("Idle timeout: exit admin daemon.")
+                    return
+
+                if self.get_fingerprint() != fingerprint:
+                    # e.g.: 'update_env' installed a new version -> restart with the new code
+                    print("Installed packages changed: restart admin daemon.")
+                    sys.stdout.flush()
+                    selector.close()
+                    self.close()
+                    os.execv(sys.executable, [sys.executable] + self.argv)
+        finally:
+            selector.close()
+            self.close()
+
+    def start_handler(self, connection):
+        """
+        Serve the connection in a forked process, so the accept loop is never blocked.
+        """
+        pid = os.fork()
+        if pid != 0:
+            self.handler_pids.add(pid)
+            return
+
+        try:
+            self.server.close() # only the fd: the socket file is still used by the daemon
+            self.handle(connection)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(0)
+
+    def reap_handlers(self):
+        """
+        Collect the exit status of all finished handler processes without blocking.
+        """
+        for pid in list(self.handler_pids):
+            try:
+                done_pid, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done_pid = pid
+            if done_pid:
+                self.handler_pids.discard(pid)
+
+    def handle(self, connection):
+        kind, data = recv_frame(connection)
+        if kind != REQUEST:
+            return
+        request = json.loads(data.decode("utf-8"))
+
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(stdout_read)
+            os.close(stderr_read)
+            self._run_child(request, stdout_write, stderr_write) # never returns
+        os.close(stdout_write)
+        os.close(stderr_write)
+
+        kinds = {stdout_read: STDOUT, stderr_read: STDERR}
+        selector = selectors.DefaultSelector()
+        for fd in kinds:
+            selector.register(fd, selectors.EVENT_READ)
+
+        client_connected = True
+        while kinds:
+            for key, _ in selector.select():
+                chunk = os.read(key.fd, 64 * 1024)
+                if not chunk:
+                    selector.unregister(key.fd)
+                    os.close(key.fd)
+                    del kinds[key.fd]
+                    continue
+                if client_connected:
+                    try:
+                        send_frame(connection, kinds[key.fd], chunk)
+                    except OSError:
+                        # Client is gone (e.g.: CTRL-C) -> stop the command
+                        client_connected = False
+                        os.kill(pid, signal.SIGTERM)
+        selector.close()
+
+        _, status = os.waitpid(pid, 0)
+        if os.WIFSIGNALED(status):
+            exit_code = 128 + os.WTERMSIG(status)
+        else:
+            exit_code = os.WEXITSTATUS(status)
+
+        if client_connected:
+            try:
+                send_frame(connection, EXIT, str(exit_code).encode("ascii"))
+            except OSError:
+                pass
+
+    def _run_child(self, request, stdout_fd, stderr_fd):
+        """
+        Run the command of the client in the forked child process.
+        """
+        # Bootstrap-Env
+        from bootstrap_env.boot_bootstrap_env import tracer
+
+        exit_code = 1
+        try:
+            os.dup2(stdout_fd, 1)
+            os.dup2(stderr_fd, 2)
+            os.close(stdout_fd)
+            os.close(stderr_fd)
+            null_fd = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(null_fd, 0)
+            os.close(null_fd)
+            sys.stdin = io.StringIO(request.get("stdin") or "")
+
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+            os.environ[DAEMON_ENV_NAME] = "1"
+            sys.argv = [self.argv[0]] + request["argv"]
+
+            # e.g.: the daemon itself was started with '--trace'
+            tracer.reset()
+
+            exit_code = 0
+            try:
+                self.run_shell()
+            except SystemExit as err:
+                if err.code is None or isinstance(err.code, int):
+                    exit_code = err.code or 0
+                else:
+                    print(err.code, file=sys.stderr)
+                    exit_code = 1
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            try:
+                # os._exit() skips the atexit handler of the tracer
+                tracer.save()
+            except BaseException:
+                traceback.print_exc()
+                exit_code = exit_code or 1
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(exit_code)
+
+
+def start_daemon(admin_path, socket_path):
+    """
+    Start the daemon in background and wait until it's listening.
+
+    :return: connected socket or None on timeout
+    """
+    subprocess.Popen(
+        [sys.executable, str(admin_path), "--daemon"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True, # Don't stop the daemon with the client on CTRL-C
+        close_fds=True,
+    )
+    deadline = time.monotonic() + CLIENT_START_TIMEOUT
+    while time.monotonic() < deadline:
+        sock = connect(socket_path)
+        if sock is not None:
+            return sock
+        time.sleep(0.05)
+
+
+def run_client(argv, admin_path, socket_path=None):
+    """
+    Send the command to the daemon and stream the output.
+
+    :param argv: commandline arguments, e.g.: ["update_env", "--force"]
+    :param admin_path: Path of the admin script, used to start the daemon
+    :return: exit code of the command
+    """
+    socket_path = socket_path or get_socket_path()
+    sock = connect(socket_path)
+    if sock is None:
+        sock = start_daemon(admin_path, socket_path)
+        if sock is None:
+            print("ERROR: Admin daemon not started after %s sec.!" % CLIENT_START_TIMEOUT, file=sys.stderr)
+            return 1
+
+    stdin = None
+    if "--batch" in argv and "-" in argv: # commands from stdin
+        stdin = sys.stdin.read()
+
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "stdin": stdin,
+    }
+    outputs = {STDOUT: sys.stdout.buffer, STDERR: sys.stderr.buffer}
+    with sock:
+        send_frame(sock, REQUEST, json.dumps(request).encode("utf-8"))
+        while True:
+            kind, data = recv_frame(sock)
+            if kind in outputs:
+                outputs[kind].write(data)
+                outputs[kind].flush()
+            elif kind == EXIT:
+                return int(data.decode("ascii"))
+            else:
+                print("ERROR: Connection to admin daemon lost!", file=sys.stderr)
+                return 1
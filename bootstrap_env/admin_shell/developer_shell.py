@@ -13,24 +13,38 @@
     :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
 """
 
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
 import re
+import shlex
 import subprocess
+import sys
+import time
 from pathlib import Path
 
 # Bootstrap-Env
 from bootstrap_env.admin_shell.normal_shell import AdminShell
-from bootstrap_env.boot_bootstrap_env import VerboseSubprocess
-from bootstrap_env.utils.cookiecutter_utils import verbose_cookiecutter
+from bootstrap_env.boot_bootstrap_env import (
+    WHEELHOUSE_INDEX_FILENAME, ConcurrentSubprocesses, VerboseSubprocess, get_cache_path
+)
+from bootstrap_env.utils.fingerprint_utils import (
+    StepFingerprints, get_requirements_hashes, get_tree_hashes, hash_file
+)
+from bootstrap_env.utils.git_utils import UnsupportedGitConfig, read_git_remotes, set_git_remote_urls
 from bootstrap_env.utils.import_utils import LazyImportError
+from bootstrap_env.utils.outdated_utils import OutdatedChecker, iter_pinned_requirements
+from bootstrap_env.utils.template_utils import get_boot_file_renderer
+from bootstrap_env.utils.zipapp_utils import create_boot_zipapp
 from bootstrap_env.version import __version__ as bootstrap_env_version
 
 # External libs:
 try:
-    from cookiecutter.main import cookiecutter
     from packaging.version import parse
 except ImportError as err:
     # Re-Raise ImportError on first usage
-    cookiecutter = LazyImportError(err)
     parse = LazyImportError(err)
 
 
@@ -43,18 +57,65 @@ class DeveloperAdminShell(AdminShell):
     Expand AdminShell with some "developer" commands.
     This is only useable in "developer" mode (Installed as editable from source).
     """
+    # Fingerprints of the last 'upgrade_requirements' run, stored in the virtualenv:
+    UPGRADE_REQUIREMENTS_FINGERPRINTS = "upgrade_requirements_fingerprints.json"
+
+    # The package index is a input of pip-compile --upgrade: compile again after this period
+    INDEX_SNAPSHOT_PERIOD = 24 * 60 * 60 # sec.
+
+    # Fingerprint of the last 'update_own_boot_file' run, stored next to the boot file:
+    BOOT_FILE_FINGERPRINTS = ".boot_file_fingerprints.json"
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         if self.path_helper.normal_mode:
             raise RuntimeError("ERROR: Only available in 'developer' mode!")
 
+    def _parse_upgrade_requirements_args(self, arg):
+        parser = argparse.ArgumentParser(prog="upgrade_requirements", add_help=False)
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Compile all files, even if their inputs are unchanged since the last run."
+        )
+        return parser.parse_args(shlex.split(arg or ""))
+
+    def _requirements_inputs(self, requirement_in, requirement_out):
+        """
+        Returns a callable for StepFingerprints with all inputs of one pip-compile run.
+        """
+        def inputs():
+            return {
+                "requirements": get_requirements_hashes(requirement_in),
+                "output": hash_file(requirement_out),
+                # The package index changes over time -> compile again after every period:
+                "index_snapshot": int(time.time() // self.INDEX_SNAPSHOT_PERIOD),
+                "index_url": os.environ.get("PIP_INDEX_URL"),
+                "extra_index_url": os.environ.get("PIP_EXTRA_INDEX_URL"),
+            }
+        return inputs
+
     def do_upgrade_requirements(self, arg):
         """
-        Upgrade requirements files with pip-compile and piprot.
+        Upgrade requirements files with pip-compile and check for outdated packages.
+
+        usage:
+            upgrade_requirements [--force]
 
         1. Convert via 'pip-compile' *.in requirements files to *.txt
-        2. Append 'piprot' informations to *.txt requirements.
+        2. Append a list of outdated packages to *.txt requirements.
+           (All packages are fetched concurrently from $PIP_INDEX_URL or PyPi,
+           the index responses are cached for one hour)
+
+        All *.in files are compiled concurrently (all pip-compile
+        processes use the same pip cache).
+
+        A fingerprint of the inputs of every file is stored after a successful run:
+        The *.in file (incl. -r/-c includes), the *.txt output and the
+        package index snapshot (changed once a day). Files with unchanged
+        inputs are skipped.
+
+        --force: Compile all files.
         """
         if self.package_name == "bootstrap_env":
             print("ERROR: command not allowed for 'bootstrap_env' !\n")
@@ -64,55 +125,321 @@ class DeveloperAdminShell(AdminShell):
             )
             return
 
-        requirements_path = self.path_helper.req_filepath
+        options = self._parse_upgrade_requirements_args(arg)
+
+        requirements_path = self.path_helper.req_path
 
         print("compile *.in files in %s" % requirements_path)
-        requirement_in_files = tuple(requirements_path.glob("*.in"))
+        requirement_in_files = sorted(
+            path for path in requirements_path.glob("*.in")
+            if not path.name.startswith("basic_")
+        )
         if not requirement_in_files:
             print("ERROR: No *.in files found!")
-        else:
-            print("%i *.in files found" % len(requirement_in_files))
+            return
+        print("%i *.in files found" % len(requirement_in_files))
 
+        fingerprints = StepFingerprints(
+            Path(sys.prefix, self.UPGRADE_REQUIREMENTS_FINGERPRINTS), force=options.force
+        )
 
+        runner = ConcurrentSubprocesses()
+        compiled = []
         for requirement_in in requirement_in_files:
-            requirement_in = Path(requirement_in).name
-
-            if requirement_in.startswith("basic_"):
+            requirement_out = requirement_in.with_suffix(".txt")
+            inputs = self._requirements_inputs(requirement_in, requirement_out)
+            if fingerprints.is_unchanged(requirement_in.name, inputs):
+                print("Skip %r: inputs unchanged (use --force to compile it)" % requirement_in.name)
                 continue
 
-            requirement_out = requirement_in.replace(".in", ".txt")
-
-            self.stdout.write("_"*79 + "\n")
-
             # We run pip-compile in ./requirements/ and add only the filenames as arguments
             # So pip-compile add no path to comments ;)
+            #
+            # pip's http/wheel cache is shared by all processes, but every file
+            # gets its own pip-tools dependency cache: it's not safe for concurrent writes.
+            runner.add(
+                "pip-compile", "--verbose", "--upgrade",
+                "--cache-dir", str(get_cache_path("pip-tools", requirement_in.stem)),
+                "-o", requirement_out.name, requirement_in.name,
+                name=requirement_in.name, cwd=str(requirements_path)
+            )
+            compiled.append((requirement_in, requirement_out, inputs))
 
-            return_code = VerboseSubprocess(
-                "pip-compile", "--verbose", "--upgrade", "-o", requirement_out, requirement_in,
-                cwd=requirements_path
-            ).verbose_call(check=True)
-
-            if not requirement_in.startswith("test_"):
-                req_out = Path(requirements_path, requirement_out)
-                with req_out.open("r") as f:
-                    requirement_out_content = f.read()
-
+        results = runner.run()
+        if results:
+            self.stdout.write("_"*79 + "\n")
+            runner.print_summary(results)
+
+        failed = False
+        succeeded = []
+        for (requirement_in, requirement_out, inputs), result in zip(compiled, results):
+            if result.exit_code:
+                failed = True
+            else:
+                pinned = dict(iter_pinned_requirements(requirement_out))
+                succeeded.append((requirement_in, requirement_out, inputs, pinned))
+
+        checker = OutdatedChecker()
+        if succeeded:
             self.stdout.write("_"*79 + "\n")
+            print("Check for outdated packages on: %s" % checker.index_url)
+            # Fetch all projects of all files at once, the checks below use the cache:
+            checker.get_latest_versions([name for *_, pinned in succeeded for name in pinned])
+
+        for requirement_in, requirement_out, inputs, pinned in succeeded:
             output = [
-                "\n#\n# list of out of date packages made with piprot:\n#\n"
+                "\n#\n# list of out of date packages:\n#\n"
             ]
-
-            s = VerboseSubprocess("piprot", "--outdated", requirement_out, cwd=requirements_path)
-            for line in s.iter_output(check=True):
+            for name, version, latest in checker.check(pinned):
+                line = "%s (%s) is out of date. Latest is %s" % (name, version, latest)
                 print(line, flush=True)
-                output.append("# %s" % line)
-
-            self.stdout.write("\nUpdate file %r\n" % requirement_out)
-            filepath = Path(requirements_path, requirement_out).resolve()
-            assert filepath.is_file(), "File not exists: %r" % filepath
-            with open(filepath, "a") as f:
+                output.append("# %s\n" % line)
+            for name, version in sorted(pinned.items()):
+                if name in checker.errors:
+                    line = "%s (%s): Latest is unknown (%s)" % (name, version, checker.errors[name])
+                    print(line, flush=True)
+                    output.append("# %s\n" % line)
+
+            self.stdout.write("\nUpdate file %r\n" % requirement_out.name)
+            with requirement_out.open("a") as f:
                 f.writelines(output)
 
+            fingerprints.succeeded(requirement_in.name, inputs)
+
+        fingerprints.save()
+
+        if failed:
+            print("ERROR: pip-compile failed!")
+            sys.exit(1)
+
+    def do_lock_requirements(self, arg):
+        """
+        Create a hash-pinned lock file from 'normal_installation.in' with pip-compile.
+
+        usage:
+            lock_requirements [--upgrade]
+
+        The lock file 'requirements/normal_installation.lock' contains all
+        resolved packages with the sha256 hashes of every artifact.
+        'update_own_boot_file' embeds it into the boot file.
+
+        'boot' and 'update_env' in normal mode will install the packages
+        with '--require-hashes --no-deps' (without dependency resolution).
+
+        --upgrade: Try to upgrade all packages to the latest versions.
+        """
+        if self.package_name == "bootstrap_env":
+            print("ERROR: command not allowed for 'bootstrap_env' !\n")
+            print(
+                "Because Bootstrap-env should be used as a tool in other projects"
+                " and the projects himself should pin requirements ;) "
+            )
+            return
+
+        requirements_path = self.path_helper.req_path
+        requirement_in = "normal_installation.in"
+        if not Path(requirements_path, requirement_in).is_file():
+            print("ERROR: '%s' not found in: %s" % (requirement_in, requirements_path))
+            return
+
+        lock_filepath = self.path_helper.lock_filepath
+
+        pip_compile_args = ["--generate-hashes"]
+        if arg.strip() == "--upgrade":
+            pip_compile_args.append("--upgrade")
+        elif arg.strip():
+            print("ERROR: Unknown argument: %r" % arg)
+            return
+
+        # We run pip-compile in ./requirements/ and add only the filenames as arguments
+        # So pip-compile add no path to comments ;)
+        VerboseSubprocess(
+            "pip-compile", "--verbose", *pip_compile_args, "-o", lock_filepath.name, requirement_in,
+            cwd=str(requirements_path)
+        ).verbose_call(check=True)
+
+        self.stdout.write("\nLock file created: %s\n" % lock_filepath)
+        self.stdout.write("Call 'update_own_boot_file' to embed it into the boot file.\n")
+
+    def complete_export_wheelhouse(self, text, line, begidx, endidx):
+        return self._complete_path(text, line, begidx, endidx)
+
+    def do_export_wheelhouse(self, arg):
+        """
+        Download/build wheels of all requirements into a local wheelhouse directory.
+
+        usage:
+            export_wheelhouse [path]
+
+        Default path is: <virtualenv>/wheelhouse/
+
+        Collect wheels for pip, the project itself and all packages from:
+            * requirements/normal_installation.txt
+            * requirements/developer_installation.txt
+
+        and create a 'wheelhouse_index.json' index file.
+        Use the wheelhouse to boot/update without PyPi access, e.g.:
+
+            $ boot_foobar.py boot --wheelhouse /path/to/wheelhouse ~/foobar-env
+            $ foobar_admin.py update_env --wheelhouse /path/to/wheelhouse
+        """
+        if arg:
+            wheelhouse = Path(arg).expanduser().resolve()
+        else:
+            wheelhouse = Path(sys.prefix, "wheelhouse")
+        wheelhouse.mkdir(parents=True, exist_ok=True)
+        print("Export wheels into: '%s'" % wheelhouse)
+
+        pip_command = self.get_pip_command()
+        requirement_files = [
+            Path(self.path_helper.req_path, filename)
+            for filename in sorted(self.path_helper.REQUIREMENTS.values())
+        ]
+
+        # pip itself, used on boot to upgrade the pip installed via ensurepip
+        VerboseSubprocess(
+            *pip_command, "wheel", "--wheel-dir", str(wheelhouse), "pip",
+        ).verbose_call(check=True)
+
+        # The project itself (without dependencies, they are in the requirements files)
+        VerboseSubprocess(
+            *pip_command, "wheel", "--wheel-dir", str(wheelhouse), "--no-deps", str(self.path_helper.pkg_path),
+        ).verbose_call(check=True)
+
+        requirement_args = []
+        for requirement_file in requirement_files:
+            requirement_args += ["--requirement", requirement_file.name]
+
+        # Run in ./requirements/ so that "-r foo.txt" includes are found:
+        VerboseSubprocess(
+            *pip_command, "wheel", "--wheel-dir", str(wheelhouse), *requirement_args,
+            cwd=str(self.path_helper.req_path),
+            timeout=10*60
+        ).verbose_call(check=True)
+
+        index = self._create_wheelhouse_index(wheelhouse, requirement_files)
+        print("\n%i wheels exported to: '%s'" % (len(index["wheels"]), wheelhouse))
+
+    def _create_wheelhouse_index(self, wheelhouse, requirement_files):
+        """
+        Write the wheelhouse index file with all wheel files and their sha256 hashes.
+        """
+        wheels = []
+        for wheel_path in sorted(wheelhouse.glob("*.whl")):
+            with wheel_path.open("rb") as f:
+                sha256 = hashlib.sha256(f.read()).hexdigest()
+            wheels.append({
+                "filename": wheel_path.name,
+                "sha256": sha256,
+                "size": wheel_path.stat().st_size,
+            })
+
+        index = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "package_name": self.path_helper.egg_name,
+            "requirement_files": [path.name for path in requirement_files],
+            "wheels": wheels,
+        }
+        index_path = Path(wheelhouse, WHEELHOUSE_INDEX_FILENAME)
+        with index_path.open("w") as f:
+            json.dump(index, f, indent=4, sort_keys=True)
+        print("Index file created: '%s'" % index_path)
+        return index
+
+    def complete_export_zipapp(self, text, line, begidx, endidx):
+        return self._complete_path(text, line, begidx, endidx)
+
+    def do_export_zipapp(self, arg):
+        """
+        Create a '.pyz' zipapp boot file with all wheels embedded.
+
+        usage:
+            export_zipapp [--wheelhouse DIR] [--without-pip] [path]
+
+        Default path is: <virtualenv>/<boot file name>.pyz
+
+        The zipapp contains the boot file and all wheels from the wheelhouse
+        (Default: <virtualenv>/wheelhouse/ will be created via 'export_wheelhouse', if needed)
+        'boot' from the zipapp installs all packages from the embedded wheels
+        without PyPi access. One file to copy to another host, e.g.:
+
+            $ python3 boot_foobar.pyz boot ~/foobar-env
+
+        --without-pip: Don't embed the pip wheel: Use the pip bundled with the Python.
+        """
+        parser = argparse.ArgumentParser(prog="export_zipapp", add_help=False)
+        parser.add_argument("path", nargs="?")
+        parser.add_argument("--wheelhouse", metavar="DIR")
+        parser.add_argument("--without-pip", action="store_true")
+        try:
+            options = parser.parse_args(shlex.split(arg or ""))
+        except SystemExit:
+            print("ERROR: Wrong arguments!")
+            return
+
+        if options.path:
+            output_path = Path(options.path).expanduser().resolve()
+        else:
+            output_path = Path(sys.prefix, "%s.pyz" % self.path_helper.boot_path.stem)
+
+        if options.wheelhouse:
+            wheelhouse = Path(options.wheelhouse).expanduser().resolve()
+            if not Path(wheelhouse, WHEELHOUSE_INDEX_FILENAME).is_file():
+                print("ERROR: No %r in wheelhouse '%s'" % (WHEELHOUSE_INDEX_FILENAME, wheelhouse))
+                sys.exit(1)
+        else:
+            wheelhouse = Path(sys.prefix, "wheelhouse")
+            if not Path(wheelhouse, WHEELHOUSE_INDEX_FILENAME).is_file():
+                self.do_export_wheelhouse(str(wheelhouse))
+
+        index = create_boot_zipapp(
+            boot_file=self.path_helper.boot_path,
+            wheelhouse=wheelhouse,
+            output_path=output_path,
+            exclude=("pip",) if options.without_pip else (),
+        )
+        print("\nzipapp with %i wheels created here: '%s' (%.1f MB)" % (
+            len(index["wheels"]), output_path, output_path.stat().st_size / 1024 / 1024
+        ))
+
+    def _change_editable_address(self, path):
+        """
+        Change all github 'https' remote urls of one checkout to 'git@'
+        Read/write the git config directly. Use 'git' only for unsupported configs.
+
+        :return: list of (remote name, old url, new url, info) tuples
+        """
+        try:
+            remotes = read_git_remotes(path)
+            via = "config"
+        except UnsupportedGitConfig:
+            output = subprocess.check_output(
+                ["git", "remote", "-v"], cwd=str(path), universal_newlines=True, stderr=subprocess.STDOUT
+            )
+            remotes = dict(re.findall(r"(\S+)\s+(\S+)\s+\(fetch\)", output))
+            via = "git"
+
+        new_urls = {}
+        for name, url in sorted(remotes.items()):
+            new_url = url.replace("https://github.com/", "git@github.com:")
+            if new_url != url:
+                new_urls[name] = new_url
+
+        if new_urls:
+            if via == "config":
+                set_git_remote_urls(path, new_urls)
+            else:
+                for name, new_url in sorted(new_urls.items()):
+                    subprocess.check_call(["git", "remote", "set-url", name, new_url], cwd=str(path))
+
+        rows = []
+        for name, url in sorted(remotes.items()):
+            if name in new_urls:
+                rows.append((name, url, new_urls[name], "changed (via %s)" % via))
+            else:
+                rows.append((name, url, url, "not changed"))
+        return rows
+
     def do_change_editable_address(self, arg):
         """
         Replace git remote url from github read-only 'https' to 'git@'
@@ -123,45 +450,49 @@ class DeveloperAdminShell(AdminShell):
 
         **This is only developer with github write access ;)**
 
-        executes e.g.:
-
-        git remote set-url origin git@github.com:<user>/<project>.git
+        All checkouts under 'src' are changed concurrently.
+        The remote urls are changed directly in '.git/config'
+        ('git remote set-url' is only used for unsupported git configs,
+        e.g.: with [include] or [url] insteadOf sections)
         """
         src_path = self.path_helper.src_path  # Path instance pointed to 'src' directory
-        for p in src_path.iterdir():
-            if not p.is_dir():
-                continue
-
-            if str(p).endswith(".bak"):
-                continue
-
-            print("\n")
-            print("*"*79)
-            print("Change: %s..." % p)
-
-            try:
-                output = VerboseSubprocess(
-                    "git", "remote", "-v",
-                    cwd=str(p),
-                ).verbose_output(check=False)
-            except subprocess.CalledProcessError:
-                print("Skip.")
-                continue
-
-            (name, url) = re.findall("(\w+?)\s+([^\s]*?)\s+", output)[0]
-            print("Change %r url: %r" % (name, url))
-
-            new_url=url.replace("https://github.com/", "git@github.com:")
-            if new_url == url:
-                print("ERROR: url not changed!")
-                continue
+        paths = sorted(
+            p for p in src_path.iterdir()
+            if p.is_dir() and not str(p).endswith(".bak")
+        )
 
-            VerboseSubprocess("git", "remote", "set-url", name, new_url, cwd=str(p)).verbose_call(check=False)
-            VerboseSubprocess("git", "remote", "-v", cwd=str(p)).verbose_call(check=False)
+        rows = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+            futures = dict((executor.submit(self._change_editable_address, p), p) for p in paths)
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future].name
+                try:
+                    results = future.result()
+                except (OSError, subprocess.CalledProcessError, UnsupportedGitConfig) as err:
+                    rows.append((name, "-", "-", "ERROR: %s" % err))
+                    continue
+
+                if not results:
+                    rows.append((name, "-", "-", "no remote"))
+                for remote, old_url, new_url, info in results:
+                    rows.append((name, remote, new_url, info))
+
+        rows.sort()
+        header = ("directory", "remote", "url", "")
+        widths = [max(len(str(row[index])) for row in [header] + rows) for index in range(3)]
+        self.stdout.write("\n")
+        for row in [header] + rows:
+            line = "%-*s  %-*s  %-*s  %s" % (widths[0], row[0], widths[1], row[1], widths[2], row[2], row[3])
+            self.stdout.write("%s\n" % line.rstrip())
 
     def do_update_own_boot_file(self, arg):
         """
         Update 'bootstrap_env/boot_bootstrap_env.py' via cookiecutter
+
+        A existing lock file (created with 'lock_requirements') will be embedded.
+
+        Rendering is skipped if 'boot_source', the context and the boot file
+        are unchanged since the last run.
         """
         # https://packaging.pypa.io/en/latest/version/
         parsed_bootstrap_env_version = parse(bootstrap_env_version)
@@ -173,15 +504,38 @@ class DeveloperAdminShell(AdminShell):
 
         repro_path = Path(self.path_helper.base, "boot_source")
 
-        # https://cookiecutter.readthedocs.io
-        result = verbose_cookiecutter(
-            template=str(repro_path),
-            no_input=True,
-            overwrite_if_exists=True,
-            output_dir=str(self.path_helper.base.parent),
-            extra_context={
-                "_version": bootstrap_env_version,
-                "use_pre_release": use_pre_release,
-            },
-        )
-        print("\nbootstrap file created here: %s" % result)
+        lock_filepath = self.path_helper.lock_filepath
+        if lock_filepath.is_file():
+            print("Embed lock file: %s" % lock_filepath)
+            with lock_filepath.open("r") as f:
+                requirements_lock = f.read()
+        else:
+            requirements_lock = ""
+
+        extra_context = {
+            "_version": bootstrap_env_version,
+            "use_pre_release": use_pre_release,
+            "requirements_lock": requirements_lock,
+        }
+        boot_path = self.path_helper.boot_path
+
+        # The boot file is also an input: Overwrite manual changes
+        inputs = lambda: {
+            "boot_source": get_tree_hashes(repro_path),
+            "extra_context": extra_context,
+            "boot_file": hash_file(boot_path),
+        }
+        fingerprints = StepFingerprints(Path(self.path_helper.base, self.BOOT_FILE_FINGERPRINTS))
+        if fingerprints.is_unchanged("update_own_boot_file", inputs):
+            print("\n'boot_source' and context unchanged: skip rendering.")
+            print("bootstrap file created here: %s (unchanged)" % boot_path)
+            return
+
+        renderer = get_boot_file_renderer(repro_path, extra_context=extra_context)
+        results = renderer.render({}, output_dir=self.path_helper.base.parent)
+
+        fingerprints.succeeded("update_own_boot_file", inputs)
+        fingerprints.save()
+
+        for path, status in results:
+            print("\nbootstrap file created here: %s (%s)" % (path, status))
@@ -13,22 +13,31 @@
     :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
 """
 
+import argparse
+import concurrent.futures
+import csv
+import json
 import os
+import shlex
 import sys
 from pathlib import Path
 
 # Bootstrap-Env
-from bootstrap_env.boot_bootstrap_env import Cmd2, VerboseSubprocess, __version__, get_pip_file_name, in_virtualenv
-from bootstrap_env.utils.import_utils import LazyImportError
+from bootstrap_env.admin_shell.admin_daemon import DAEMON_ENV_NAME
+from bootstrap_env.boot_bootstrap_env import (
+    WHEELHOUSE_INDEX_FILENAME, Cmd2, ConcurrentSubprocesses, PackageStore, SharedPip, VerboseSubprocess,
+    __version__, get_bin_dir_name, get_pip_file_name, get_wheelhouse_args, in_virtualenv, normalize_project_name
+)
+from bootstrap_env.utils.editable_utils import (
+    get_editable_info, get_install_levels, get_requirement_name, iter_git_checkouts
+)
+from bootstrap_env.utils.fingerprint_utils import (
+    StepFingerprints, get_installed_distributions, get_requirements_hashes, hash_file
+)
+from bootstrap_env.utils.git_utils import get_git_head
+from bootstrap_env.utils.template_utils import get_boot_file_renderer
 from bootstrap_env.version import __version__ as bootstrap_env_version
 
-# External libs:
-try:
-    from cookiecutter.main import cookiecutter
-except ImportError as err:
-    # Re-Raise ImportError on first usage
-    cookiecutter = LazyImportError(err)
-
 
 
 class AdminShell(Cmd2):
@@ -38,6 +47,12 @@ class AdminShell(Cmd2):
     """
     version = __version__
 
+    # Fingerprints of the last 'update_env' run, stored in the virtualenv:
+    UPDATE_ENV_FINGERPRINTS = "update_env_fingerprints.json"
+
+    # Not asked in 'generate_bootstrap', e.g.: the multi-line lock file (set by 'update_boot')
+    NO_PROMPT_VARIABLES = ("requirements_lock",)
+
     def __init__(self, path_helper, *args, **kwargs):
         self.path_helper = path_helper # bootstrap_env.admin_shell.path_helper.PathHelper instance
 
@@ -48,12 +63,7 @@ class AdminShell(Cmd2):
             self.stdout.write("\nERROR: Only allowed in activated virtualenv!\n\n")
             return
 
-        if sys.platform == 'win32':
-            bin_dir_name="Scripts"
-        else:
-            bin_dir_name = "bin"
-
-        pip3_path = Path(sys.prefix, bin_dir_name, get_pip_file_name()) # e.g.: .../bin/pip3
+        pip3_path = Path(sys.prefix, get_bin_dir_name(), get_pip_file_name()) # e.g.: .../bin/pip3
         if not pip3_path.is_file():
             print("ERROR: pip not found here: '%s'" % pip3_path)
             return
@@ -61,13 +71,31 @@ class AdminShell(Cmd2):
         print("pip found here: '%s'" % pip3_path)
         return pip3_path
 
+    def has_own_pip(self):
+        """
+        False if the virtualenv was created without pip, via: 'boot --shared-pip'
+        """
+        return Path(sys.prefix, get_bin_dir_name(), get_pip_file_name()).is_file()
+
+    def get_pip_command(self, wheelhouse=None):
+        """
+        Returns the pip command as list, e.g.:
+            ['/.../env/bin/pip3']
+        or in a virtualenv without pip (created via 'boot --shared-pip'), e.g.:
+            ['/.../env/bin/python', '/.../.cache/bootstrap_env/pip/pip-19.0.3-py2.py3-none-any.whl/pip']
+        """
+        if self.has_own_pip():
+            return [str(self.get_pip3_path())]
+
+        print("No pip in virtualenv: Use the shared pip.")
+        return SharedPip(wheelhouse=wheelhouse).get_pip_command(sys.executable)
+
     def do_install_test_requirements(self, arg=None):
         """
         Install packages to run tests
         """
-        pip3_path = self.get_pip3_path()
         VerboseSubprocess(
-            str(pip3_path), "install", "-r", str(self.path_helper.test_req_path)
+            *self.get_pip_command(), "install", "-r", str(self.path_helper.test_req_path)
         ).verbose_call(check=True) # Exit on error
 
     def do_pytest(self, arg=None):
@@ -92,64 +120,312 @@ class AdminShell(Cmd2):
         """
         Just run 'pip freeze'
         """
-        return_code = VerboseSubprocess("pip3", "freeze").verbose_call(check=False)
+        return_code = VerboseSubprocess(*self.get_pip_command(), "freeze").verbose_call(check=False)
 
-    def do_update_env(self, arg=None):
+    def do_gc(self, arg=None):
         """
-        Update all packages in virtualenv.
+        Remove all unused files from the shared package store.
 
-        (Call this command only in a activated virtualenv.)
+        The package store is used by virtualenvs created with 'boot --package-store'
+        A stored file is unused, if it's not hardlinked into any virtualenv anymore.
+        (e.g.: the virtualenv was deleted or the package was upgraded)
         """
-        pip3_path = str(self.get_pip3_path())
+        store = PackageStore()
+        self.stdout.write("Package store: %s\n" % store.path)
 
-        # Upgrade pip first:
-        if sys.platform == 'win32':
-            # Note: On windows it will crash with a PermissionError: [WinError 32]
-            # because pip can't replace himself while running ;)
-            # Work-a-round is "python -m pip install --upgrade pip"
-            # see also: https://github.com/pypa/pip/issues/3804
-            return_code = VerboseSubprocess(
-                sys.executable or "python",
-                "-m", "pip", "install", "--upgrade", "pip",
-            ).verbose_call(check=False)
+        removed, freed = store.gc()
+        self.stdout.write("%i unused files removed (%.1f MB freed)\n" % (removed, freed / 1024 / 1024))
+
+        count, used, saved = store.get_stats()
+        self.stdout.write(
+            "%i files stored (%.1f MB), %.1f MB saved by hardlinks\n" % (
+                count, used / 1024 / 1024, saved / 1024 / 1024
+            )
+        )
+
+    def _parse_update_env_args(self, arg):
+        parser = argparse.ArgumentParser(prog="update_env", add_help=False)
+        parser.add_argument(
+            "--wheelhouse", metavar="DIR",
+            help="Install all packages only from this local wheelhouse directory (no PyPi access)"
+        )
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Run all steps, even if their inputs are unchanged since the last run."
+        )
+        parser.add_argument(
+            "--all-src", action="store_true",
+            help="developer mode: Update all git checkouts in 'src' and not only the own one."
+        )
+        return parser.parse_args(shlex.split(arg or ""))
+
+    def _update_src_checkouts(self, options, pip_command, pip_index_args, fingerprints):
+        """
+        'update_env --all-src': Pull all git checkouts in 'src' concurrently and
+        re-install only the editables with a changed git HEAD, setup.py or setup.cfg
+
+        The changed editables are installed with '--no-deps' in parallel, grouped
+        by their dependencies. The dependencies are installed with one pip call afterwards.
+
+        :return: True if a editable was installed
+        """
+        checkouts = list(iter_git_checkouts(self.path_helper.src_path))
+
+        if options.wheelhouse:
+            self.stdout.write("Offline mode: Skip 'git pull'\n")
         else:
+            runner = ConcurrentSubprocesses()
+            for checkout in checkouts:
+                runner.add("git", "pull", "origin", name=checkout.name, cwd=str(checkout))
+            runner.print_summary(runner.run())
+
+        def get_editable_inputs(checkout):
+            # Without the installed packages: Otherwise every install would "change" all other editables
+            def editable_inputs():
+                return {
+                    "git_head": get_git_head(checkout),
+                    "setup.py": hash_file(Path(checkout, "setup.py")),
+                    "setup.cfg": hash_file(Path(checkout, "setup.cfg")),
+                }
+            return editable_inputs
+
+        editables = [get_editable_info(checkout) for checkout in checkouts]
+        steps = {}
+        for info in editables:
+            step = "editable_install:%s" % info.path.name
+            inputs = get_editable_inputs(info.path)
+            if fingerprints.is_unchanged(step, inputs):
+                self.stdout.write("editable install %r: nothing changed -> skip\n" % info.path.name)
+            else:
+                steps[info.path] = (step, inputs)
+
+        if not steps:
+            return False
+
+        installed = []
+        for level in get_install_levels([info for info in editables if info.path in steps]):
+            # pip use 'setup.py develop' for projects without a 'pyproject.toml', it rewrites
+            # the shared 'easy-install.pth' -> install them one by one
+            parallel = [info for info in level if Path(info.path, "pyproject.toml").is_file()]
+            serial = [info for info in level if info not in parallel]
+            for infos, max_workers in ((parallel, None), (serial, 1)):
+                runner = ConcurrentSubprocesses(max_workers=max_workers)
+                for info in infos:
+                    runner.add(
+                        *pip_command, "install", "--no-deps", *pip_index_args, "--editable", ".",
+                        name=info.path.name, cwd=str(info.path)
+                    )
+                results = runner.run()
+                runner.print_summary(results)
+                installed += [info.path for info, result in zip(infos, results) if result.exit_code == 0]
+
+        # The dependencies from the new installed metadata, without the editables self:
+        editable_names = set(normalize_project_name(info.name) for info in editables)
+        requires = sorted(set(
+            requirement
+            for path in installed
+            for requirement in get_editable_info(path).requires
+            if get_requirement_name(requirement) not in editable_names
+        ))
+        if requires:
             return_code = VerboseSubprocess(
-                pip3_path, "install", "--upgrade", "pip"
+                *pip_command, "install", *pip_index_args, *requires,
+                timeout=120
             ).verbose_call(check=False)
+            if return_code != 0:
+                return True # The editables will be installed again on the next run
+
+        for path in installed:
+            fingerprints.succeeded(*steps[path])
+        return True
+
+    def do_update_env(self, arg=None):
+        """
+        Update all packages in virtualenv.
+
+        (Call this command only in a activated virtualenv.)
+
+        usage:
+            update_env [--wheelhouse DIR] [--force] [--all-src]
+
+        --wheelhouse DIR: Install only from a local wheelhouse directory
+        (created with 'export_wheelhouse') without any network access.
+        The 'git pull' in developer mode will be skipped, too.
+
+        A fingerprint of the inputs of every step is stored after a successful run.
+        Steps with unchanged inputs are skipped:
+            * pip upgrade.........: installed packages, wheelhouse index
+            * package upgrade.....: installed packages, wheelhouse index
+            * editable install....: git HEAD, setup.py, setup.cfg, installed packages
+            * requirements install: requirement files (incl. -r includes), installed packages, wheelhouse index
+        Without a wheelhouse the package index (PyPi) is an input of the pip upgrade,
+        the package upgrade and the not hash-pinned requirements install: Its state
+        is unknown, so these steps (and the 'git pull' in developer mode) are always done.
+        Only with a wheelhouse a run without changes needs no pip call at all.
+
+        --force: Run all steps.
+
+        --all-src: (only in developer mode) 'git pull' all git checkouts in 'src'
+        concurrently and re-install all editables with a changed git HEAD, setup.py
+        or setup.cfg. Independent editables are installed in parallel.
+
+        In a virtualenv created with 'boot --package-store' all changed files
+        will be added to the shared package store.
+
+        If the package contains a hash-pinned lock file (created with 'lock_requirements')
+        it will be used in normal mode instead of the requirements file:
+        All packages are installed with '--require-hashes --no-deps' (without dependency resolution)
+        """
+        options = self._parse_update_env_args(arg)
+        pip_index_args = get_wheelhouse_args(options.wheelhouse)
+
+        pip_command = self.get_pip_command(wheelhouse=options.wheelhouse)
 
         root_path = self.path_helper.base.parent
 
+        use_lock = self.path_helper.normal_mode and self.path_helper.lock_filepath.is_file()
+        if use_lock:
+            requirement_file_path = str(self.path_helper.lock_filepath)
+            # All dependencies are pinned in the lock file:
+            install_args = ["--require-hashes", "--no-deps"]
+        else:
+            requirement_file_path = str(self.path_helper.req_filepath)
+            install_args = ["--upgrade"]
+
+        if options.wheelhouse:
+            wheelhouse_hash = hash_file(Path(options.wheelhouse, WHEELHOUSE_INDEX_FILENAME))
+        else:
+            wheelhouse_hash = None
+
+        fingerprints = StepFingerprints(
+            Path(sys.prefix, self.UPDATE_ENV_FINGERPRINTS), force=options.force
+        )
+        changed = False # Set by skippable steps, the index steps are checked via the installed packages
+        installed_before = get_installed_distributions()
+
+        # Without a wheelhouse the package index is a input, but we don't know its state:
+        index_known = bool(options.wheelhouse)
+
+        def installed_inputs():
+            return {
+                "installed": get_installed_distributions(),
+                "wheelhouse": wheelhouse_hash,
+            }
+
+        # Upgrade pip first:
+        if not self.has_own_pip():
+            self.stdout.write("Shared pip is used: No pip upgrade needed.\n")
+        elif index_known and fingerprints.is_unchanged("pip_upgrade", installed_inputs):
+            self.stdout.write("pip upgrade: nothing changed -> skip\n")
+        else:
+            if sys.platform == 'win32':
+                # Note: On windows it will crash with a PermissionError: [WinError 32]
+                # because pip can't replace himself while running ;)
+                # Work-a-round is "python -m pip install --upgrade pip"
+                # see also: https://github.com/pypa/pip/issues/3804
+                return_code = VerboseSubprocess(
+                    sys.executable or "python",
+                    "-m", "pip", "install", "--upgrade", "pip", *pip_index_args
+                ).verbose_call(check=False)
+            else:
+                return_code = VerboseSubprocess(
+                    *pip_command, "install", "--upgrade", "pip", *pip_index_args
+                ).verbose_call(check=False)
+            if return_code == 0:
+                fingerprints.succeeded("pip_upgrade", installed_inputs)
+
         # Update the requirements files by...
         if self.path_helper.normal_mode:
             # ... update 'bootstrap_env' PyPi package
-            return_code = VerboseSubprocess(
-                pip3_path, "install", "--upgrade", self.path_helper.egg_name
-            ).verbose_call(check=False)
+            if index_known and fingerprints.is_unchanged("package_upgrade", installed_inputs):
+                self.stdout.write("package upgrade: nothing changed -> skip\n")
+            else:
+                if use_lock:
+                    # The new version may contain a new lock file, that will be used below
+                    package_args = ["--no-deps"]
+                else:
+                    package_args = []
+                return_code = VerboseSubprocess(
+                    *pip_command, "install", "--upgrade", *package_args, *pip_index_args,
+                    self.path_helper.egg_name
+                ).verbose_call(check=False)
+                if return_code == 0:
+                    fingerprints.succeeded("package_upgrade", installed_inputs)
+        elif options.all_src:
+            # ... git pull all sources in 'src'
+            if self._update_src_checkouts(options, pip_command, pip_index_args, fingerprints):
+                changed = True
         else:
-            # ... git pull bootstrap_env sources
-            return_code = VerboseSubprocess(
-                "git", "pull", "origin",
-                cwd=str(root_path)
-            ).verbose_call(check=False)
+            if options.wheelhouse:
+                self.stdout.write("Offline mode: Skip 'git pull'\n")
+            else:
+                # ... git pull bootstrap_env sources
+                return_code = VerboseSubprocess(
+                    "git", "pull", "origin",
+                    cwd=str(root_path)
+                ).verbose_call(check=False)
+
+            def editable_inputs():
+                inputs = installed_inputs()
+                inputs.update({
+                    "git_head": get_git_head(root_path),
+                    "setup.py": hash_file(Path(root_path, "setup.py")),
+                    "setup.cfg": hash_file(Path(root_path, "setup.cfg")),
+                })
+                return inputs
+
+            if fingerprints.is_unchanged("editable_install", editable_inputs):
+                self.stdout.write("editable install: nothing changed -> skip\n")
+            else:
+                return_code = VerboseSubprocess(
+                    *pip_command, "install", *pip_index_args, "--editable", ".",
+                    cwd=str(root_path)
+                ).verbose_call(check=False)
+                changed = True
+                if return_code == 0:
+                    fingerprints.succeeded("editable_install", editable_inputs)
+
+        def requirements_inputs():
+            inputs = installed_inputs()
+            inputs["requirements"] = get_requirements_hashes(requirement_file_path)
+            return inputs
 
+        # Update with requirements files:
+        self.stdout.write("Use: '%s'\n" % requirement_file_path)
+        # With '--upgrade' new releases in the index are a input, too:
+        requirements_known = index_known or use_lock
+        if requirements_known and fingerprints.is_unchanged("requirements_install", requirements_inputs):
+            self.stdout.write("requirements install: nothing changed -> skip\n")
+        else:
             return_code = VerboseSubprocess(
-                pip3_path, "install", "--editable", ".",
-                cwd=str(root_path)
+                *pip_command, "install",
+                "--exists-action", "b", # action when a path already exists: (b)ackup
+                *install_args,
+                *pip_index_args,
+                "--requirement", requirement_file_path,
+                timeout=120  # extended timeout for slow Travis ;)
             ).verbose_call(check=False)
+            if requirements_known:
+                changed = True
+            if return_code == 0:
+                fingerprints.succeeded("requirements_install", requirements_inputs)
 
-        requirement_file_path = str(self.path_helper.req_filepath)
+        if get_installed_distributions() != installed_before:
+            changed = True
 
-        # Update with requirements files:
-        self.stdout.write("Use: '%s'\n" % requirement_file_path)
-        return_code = VerboseSubprocess(
-            pip3_path, "install",
-            "--exists-action", "b", # action when a path already exists: (b)ackup
-            "--upgrade",
-            "--requirement", requirement_file_path,
-            timeout=120  # extended timeout for slow Travis ;)
-        ).verbose_call(check=False)
+        if changed and Path(sys.prefix, PackageStore.MARKER_FILENAME).is_file():
+            PackageStore().add_env(sys.prefix)
 
-        self.stdout.write("Please restart %s\n" % self.self_filename)
+        fingerprints.save()
+
+        if not changed:
+            self.stdout.write("\nNothing changed.\n")
+            return
+
+        if os.environ.get(DAEMON_ENV_NAME):
+            self.stdout.write("The admin daemon restarts itself with the new packages.\n")
+        else:
+            self.stdout.write("Please restart %s\n" % self.self_filename)
         sys.exit(0)
 
     def do_pip_sync(self, arg=None):
@@ -178,6 +454,98 @@ class AdminShell(Cmd2):
         self.stdout.write("Please restart %s\n" % self.self_filename)
         sys.exit(0)
 
+    def _read_manifest(self, manifest_path):
+        """
+        Returns a list of cookiecutter context dicts from a CSV or JSON manifest file.
+        Empty CSV cells are ignored -> the default from cookiecutter.json is used.
+        """
+        with manifest_path.open("r", newline="") as f:
+            if manifest_path.suffix.lower() == ".json":
+                entries = json.load(f)
+            else:
+                entries = [
+                    dict((key, value) for key, value in row.items() if value)
+                    for row in csv.DictReader(f)
+                ]
+
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            raise ValueError("Manifest must contain a list of objects: %s" % manifest_path)
+        return entries
+
+    def do_generate_bootstraps(self, arg=None):
+        """
+        Generate many bootstrap files from a CSV or JSON manifest
+
+        usage:
+            generate_bootstraps MANIFEST [--output-dir DIR] [--workers N]
+
+        The manifest contains one cookiecutter context per project:
+            * CSV: one row per project, the first row contains the context keys
+            * JSON: list of objects
+        e.g.:
+            project_name,package_name,bootstrap_filename,editable_url,raw_url
+            foo,foo,boot_foo,git+https://github.com/foo/foo.git@master,https://...
+
+        All keys of 'cookiecutter.json' are optional. Use the key 'output_dir' to
+        set the output directory of one project (relative to the manifest file).
+        Default is: --output-dir or the directory of the manifest file.
+
+        The template is compiled once and all projects are rendered in parallel.
+        Files with unchanged content are not written again.
+        """
+        parser = argparse.ArgumentParser(prog="generate_bootstraps", add_help=False)
+        parser.add_argument("manifest")
+        parser.add_argument("--output-dir", metavar="DIR")
+        parser.add_argument("--workers", type=int, default=8)
+        try:
+            options = parser.parse_args(shlex.split(arg or ""))
+        except SystemExit:
+            print("ERROR: Wrong arguments!")
+            return
+
+        manifest_path = Path(options.manifest).expanduser().resolve()
+        try:
+            entries = self._read_manifest(manifest_path)
+        except (OSError, ValueError) as err:
+            print("ERROR: Can't read manifest: %s" % err)
+            sys.exit(1)
+
+        if options.output_dir:
+            default_output_dir = Path(options.output_dir).expanduser().resolve()
+        else:
+            default_output_dir = manifest_path.parent
+
+        renderer = get_boot_file_renderer(
+            template_dir=Path(self.path_helper.base, "boot_source"),
+            extra_context={"_version": bootstrap_env_version},
+        )
+
+        def render(entry):
+            entry = dict(entry)
+            output_dir = Path(manifest_path.parent, entry.pop("output_dir", default_output_dir))
+            return renderer.render(entry, output_dir)
+
+        failed = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=options.workers) as executor:
+            futures = [executor.submit(render, entry) for entry in entries]
+            for entry, future in zip(entries, futures):
+                name = entry.get("project_name", "?")
+                try:
+                    results = future.result()
+                except Exception as err:
+                    failed += 1
+                    self.stdout.write("%-20s ERROR: %s: %s\n" % (name, err.__class__.__name__, err))
+                    continue
+                for output_path, status in results:
+                    self.stdout.write("%-20s %-9s %s\n" % (name, status, output_path))
+
+        self.stdout.write("\n%i projects rendered, %i failed.\n" % (len(entries) - failed, failed))
+        if failed:
+            sys.exit(1)
+
+    def complete_generate_bootstraps(self, text, line, begidx, endidx):
+        return self._complete_path(text, line, begidx, endidx)
+
     def complete_generate_bootstrap(self, text, line, begidx, endidx):
         # print("text: %r" % text)
         # print("line: %r" % line)
@@ -188,6 +556,11 @@ class AdminShell(Cmd2):
             return True
         return False
 
+    def _prompt_variable(self, key, default):
+        if key in self.NO_PROMPT_VARIABLES:
+            return default
+        return input("%s [%s]: " % (key, default)).strip() or default
+
     def do_generate_bootstrap(self, arg=None):
         """
         Generate new bootstrap file via cookiecutter
@@ -211,12 +584,10 @@ class AdminShell(Cmd2):
             print("Abort.")
             return
 
-        repro_path = Path(self.package_path, "boot_source")
-        result = cookiecutter(
-            template=str(repro_path),
-            output_dir=str(output_dir),
-            extra_context={
-                "_version": bootstrap_env_version,
-            }
+        renderer = get_boot_file_renderer(
+            template_dir=Path(self.path_helper.base, "boot_source"),
+            extra_context={"_version": bootstrap_env_version},
         )
-        print("bootstrap file created here: %s" % result)
+        results = renderer.render({}, output_dir, prompt=self._prompt_variable)
+        for path, _ in results:
+            print("bootstrap file created here: %s" % path)
@@ -12,6 +12,9 @@ import logging
 import sys
 from pathlib import Path
 
+# Bootstrap-Env
+from bootstrap_env.boot_bootstrap_env import REQUIREMENTS_LOCK_FILENAME
+
 log = logging.getLogger(__name__)
 
 
@@ -30,6 +33,7 @@ class PathHelper:
     file    self.boot_path......: /...env/src/bootstrap-env/bootstrap_env/boot_bootstrap_env.py
     file    self.admin_path.....: /...env/src/bootstrap-env/bootstrap_env/bootstrap_env_admin.py
     file    self.req_filepath...: /...env/src/bootstrap-env/bootstrap_env/requirements/developer_installation.txt
+    file    self.lock_filepath..: /...env/src/bootstrap-env/bootstrap_env/requirements/normal_installation.lock
     file    self.test_req_path..: /...env/src/bootstrap-env/bootstrap_env/requirements/test_requirements.txt
 
 
@@ -43,6 +47,7 @@ class PathHelper:
     file    self.boot_path......: /...env/lib/python3.6/site-packages/bootstrap_env/boot_bootstrap_env.py
     file    self.admin_path.....: /...env/lib/python3.6/site-packages/bootstrap_env/bootstrap_env_admin.py
     file    self.req_filepath...: /...env/lib/python3.6/site-packages/bootstrap_env/requirements/normal_installation.txt
+    file    self.lock_filepath..: /...env/lib/python3.6/site-packages/bootstrap_env/requirements/normal_installation.lock
     file    self.test_req_path..: /...env/lib/python3.6/site-packages/bootstrap_env/requirements/test_requirements.txt
 
     """
@@ -94,6 +99,9 @@ class PathHelper:
         self.req_filename = self.REQUIREMENTS[self.install_mode]
         self.req_filepath = Path(self.req_path, self.req_filename)
 
+        # Optional hash-pinned lock file (created with 'lock_requirements' in developer mode)
+        self.lock_filepath = Path(self.req_path, REQUIREMENTS_LOCK_FILENAME)
+
     @property
     def normal_mode(self):
         return self.install_mode == self.NORMAL_INSTALL
@@ -128,6 +136,7 @@ class PathHelper:
             ("self.boot_path", self.boot_path),
             ("self.admin_path", self.admin_path),
             ("self.req_filepath", self.req_filepath),
+            ("self.lock_filepath", self.lock_filepath),
             ("self.test_req_path", self.test_req_path),
         ]
 
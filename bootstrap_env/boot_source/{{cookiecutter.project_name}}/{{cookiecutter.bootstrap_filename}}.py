@@ -36,14 +36,41 @@
     :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
 """
 
+import argparse
+import asyncio
+import atexit
+import base64
+import bisect
 import cmd
+import codecs
+import collections
+import concurrent.futures
+import configparser
+import contextlib
+import csv
+import errno
+import functools
+import hashlib
+import io
+import itertools
+import json
+import locale
 import logging
 import os
 import pathlib
+import platform
+import re
+import selectors
+import shlex
+import shutil
+import signal
 import subprocess
 import sys
+import sysconfig
+import threading
 import time
 import traceback
+import zipfile
 from pathlib import Path
 
 if sys.version_info < (3, 5):
@@ -66,6 +93,13 @@ except ImportError as err:
     print("\nERROR: 'ensurepip' not available: %s (Maybe 'python3-venv' package not installed?!?)" % err)
 
 
+try:
+    import fcntl
+except ImportError:
+    # e.g.: on Windows: The warm pool refill runs without a lock
+    fcntl = None
+
+
 __version__ = "{{cookiecutter._version}}" # Version from used 'bootstrap_env' to generate this file.
 
 
@@ -94,7 +128,14 @@ NORMAL_INSTALL=[
     PACKAGE_NAME
 ]
 
-SELF_FILE_PATH=Path(__file__).resolve()               # .../src/bootstrap-env/bootstrap_env/boot_bootstrap_env.py
+# Hash-pinned requirements lock file, created with '{{cookiecutter.package_name}}_admin.py lock_requirements'
+# and embedded into this file by 'update_own_boot_file'.
+# If not empty: All requirements will be installed in 'normal' mode with '--require-hashes --no-deps'
+# (without dependency resolution) and {{cookiecutter.package_name}} itself with '--no-deps'
+REQUIREMENTS_LOCK_FILENAME="normal_installation.lock"
+REQUIREMENTS_LOCK=r"""{{cookiecutter.requirements_lock}}"""
+
+SELF_FILE_PATH=Path(os.path.realpath(__file__))      # .../src/bootstrap-env/bootstrap_env/boot_bootstrap_env.py
 ROOT_PATH=Path(SELF_FILE_PATH, "..", "..").resolve()  # .../src/bootstrap_env/
 OWN_FILE_NAME=SELF_FILE_PATH.name                     # boot_bootstrap_env.py
 
@@ -116,6 +157,34 @@ else:
 
 SUBPROCESS_TIMEOUT=60  # default timeout for subprocess calls
 
+# Base directory for all caches (e.g.: virtualenv templates)
+# default: ~/.cache/bootstrap_env/ -> can be changed via environment variable:
+CACHE_DIR_ENV_NAME="BOOTSTRAP_ENV_CACHE_DIR"
+
+# A virtualenv template of not pinned requirements (no REQUIREMENTS_LOCK and no wheelhouse)
+# will be rebuild after this seconds, to pick up new releases from PyPi:
+TEMPLATE_MAX_AGE=24 * 60 * 60
+
+# Virtualenvs created with 'boot --shared-pip' contains no pip.
+# All pip calls are made with one pip wheel cached per host.
+# The pip self-upgrade will be skipped, if the cached pip has at least this version.
+# (Same for the pip installed via ensurepip in normal boot)
+# pip v20.3 is needed for the current wheel tags: manylinux2014 (v19.3) and PEP 600 (v20.3)
+MIN_PIP_VERSION=(20, 3)
+
+# Index file in a local wheelhouse directory (created by 'export_wheelhouse' admin command)
+WHEELHOUSE_INDEX_FILENAME="wheelhouse_index.json"
+
+# Directory of the embedded wheels (incl. the wheelhouse index) in a zipapp boot file,
+# created by the 'export_zipapp' admin command
+ZIPAPP_WHEELS_DIR="wheels"
+
+# Record the time of all boot phases and subprocess calls into a Chrome trace-event JSON file.
+# (open it in chrome://tracing or https://ui.perfetto.dev)
+# Enable via command line argument, e.g.: ./{{cookiecutter.bootstrap_filename}}.py --trace /tmp/trace.json boot ~/env
+# or via environment variable, e.g.: BOOTSTRAP_ENV_TRACE=/tmp/trace.json
+TRACE_ENV_NAME="BOOTSTRAP_ENV_TRACE"
+
 
 
 class Colorizer:
@@ -216,6 +285,175 @@ colorizer = Colorizer()
 # colorizer.demo()
 
 
+# pip output line prefix -> stage name
+PIP_STAGES = (
+    ("Collecting", "collect"),
+    ("Requirement already satisfied", "collect"),
+    ("Looking in", "collect"),
+    ("Downloading", "download"),
+    ("Using cached", "download"),
+    ("Processing", "download"),
+    ("Building wheel", "build"),
+    ("Running setup.py", "build"),
+    ("Installing collected packages", "install"),
+    ("Successfully installed", "finished"),
+)
+
+
+class Tracer:
+    """
+    Record nested spans as Chrome trace-events ('complete' events, timestamps in microseconds)
+
+    Subprocesses (e.g.: the admin script called in boot) inherit the trace file path via
+    the environment. They write their events into '<path>.<pid>.part' files and the root process
+    merge them into the trace file on exit.
+    """
+    # Set in the root process, so subprocesses know that they are not the root:
+    ROOT_PID_ENV_NAME="BOOTSTRAP_ENV_TRACE_ROOT_PID"
+
+    def __init__(self):
+        self.path = None
+        self.is_root = True
+        self.events = []
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def enable(self, path):
+        if self.enabled:
+            return
+
+        self.path = str(Path(path).expanduser().resolve())
+        os.environ[TRACE_ENV_NAME] = self.path  # trace all subprocesses, too
+        root_pid = os.environ.setdefault(self.ROOT_PID_ENV_NAME, str(os.getpid()))
+        self.is_root = root_pid == str(os.getpid())
+        atexit.register(self.save)
+
+    def reset(self):
+        """
+        Forget the state inherited from the parent, e.g.: in a forked child process.
+        """
+        self.path = None
+        self.is_root = True
+        self.events = []
+        self.lock = threading.Lock()
+
+    def setup(self, argv=None):
+        """
+        Enable tracing via the '--trace FILE' command line argument (removed from 'argv')
+        or via the environment variable.
+        """
+        if argv is None:
+            argv = sys.argv
+
+        path = os.environ.get(TRACE_ENV_NAME)
+        if len(argv) > 2 and argv[1] == "--trace":
+            path = argv[2]
+            del argv[1:3]
+
+        if path:
+            self.enable(path)
+
+    def add_event(self, name, category, start, end, args):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": int(start * 1000000),
+            "dur": int((end - start) * 1000000),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self.lock:
+            self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name, category="phase", **args):
+        """
+        Record the time of the 'with' block. The yielded args dict can be updated.
+        e.g.:
+            with tracer.span("pip install", category="subprocess") as args:
+                args["exit_code"] = ...
+        """
+        if not self.enabled:
+            yield args
+            return
+
+        start = time.time()
+        try:
+            yield args
+        except BaseException as err:
+            args.setdefault("error", repr(err))
+            raise
+        finally:
+            self.add_event(name, category, start, time.time(), args)
+
+    def save(self):
+        if not self.enabled:
+            return
+
+        if not self.is_root:
+            with open("%s.%i.part" % (self.path, os.getpid()), "w") as f:
+                json.dump(self.events, f)
+            return
+
+        events = list(self.events)
+        trace_dir, trace_name = os.path.split(self.path)
+        for name in os.listdir(trace_dir):
+            if name.startswith(trace_name + ".") and name.endswith(".part"):
+                part_path = os.path.join(trace_dir, name)
+                with open(part_path, "r") as f:
+                    events += json.load(f)
+                os.remove(part_path)
+
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print("\nTrace with %i events written to: %s" % (len(events), self.path))
+
+
+tracer = Tracer()
+
+
+def traced(name, category="phase"):
+    """
+    Decorator to record the calls of a function/method as trace span.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name, category=category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class PipStageRecorder:
+    """
+    Record the stages of a pip run (collect, download, build, install) as trace spans
+    by parsing the pip output lines.
+    """
+    def __init__(self):
+        self.stage = None
+        self.start = None
+
+    def feed(self, line):
+        line = line.strip()
+        for prefix, stage in PIP_STAGES:
+            if line.startswith(prefix):
+                if stage != self.stage:
+                    self.close()
+                    self.stage = stage
+                    self.start = time.time()
+                return
+
+    def close(self):
+        if self.stage is not None:
+            tracer.add_event("pip %s" % self.stage, "pip", self.start, time.time(), {})
+            self.stage = None
+
 
 class VerboseSubprocess:
     """
@@ -248,119 +486,1530 @@ class VerboseSubprocess:
         env = self.kwargs.get("env", os.environ.copy())
         env["PYTHONUNBUFFERED"]="1" # If a python script called ;)
 
-        self.env_updates = env_updates
-        if self.env_updates is not None:
-            env.update(env_updates)
+        self.env_updates = env_updates
+        if self.env_updates is not None:
+            env.update(env_updates)
+
+        self.kwargs["env"] = env
+
+    def print_call_info(self):
+        print("")
+        print("_"*79)
+
+        kwargs_txt=[]
+        for key, value in self.kwargs.items():
+            if key == "env":
+                continue
+            key = colorizer.colorize(key, foreground="magenta", opts=("bold",))
+            value = colorizer.colorize(value, foreground="green", opts=("bold",))
+            kwargs_txt.append("%s=%s" % (key, value))
+
+        txt = "Call: '{args}' with: {kwargs}".format(
+            args=colorizer.colorize(self.args_str, foreground="cyan", opts=("bold",)),
+            kwargs=", ".join(kwargs_txt)
+        )
+
+        if self.env_updates is not None:
+            txt += colorizer.colorize(" env:", foreground="magenta", opts=("bold",))
+            txt += colorizer.colorize(repr(self.env_updates), opts=("bold",))
+
+        print(txt)
+        print("", flush=True)
+
+    def print_exit_code(self, exit_code):
+        txt = "\nExit code %r from %r\n" % (exit_code, self.args_str)
+        if exit_code:
+            colorizer.err(txt, foreground="red", flush=True)
+        else:
+            colorizer.out(txt, foreground="green", flush=True)
+
+    def verbose_call(self, check=True):
+        """
+        run subprocess.call()
+
+        :param check: if True and subprocess exit_code !=0: sys.exit(exit_code) after run.
+        :return: process exit code
+        """
+        self.print_call_info()
+
+        with tracer.span(self.args_str, category="subprocess") as span_args:
+            try:
+                if tracer.enabled and self.kwargs["universal_newlines"]:
+                    exit_code = self._traced_call()
+                else:
+                    exit_code = subprocess.call(self.popenargs, **self.kwargs)
+            except KeyboardInterrupt:
+                print("\nExit %r\n" % self.args_str, flush=True)
+                exit_code=None # good idea?!?
+            span_args["exit_code"] = exit_code
+
+        sys.stderr.flush()
+
+        self.print_exit_code(exit_code)
+        if check and exit_code:
+            sys.exit(exit_code)
+
+        return exit_code
+
+    def _traced_call(self):
+        """
+        Same as subprocess.call() but the output will be parsed to record the pip stages.
+        """
+        kwargs = dict(self.kwargs)
+        timeout = kwargs.pop("timeout")
+        kwargs["stdout"] = subprocess.PIPE
+
+        recorder = PipStageRecorder()
+        with subprocess.Popen(self.popenargs, **kwargs) as proc:
+            try:
+                for line in proc.stdout:
+                    sys.stdout.write(line)
+                    sys.stdout.flush()
+                    recorder.feed(line)
+                return proc.wait(timeout=timeout)
+            except:
+                proc.kill()
+                raise
+            finally:
+                recorder.close()
+
+    def verbose_output(self, check=True):
+        """
+        run subprocess.check_output()
+
+        :param check: if True and subprocess exit_code !=0: sys.exit(exit_code) after run.
+        :return: process output
+        """
+        self.print_call_info()
+
+        try:
+            return subprocess.check_output(self.popenargs, **self.kwargs)
+        except subprocess.CalledProcessError as err:
+            print("\n%s" % err)
+            if check:
+                sys.exit(err.returncode)
+            raise
+
+    def iter_output(self, check=True, lines=True):
+        """
+        A subprocess with tee ;)
+
+        The output is read in chunks, without blocking. The timeout is the
+        wall clock time of the whole call, also if the subprocess is silent.
+        On timeout the whole process group will be killed and
+        subprocess.TimeoutExpired raised.
+
+        :param check: if True and subprocess exit_code !=0: sys.exit(exit_code) after run.
+        :param lines: if True: yield complete lines (incl. line ending), otherwise every chunk.
+        """
+        self.print_call_info()
+
+        kwargs = dict(self.kwargs)
+        timeout = kwargs.pop("timeout")
+        universal_newlines = kwargs.pop("universal_newlines")
+        kwargs.update({
+            "stdout":subprocess.PIPE,
+            "stderr":subprocess.STDOUT,
+        })
+        if sys.platform != "win32":
+            # New process group, so we can kill all child processes on timeout:
+            kwargs["start_new_session"] = True
+
+        if universal_newlines:
+            decoder = io.IncrementalNewlineDecoder(
+                decoder=codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors="replace"),
+                translate=True,
+            )
+            decode = decoder.decode
+            newline = "\n"
+        else:
+            decode = lambda chunk, final=False: chunk
+            newline = b"\n"
+
+        end_time = time.monotonic() + timeout
+        proc = subprocess.Popen(self.popenargs, **kwargs)
+        try:
+            buffer = decode(b"")
+            for chunk in self._iter_chunks(proc, end_time, timeout):
+                data = decode(chunk, final=not chunk)
+                if not lines:
+                    if data:
+                        yield data
+                    continue
+
+                buffer += data
+                if chunk and newline not in data:
+                    continue
+                *complete_lines, buffer = buffer.split(newline)
+                for line in complete_lines:
+                    yield line + newline
+
+            if lines and buffer:
+                yield buffer # last line without line ending
+
+            try:
+                proc.wait(timeout=max(end_time - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                # stdout closed, but the process is still running
+                raise subprocess.TimeoutExpired(self.popenargs, timeout)
+        finally:
+            if proc.returncode is None:
+                self._kill_process_group(proc)
+            proc.stdout.close()
+
+        if check and proc.returncode:
+            self.print_exit_code(proc.returncode)
+            sys.exit(proc.returncode)
+
+    def _iter_chunks(self, proc, end_time, timeout, chunk_size=64 * 1024):
+        """
+        yield the raw output chunks of 'proc' until EOF (the last chunk is b"")
+        """
+        fd = proc.stdout.fileno()
+        if sys.platform == "win32":
+            # selectors works only with sockets on windows: Read blocking and kill via timer
+            timer = threading.Timer(timeout, self._kill_process_group, args=(proc,))
+            timer.start()
+            try:
+                for chunk in iter(lambda: os.read(fd, chunk_size), b""):
+                    yield chunk
+            finally:
+                timer.cancel()
+            if time.monotonic() >= end_time:
+                raise subprocess.TimeoutExpired(self.popenargs, timeout)
+            yield b""
+            return
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while True:
+                remaining = end_time - time.monotonic()
+                if remaining <= 0 or not selector.select(timeout=remaining):
+                    raise subprocess.TimeoutExpired(self.popenargs, timeout)
+
+                chunk = os.read(fd, chunk_size)
+                yield chunk
+                if not chunk: # EOF
+                    return
+
+    def _kill_process_group(self, proc):
+        try:
+            if sys.platform == "win32":
+                proc.kill()
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass # already terminated
+        proc.wait() # reap the child
+
+    def print_output(self, check=True):
+        for chunk in self.iter_output(check=check, lines=False):
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+
+
+# Result of one command, run via ConcurrentSubprocesses
+SubprocessResult = collections.namedtuple(
+    "SubprocessResult", ("name", "args", "exit_code", "duration", "timed_out")
+)
+
+
+class ConcurrentSubprocesses:
+    """
+    Run many subprocesses at once (asyncio based sibling of VerboseSubprocess)
+
+    Every output line is written with a colored "<name> | " prefix.
+
+    e.g.:
+        runner = ConcurrentSubprocesses(max_workers=4)
+        runner.add("git", "pull", name="foo", cwd="/src/foo")
+        runner.add("git", "pull", name="bar", cwd="/src/bar")
+        results = runner.run()
+    """
+    PREFIX_COLORS = ("cyan", "green", "yellow", "blue", "magenta", "red")
+
+    def __init__(self, max_workers=None, timeout=SUBPROCESS_TIMEOUT):
+        """
+        :param max_workers: max. number of running subprocesses (default: number of CPUs)
+        :param timeout: wall clock timeout of every subprocess
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.commands = []
+
+    def add(self, *popenargs, name=None, cwd=None, env_updates=None):
+        """
+        Add one command. 'name' is used as output prefix (default: the first argument)
+        """
+        # subprocess doesn't accept Path() objects
+        for arg in popenargs:
+            assert not isinstance(arg, pathlib.Path), "Arg %r not accepted!" % arg
+        assert not isinstance(cwd, pathlib.Path), "cwd %r not accepted!" % cwd
+
+        env = os.environ.copy()
+        env["PYTHONUNBUFFERED"]="1" # If a python script called ;)
+        if env_updates is not None:
+            env.update(env_updates)
+
+        self.commands.append({
+            "name": name or popenargs[0],
+            "args": popenargs,
+            "cwd": cwd,
+            "env": env,
+        })
+
+    def write_line(self, prefix, line):
+        sys.stdout.write("%s%s\n" % (prefix, line))
+        sys.stdout.flush()
+
+    async def _run_command(self, semaphore, number, command, width):
+        color = self.PREFIX_COLORS[number % len(self.PREFIX_COLORS)]
+        prefix = colorizer.colorize("%-*s | " % (width, command["name"]), foreground=color)
+
+        async with semaphore:
+            self.write_line(prefix, "Call: %r" % " ".join(command["args"]))
+            start_time = time.monotonic()
+
+            kwargs = {}
+            if sys.platform != "win32":
+                # New process group, so we can kill all child processes on timeout:
+                kwargs["start_new_session"] = True
+
+            timed_out = False
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *command["args"],
+                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    cwd=command["cwd"], env=command["env"],
+                    **kwargs
+                )
+            except OSError as err:
+                # e.g.: command not found: Don't abort all other commands
+                self.write_line(prefix, "Error: %s" % err)
+                exit_code = 127 if isinstance(err, FileNotFoundError) else 126 # like a shell
+            else:
+                try:
+                    await asyncio.wait_for(self._pipe_output(proc, prefix), self.timeout)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    self.write_line(prefix, "Timeout after %s sec.: kill it!" % self.timeout)
+                    self._kill(proc)
+                    try:
+                        # Wait for the EOF, so the pipe is closed before the event loop
+                        await asyncio.wait_for(proc.stdout.read(), 1)
+                    except asyncio.TimeoutError:
+                        pass
+                except BaseException:
+                    self._kill(proc)
+                    raise
+                exit_code = await proc.wait()
+
+            duration = time.monotonic() - start_time
+            self.write_line(prefix, "Exit code %r in %.1f sec." % (exit_code, duration))
+
+        return SubprocessResult(command["name"], command["args"], exit_code, duration, timed_out)
+
+    def _kill(self, proc):
+        """
+        Kill the process and all its child processes.
+        Note: The process may be terminated, but a child process still holds the pipe.
+        """
+        try:
+            if sys.platform == "win32":
+                proc.kill()
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass # already terminated
+
+    async def _pipe_output(self, proc, prefix):
+        """
+        Write all output lines of 'proc' with the prefix. Read in chunks: lines may be very long.
+        """
+        decoder = io.IncrementalNewlineDecoder(
+            decoder=codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors="replace"),
+            translate=True,
+        )
+        buffer = ""
+        while True:
+            chunk = await proc.stdout.read(64 * 1024)
+            buffer += decoder.decode(chunk, final=not chunk)
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                self.write_line(prefix, line)
+            if not chunk:
+                break
+        if buffer:
+            self.write_line(prefix, buffer)
+
+    async def _run_all(self):
+        semaphore = asyncio.Semaphore(self.max_workers)
+        width = max([len(command["name"]) for command in self.commands])
+        tasks = [
+            self._run_command(semaphore, number, command, width)
+            for number, command in enumerate(self.commands)
+        ]
+        return await asyncio.gather(*tasks)
+
+    def run(self, check=False):
+        """
+        Run all added commands.
+
+        :param check: if True and one exit code !=0: sys.exit(exit_code) after all commands run.
+        :return: list of SubprocessResult (same order as added)
+        """
+        if not self.commands:
+            return []
+
+        if sys.platform == "win32":
+            loop = asyncio.ProactorEventLoop() # supports subprocesses
+        else:
+            loop = asyncio.new_event_loop()
+        # Note: set_event_loop() attach the child watcher (needed for subprocesses before Python 3.8)
+        asyncio.set_event_loop(loop)
+        try:
+            results = loop.run_until_complete(self._run_all())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+        if check:
+            for result in results:
+                if result.exit_code:
+                    sys.exit(result.exit_code)
+
+        return results
+
+    def print_summary(self, results):
+        for result in results:
+            txt = "%-*s exit code: %r (%.1f sec.)%s" % (
+                max([len(r.name) for r in results]), result.name, result.exit_code, result.duration,
+                " TIMEOUT" if result.timed_out else ""
+            )
+            if result.exit_code:
+                colorizer.err(txt, foreground="red", flush=True)
+            else:
+                colorizer.out(txt, foreground="green", flush=True)
+
+
+def get_pip_file_name():
+    if sys.platform == 'win32':
+        return "pip3.exe"
+    else:
+        return "pip3"
+
+
+def get_wheelhouse_args(wheelhouse):
+    """
+    Returns the pip arguments to install only from a local wheelhouse directory.
+    Without a wheelhouse: Nothing to add -> use PyPi
+    """
+    if not wheelhouse:
+        return []
+    return ["--no-index", "--find-links", str(wheelhouse)]
+
+
+def get_bin_dir_name():
+    if sys.platform == 'win32':
+        return "Scripts"
+    else:
+        return "bin"
+
+
+def get_cache_path(*parts):
+    """
+    Returns the Path of a bootstrap_env cache sub directory (created on demand)
+    The base directory is ~/.cache/bootstrap_env/ or $BOOTSTRAP_ENV_CACHE_DIR
+    """
+    base_path = os.environ.get(CACHE_DIR_ENV_NAME)
+    if base_path:
+        base_path = Path(base_path).expanduser()
+    else:
+        base_path = Path(os.environ.get("XDG_CACHE_HOME", "~/.cache"), "bootstrap_env").expanduser()
+
+    path = Path(base_path, *parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def clone_file(src, dst, hardlink=False):
+    """
+    Copy one file with the fastest available method:
+        1. hardlink (only if requested: the source must never be modified in-place!)
+        2. os.copy_file_range(): In-kernel copy, reflink on e.g.: btrfs, XFS (Python 3.8+)
+        3. shutil.copyfile() as fallback
+    File permissions are copied, too.
+    """
+    if hardlink:
+        try:
+            os.link(src, dst)
+        except OSError:
+            pass # e.g.: cross-device link -> copy the file
+        else:
+            return
+
+    if hasattr(os, "copy_file_range"):
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            try:
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            except OSError:
+                # Not supported by the filesystem -> copy in user space
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+                shutil.copyfileobj(fsrc, fdst)
+    else:
+        shutil.copyfile(src, dst)
+
+    shutil.copymode(src, dst)
+
+
+def clone_tree(src, dst, hardlink=False, relocate=None, ignore=()):
+    """
+    Clone the directory tree 'src' to 'dst' (must not exist) via clone_file()
+
+    :param relocate: optional tuple (old_path, new_path) to rewrite absolute symlink targets
+    :param ignore: file names in the top level directory that should not be cloned
+    """
+    src = str(src)
+    dst = str(dst)
+    os.makedirs(dst)
+    for root, dirs, files in os.walk(src):
+        dest_root = os.path.join(dst, os.path.relpath(root, src))
+        for name in dirs + files:
+            if root == src and name in ignore:
+                continue
+
+            src_path = os.path.join(root, name)
+            dst_path = os.path.join(dest_root, name)
+            if os.path.islink(src_path):
+                target = os.readlink(src_path)
+                if relocate is not None and target.startswith(relocate[0]):
+                    target = relocate[1] + target[len(relocate[0]):]
+                os.symlink(target, dst_path)
+            elif name in dirs:
+                os.mkdir(dst_path)
+            else:
+                clone_file(src_path, dst_path, hardlink=hardlink)
+
+
+def relocate_venv(env_dir, old_path, new_path):
+    """
+    Rewrite all absolute path references of a virtualenv, after moving it.
+    e.g.: script shebangs, bin/activate*, pyvenv.cfg, *.pth and *.egg-link files
+
+    Changed files will be replaced (not modified in-place), so hardlinks are not affected.
+
+    :return: list of changed files
+    """
+    old_path = os.fsencode(str(old_path))
+    new_path = os.fsencode(str(new_path))
+
+    candidates = [Path(env_dir, "pyvenv.cfg")]
+
+    bin_path = Path(env_dir, get_bin_dir_name())
+    if bin_path.is_dir():
+        candidates += [item for item in bin_path.iterdir() if not item.is_symlink()]
+
+    for root, dirs, files in os.walk(str(env_dir)):
+        for name in files:
+            if name.endswith((".pth", ".egg-link")):
+                candidates.append(Path(root, name))
+
+    changed = []
+    for file_path in candidates:
+        if not file_path.is_file():
+            continue
+
+        with file_path.open("rb") as f:
+            content = f.read()
+
+        if old_path not in content or b"\0" in content: # skip binaries
+            continue
+
+        temp_path = Path(str(file_path) + ".relocate")
+        with temp_path.open("wb") as f:
+            f.write(content.replace(old_path, new_path))
+        shutil.copymode(str(file_path), str(temp_path))
+        os.replace(str(temp_path), str(file_path))
+        changed.append(file_path)
+
+    return changed
+
+
+def parse_wheel_version(wheel_path):
+    """
+    Returns the version tuple from a wheel filename, e.g.:
+        pip-19.0.3-py2.py3-none-any.whl -> (19, 0, 3)
+    """
+    version = []
+    for part in Path(wheel_path).name.split("-")[1].split("."):
+        if not part.isdigit():
+            break
+        version.append(int(part))
+    return tuple(version)
+
+
+class SharedPip:
+    """
+    One pip wheel, cached per host in ~/.cache/bootstrap_env/pip/
+
+    A pip wheel is runable via: "python pip-X.Y-py3-none-any.whl/pip install ..."
+    So a virtualenv doesn't need his own pip installation:
+    The python interpreter from the virtualenv runs the cached pip.
+
+    The cache will be filled with the pip wheel bundled with 'ensurepip'.
+    Only if this is older than MIN_PIP_VERSION a newer pip will be downloaded.
+    """
+    # Debian/Ubuntu doesn't ship the ensurepip/_bundled wheels:
+    SYSTEM_WHEEL_DIRS = ("/usr/share/python-wheels",)
+
+    def __init__(self, wheelhouse=None):
+        self.path = get_cache_path("pip")
+        self.pip_index_args = get_wheelhouse_args(wheelhouse)
+
+    def _newest_wheel(self, *directories):
+        wheels = []
+        for directory in directories:
+            wheels += Path(directory).glob("pip-*.whl")
+        if wheels:
+            return max(wheels, key=parse_wheel_version)
+
+    def get_cached_wheel(self):
+        return self._newest_wheel(self.path)
+
+    def get_bundled_wheel(self):
+        return self._newest_wheel(Path(ensurepip.__file__).parent / "_bundled", *self.SYSTEM_WHEEL_DIRS)
+
+    def is_up_to_date(self):
+        wheel = self.get_cached_wheel()
+        return wheel is not None and parse_wheel_version(wheel) >= MIN_PIP_VERSION
+
+    def get_pip_wheel(self):
+        """
+        Returns the cached pip wheel, fill the cache if needed.
+        """
+        if self.is_up_to_date():
+            return self.get_cached_wheel()
+
+        bundled_wheel = self.get_bundled_wheel()
+        if bundled_wheel is None:
+            raise RuntimeError("No bundled pip wheel found! (Maybe 'python3-venv' package not installed?!?)")
+
+        if parse_wheel_version(bundled_wheel) >= MIN_PIP_VERSION:
+            print(" * Copy bundled pip '%s' into cache: '%s'" % (bundled_wheel, self.path))
+            temp_path = Path(self.path, "%s.tmp%i" % (bundled_wheel.name, os.getpid()))
+            clone_file(str(bundled_wheel), str(temp_path))
+            os.replace(str(temp_path), str(Path(self.path, bundled_wheel.name)))
+        else:
+            print(" * Bundled pip '%s' is too old: Download a newer one." % bundled_wheel)
+            VerboseSubprocess(
+                sys.executable, str(Path(bundled_wheel, "pip")),
+                "download", "--no-deps", "--only-binary", ":all:", "--dest", str(self.path),
+                *self.pip_index_args,
+                "pip>=%s" % ".".join(str(part) for part in MIN_PIP_VERSION)
+            ).verbose_call(check=True)
+
+        return self.get_cached_wheel()
+
+    def get_pip_command(self, python):
+        """
+        :param python: the python interpreter from the virtualenv
+        :return: pip command as list, e.g.: ['/env/bin/python', '/.../pip-19.0.3-py2.py3-none-any.whl/pip']
+        """
+        return [str(python), str(Path(self.get_pip_wheel(), "pip"))]
+
+
+class VenvTemplateCache:
+    """
+    Cache of complete booted virtualenvs ("golden templates")
+
+    The first boot fills the cache with a copy of the new virtualenv.
+    All following boots with the same key, just clone the template
+    and rewrite all absolute path references.
+
+    The cache key contains: Python version, platform, the requirements, a hash
+    of the REQUIREMENTS_LOCK and a hash of the wheelhouse index (if used).
+    Without a lock and without a wheelhouse the installed versions are not known
+    before boot: Then the template will be rebuild after TEMPLATE_MAX_AGE,
+    to pick up new releases from PyPi.
+    """
+    META_FILENAME = "bootstrap_env_template.json"
+
+    def __init__(self, requirements, shared_pip=False, wheelhouse=None):
+        self.key = self.get_key(requirements, shared_pip, wheelhouse)
+        self.path = Path(get_cache_path("templates"), self.key)
+        self.meta_path = Path(self.path, self.META_FILENAME)
+
+        self.max_age = self.get_max_age(requirements, wheelhouse)
+
+    @staticmethod
+    def get_max_age(requirements, wheelhouse=None):
+        """
+        :return: None if the installed versions are pinned, otherwise TEMPLATE_MAX_AGE
+        """
+        pinned = wheelhouse is not None or (bool(REQUIREMENTS_LOCK.strip()) and "-e" not in requirements)
+        return None if pinned else TEMPLATE_MAX_AGE
+
+    @staticmethod
+    def get_key(requirements, shared_pip=False, wheelhouse=None):
+        wheelhouse_index = None
+        if wheelhouse is not None:
+            try:
+                with Path(wheelhouse, WHEELHOUSE_INDEX_FILENAME).open("rb") as f:
+                    wheelhouse_index = hashlib.sha256(f.read()).hexdigest()
+            except FileNotFoundError:
+                wheelhouse_index = str(Path(wheelhouse).resolve())
+
+        data = json.dumps({
+            "package_name": PACKAGE_NAME,
+            "boot_version": __version__,
+            "python": sys.version,
+            "executable": str(Path(sys.executable).resolve()),
+            "platform": sys.platform,
+            "machine": platform.machine(),
+            "requirements": list(requirements),
+            "shared_pip": shared_pip,
+            "requirements_lock": hashlib.sha256(REQUIREMENTS_LOCK.encode("utf-8")).hexdigest(),
+            "wheelhouse_index": wheelhouse_index,
+        }, sort_keys=True)
+        return "%s-%s" % (PACKAGE_NAME, hashlib.sha256(data.encode("utf-8")).hexdigest()[:32])
+
+    def get_created(self):
+        """
+        :return: creation time of the template or None if the meta file is missing or invalid
+        """
+        try:
+            with self.meta_path.open("r") as f:
+                return float(json.load(f)["created"])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return None
+
+    def is_expired(self):
+        """
+        :return: True, if the template must be rebuild (or is incomplete)
+        """
+        created = self.get_created()
+        if created is None:
+            return True
+        return self.max_age is not None and time.time() - created > self.max_age
+
+    def is_filled(self):
+        if not self.meta_path.is_file():
+            return False
+        if self.get_created() is None:
+            print(" * Virtualenv template '%s' meta file is missing or invalid: rebuild it." % self.path)
+            return False
+        if self.is_expired():
+            print(" * Virtualenv template '%s' is older than %i sec.: rebuild it." % (self.path, self.max_age))
+            return False
+        return True
+
+    @traced("template cache store")
+    def store(self, env_dir):
+        """
+        Copy the fresh created virtualenv into the cache.
+        """
+        temp_path = Path("%s.tmp%i" % (self.path, os.getpid()))
+        print(" * Store virtualenv template here: '%s'" % self.path)
+        clone_tree(env_dir, temp_path)
+        with Path(temp_path, self.META_FILENAME).open("w") as f:
+            json.dump({"env_dir": str(env_dir), "created": time.time()}, f)
+
+        old_path = None
+        if self.path.is_dir() and self.is_expired():
+            # Replace a expired template
+            old_path = Path("%s.old%i" % (self.path, os.getpid()))
+            try:
+                os.rename(str(self.path), str(old_path))
+            except OSError:
+                old_path = None # e.g.: replaced by a parallel boot in the meantime
+
+        try:
+            os.rename(str(temp_path), str(self.path))
+        except OSError:
+            # e.g.: filled by a parallel boot in the meantime
+            shutil.rmtree(str(temp_path))
+
+        if old_path is not None:
+            shutil.rmtree(str(old_path))
+
+    @traced("template cache clone")
+    def clone(self, destination, hardlink=False):
+        """
+        Create a new virtualenv in 'destination' by clone the template.
+        """
+        with self.meta_path.open("r") as f:
+            old_env_dir = json.load(f)["env_dir"]
+
+        print(" * Clone virtualenv template '%s' to: '%s'" % (self.path, destination))
+        clone_tree(
+            self.path, destination,
+            hardlink=hardlink,
+            relocate=(old_env_dir, str(destination)),
+            ignore=(self.META_FILENAME,)
+        )
+        changed = relocate_venv(destination, old_env_dir, destination)
+        print(" * %i files relocated." % len(changed))
+
+
+
+class WarmPool:
+    """
+    Pool of complete booted spare virtualenvs, e.g.:
+        ~/.cache/bootstrap_env/pool/<key>/spare-<...>/
+
+    'warm_pool' fills the pool. 'boot --warm-pool' just rename() a spare
+    virtualenv into the destination, rewrite all absolute path references
+    and starts a refill in background.
+
+    The key is the same as for the VenvTemplateCache.
+    The boot 'options' of a spare are stored in its meta file: Only spares
+    with the same options are used. Spares expire like the VenvTemplateCache.
+    Note: rename() works only on the same filesystem: Use $BOOTSTRAP_ENV_CACHE_DIR
+    to move the pool to the filesystem of the destinations.
+    """
+    META_FILENAME = "bootstrap_env_spare.json"
+    CONFIG_FILENAME = "warm_pool.json"
+    LOG_FILENAME = "warm_pool.log"
+
+    def __init__(self, requirements, shared_pip=False, wheelhouse=None, options=None):
+        self.key = VenvTemplateCache.get_key(requirements, shared_pip, wheelhouse)
+        self.path = get_cache_path("pool", self.key)
+        self.config_path = Path(self.path, self.CONFIG_FILENAME)
+        self.options = options or {}
+        self.max_age = VenvTemplateCache.get_max_age(requirements, wheelhouse)
+
+    def read_meta(self, spare):
+        """
+        Returns the meta data of a spare virtualenv or None
+        """
+        try:
+            with Path(spare, self.META_FILENAME).open("r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def is_usable(self, meta):
+        """
+        :return: True, if the spare has the same options and is not expired
+        """
+        if meta is None or meta.get("options") != self.options:
+            return False
+        return self.max_age is None or time.time() - meta.get("created", 0) <= self.max_age
+
+    def get_spares(self):
+        """
+        Returns the Path of all usable spare virtualenvs (oldest first)
+        """
+        return sorted(
+            path for path in self.path.glob("spare-*")
+            if self.is_usable(self.read_meta(path))
+        )
+
+    def remove_unusable(self):
+        """
+        Remove all spares with other options or expired ones.
+        """
+        for spare in self.path.glob("spare-*"):
+            meta = self.read_meta(spare)
+            if meta is None or self.is_usable(meta):
+                continue # not ready or usable
+            old_path = Path(self.path, "old-%s" % spare.name)
+            try:
+                os.rename(str(spare), str(old_path))
+            except OSError:
+                continue # e.g.: taken by a parallel boot
+            print(" * Remove unusable spare virtualenv: '%s'" % spare)
+            shutil.rmtree(str(old_path))
+
+    def read_config(self):
+        """
+        Returns the config of the last 'warm_pool' call or None
+        """
+        try:
+            with self.config_path.open("r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_config(self, size, command):
+        temp_path = Path("%s.%i.tmp" % (self.config_path, os.getpid()))
+        with temp_path.open("w") as f:
+            json.dump({"size": size, "command": command}, f)
+        os.replace(str(temp_path), str(self.config_path))
+
+    @traced("warm pool take")
+    def take(self, destination):
+        """
+        Move a spare virtualenv to 'destination' (must not exist)
+
+        :return: True if a spare virtualenv was used
+        """
+        for spare in self.get_spares():
+            meta = self.read_meta(spare)
+            if meta is None:
+                continue # taken by a parallel boot
+            try:
+                os.rename(str(spare), str(destination))
+            except FileNotFoundError:
+                continue # taken by a parallel boot
+            except OSError as err:
+                # e.g.: destination on a other filesystem
+                print(" * Can't use warm pool %s: %s" % (self.path, err))
+                return False
+
+            Path(destination, self.META_FILENAME).unlink()
+            changed = relocate_venv(destination, meta["env_dir"], destination)
+            print(" * Spare virtualenv '%s' moved to: '%s' (%i files relocated)" % (spare, destination, len(changed)))
+            return True
+
+        print(" * No spare virtualenv in warm pool: %s" % self.path)
+        return False
+
+    @contextlib.contextmanager
+    def fill_lock(self):
+        """
+        Only one process should fill the pool.
+        :return: False if the lock is hold by another process
+        """
+        with Path(self.path, "fill.lock").open("w") as f:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    yield False
+                    return
+            yield True
+
+    def fill(self, size, boot_func):
+        """
+        Create spare virtualenvs until the pool contains 'size' of them.
+
+        :param boot_func: callable that creates a virtualenv in the given Path
+        :return: number of new created spare virtualenvs
+        """
+        with self.fill_lock() as locked:
+            if not locked:
+                print(" * Warm pool is filled by another process: %s" % self.path)
+                return 0
+
+            self.remove_unusable()
+
+            count = 0
+            while len(self.get_spares()) < size:
+                env_dir = Path(self.path, "building-%i-%i" % (os.getpid(), count))
+                if env_dir.exists():
+                    shutil.rmtree(str(env_dir))
+
+                try:
+                    boot_func(env_dir)
+                except SystemExit as err:
+                    if env_dir.exists():
+                        shutil.rmtree(str(env_dir))
+                    raise RuntimeError("Boot spare virtualenv failed: %s" % err.code)
+
+                with Path(env_dir, self.META_FILENAME).open("w") as f:
+                    json.dump({"env_dir": str(env_dir), "created": time.time(), "options": self.options}, f)
+
+                # The name sorts by creation time: take() uses the oldest spare first
+                spare = Path(self.path, "spare-%.6f-%i" % (time.time(), os.getpid()))
+                os.rename(str(env_dir), str(spare))
+                count += 1
+                print(" * Spare virtualenv ready: '%s' (%i/%i)" % (spare, len(self.get_spares()), size))
+            return count
+
+    def start_refill(self):
+        """
+        Start the last 'warm_pool' command in background (output in warm_pool.log)
+        """
+        config = self.read_config()
+        if config is None:
+            print(" * No warm pool config in: %s (Hint: call 'warm_pool' first)" % self.path)
+            return
+
+        if len(self.get_spares()) >= config["size"]:
+            return
+
+        kwargs = {}
+        if sys.platform != "win32":
+            kwargs["start_new_session"] = True # Don't stop the refill with the boot process
+        with Path(self.path, self.LOG_FILENAME).open("ab") as log:
+            subprocess.Popen(
+                [sys.executable, str(get_self_archive() or SELF_FILE_PATH), config["command"]],
+                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, close_fds=True,
+                **kwargs
+            )
+        print(" * Refill warm pool in background (log: '%s')" % Path(self.path, self.LOG_FILENAME))
+
+
+# Same as pip generates for 'console_scripts' and 'gui_scripts' entry points:
+ENTRY_POINT_SCRIPT = r"""#!%(python)s
+# -*- coding: utf-8 -*-
+import re
+import sys
+from %(module)s import %(import_name)s
+if __name__ == '__main__':
+    sys.argv[0] = re.sub(r'(-script\.pyw|\.exe)?$', '', sys.argv[0])
+    sys.exit(%(func)s())
+"""
+
+
+def get_scheme_paths(env_dir):
+    """
+    Returns the install directories ('purelib', 'platlib', 'scripts', 'data', ...) of a virtualenv.
+    """
+    env_dir = str(env_dir)
+    scheme = "nt" if os.name == "nt" else "posix_prefix"
+    return sysconfig.get_paths(scheme, vars={
+        "base": env_dir, "platbase": env_dir, "installed_base": env_dir, "installed_platbase": env_dir,
+    })
+
+
+def normalize_project_name(name):
+    """
+    https://www.python.org/dev/peps/pep-0503/#normalized-names
+
+    >>> normalize_project_name("Foo.Bar_baz")
+    'foo-bar-baz'
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def get_abi_tag():
+    """
+    Returns the ABI wheel tag of the running CPython, e.g.: 'cp37m', 'cp311'
+    or None for other implementations.
+    """
+    soabi = sysconfig.get_config_var("SOABI")
+    if soabi and soabi.startswith("cpython-"):
+        return "cp" + soabi.split("-")[1] # e.g.: 'cpython-37m-x86_64-linux-gnu'
+    if soabi and soabi.startswith("cp"):
+        return soabi.split("-")[0] # e.g.: 'cp313-win_amd64'
+    if platform.python_implementation() == "CPython":
+        return "cp%i%i" % sys.version_info[:2]
+
+
+# glibc versions of the legacy manylinux tags:
+LEGACY_MANYLINUX = {"manylinux1": (2, 5), "manylinux2010": (2, 12), "manylinux2014": (2, 17)}
+
+
+def is_platform_supported(platform_tag):
+    """
+    Simplified check of a platform wheel tag against the running interpreter.
+    Unknown tags (e.g.: musllinux) are not supported: pip will handle these wheels.
+    """
+    if platform_tag == "any":
+        return True
+    current = sysconfig.get_platform().replace("-", "_").replace(".", "_") # e.g.: 'linux_x86_64'
+    if platform_tag == current:
+        return True
+
+    if sys.platform.startswith("linux"):
+        match = re.match(r"^(manylinux1|manylinux2010|manylinux2014|manylinux_(\d+)_(\d+))_(.+)$", platform_tag)
+        libc_name, libc_version = platform.libc_ver()
+        if match is None or libc_name != "glibc" or match.group(4) != platform.machine():
+            return False
+        if match.group(2) is None:
+            required = LEGACY_MANYLINUX[match.group(1)]
+        else:
+            required = (int(match.group(2)), int(match.group(3)))
+        return tuple(int(part) for part in libc_version.split(".")[:2]) >= required
+
+    if sys.platform == "darwin":
+        match = re.match(r"^macosx_(\d+)_(\d+)_(.+)$", platform_tag)
+        if match is None or match.group(3) not in (platform.machine(), "universal2"):
+            return False
+        mac_version = tuple(int(part) for part in platform.mac_ver()[0].split(".")[:2])
+        return (int(match.group(1)), int(match.group(2))) <= mac_version
+
+    return False
+
+
+def is_wheel_supported(wheel_path):
+    """
+    Check the tags from the wheel filename against the running interpreter, e.g.:
+        foo-1.0-py3-none-any.whl -> True
+        foo-1.0-cp27-cp27mu-manylinux1_x86_64.whl -> False
+    """
+    parts = Path(wheel_path).name[:-len(".whl")].split("-")
+    if len(parts) not in (5, 6): # with optional build tag
+        return False
+    python_tags, abi_tags, platform_tags = (tag.split(".") for tag in parts[-3:])
+
+    if not any(is_platform_supported(platform_tag) for platform_tag in platform_tags):
+        return False
+
+    major, minor = sys.version_info[:2]
+    abi_tag = get_abi_tag()
+    for python_tag in python_tags:
+        match = re.match(r"^(py|cp)(\d)(\d*)$", python_tag)
+        if match is None or int(match.group(2)) != major:
+            continue
+        tag_minor = int(match.group(3)) if match.group(3) else 0
+        for abi in abi_tags:
+            if abi == "none" and match.group(1) == "py" and tag_minor <= minor:
+                return True
+            if abi_tag is None or match.group(1) != "cp":
+                continue
+            if abi == "abi3" and tag_minor <= minor:
+                return True
+            if abi in ("none", abi_tag) and tag_minor == minor:
+                return True
+    return False
+
+
+def get_installed_projects(scheme_paths):
+    """
+    Returns the normalized names of all projects installed in the 'purelib' and 'platlib' directories.
+    """
+    projects = set()
+    for lib_dir in {scheme_paths["purelib"], scheme_paths["platlib"]}:
+        for dist_info in Path(lib_dir).glob("*.dist-info"):
+            projects.add(normalize_project_name(dist_info.name.split("-", 1)[0]))
+    return projects
+
+
+def collect_wheels(wheelhouse):
+    """
+    Returns the newest wheel file of every project in the given directory.
+    (Only wheels that are supported by the running interpreter, see: is_wheel_supported())
+    """
+    wheels = {}
+    for wheel_path in Path(wheelhouse).glob("*.whl"):
+        if not is_wheel_supported(wheel_path):
+            continue
+        project_name = normalize_project_name(wheel_path.name.split("-", 1)[0])
+        current = wheels.get(project_name)
+        if current is None or parse_wheel_version(wheel_path) > parse_wheel_version(current):
+            wheels[project_name] = wheel_path
+    return [wheels[name] for name in sorted(wheels)]
+
+
+def _record_hash(hash_obj):
+    return "sha256=%s" % base64.urlsafe_b64encode(hash_obj.digest()).rstrip(b"=").decode("ascii")
+
+
+def _write_file(target, chunks):
+    """
+    Write all bytes chunks into 'target' and returns the RECORD hash and size.
+    """
+    hash_obj = hashlib.sha256()
+    size = 0
+    with open(target, "wb") as f:
+        for chunk in chunks:
+            hash_obj.update(chunk)
+            size += len(chunk)
+            f.write(chunk)
+    return _record_hash(hash_obj), size
+
+
+def _iter_member(wheel, info, chunk_size=64 * 1024):
+    with wheel.open(info) as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            yield chunk
+
+
+def _record_hexdigest(hash_value):
+    """
+    e.g.: "sha256=<urlsafe base64>" from a RECORD file -> sha256 hexdigest or None
+    """
+    algorithm, _, value = hash_value.partition("=")
+    if algorithm != "sha256" or not value:
+        return None
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).hex()
+
+
+def install_wheel(wheel_path, scheme_paths, python_exe, store=None):
+    """
+    Install one wheel file into a virtualenv, without pip:
+        * extract all files (incl. *.data/ directories)
+        * generate 'console_scripts' and 'gui_scripts' entry point scripts
+        * write INSTALLER and RECORD
+
+    With a PackageStore, files already in the store are hardlinked (by the RECORD
+    hash of the wheel) and all other extracted files are added to the store.
+    (Except private files, see: PackageStore.is_private())
+
+    Used in a process pool via install_wheels()
+
+    :return: (wheel filename, number of installed files)
+    """
+    with zipfile.ZipFile(str(wheel_path)) as wheel:
+        dist_info = None
+        for name in wheel.namelist():
+            top_dir = name.split("/", 1)[0]
+            if top_dir.endswith(".dist-info") and name == "%s/WHEEL" % top_dir:
+                dist_info = top_dir
+                break
+        if dist_info is None:
+            raise ValueError("No *.dist-info/WHEEL found in: %s" % wheel_path)
+
+        wheel_meta = wheel.read("%s/WHEEL" % dist_info).decode("utf-8").lower()
+        if "root-is-purelib: true" in wheel_meta:
+            lib_dir = scheme_paths["purelib"]
+        else:
+            lib_dir = scheme_paths["platlib"]
+
+        data_dir = dist_info[:-len(".dist-info")] + ".data"
+        record_path = "%s/RECORD" % dist_info
 
-        self.kwargs["env"] = env
+        wheel_records = {}
+        if store is not None and record_path in wheel.namelist():
+            lines = wheel.read(record_path).decode("utf-8").splitlines()
+            for row in csv.reader(lines):
+                if len(row) >= 2 and row[1]:
+                    wheel_records[row[0]] = row[1]
 
-    def print_call_info(self):
-        print("")
-        print("_"*79)
+        records = []
 
-        kwargs_txt=[]
-        for key, value in self.kwargs.items():
-            if key == "env":
+        def add_record(target, hash_value, size):
+            path = os.path.relpath(target, lib_dir).replace(os.sep, "/")
+            records.append((path, hash_value, size))
+
+        for info in wheel.infolist():
+            name = info.filename
+            if name.endswith("/") or name == record_path:
                 continue
-            key = colorizer.colorize(key, foreground="magenta", opts=("bold",))
-            value = colorizer.colorize(value, foreground="green", opts=("bold",))
-            kwargs_txt.append("%s=%s" % (key, value))
 
-        txt = "Call: '{args}' with: {kwargs}".format(
-            args=colorizer.colorize(self.args_str, foreground="cyan", opts=("bold",)),
-            kwargs=", ".join(kwargs_txt)
-        )
+            scheme = None
+            if name.startswith(data_dir + "/"):
+                scheme, _, name = name[len(data_dir) + 1:].partition("/")
+                target_dir = scheme_paths["include" if scheme == "headers" else scheme]
+            else:
+                target_dir = lib_dir
+
+            target = os.path.normpath(os.path.join(target_dir, name))
+            if not target.startswith(os.path.join(target_dir, "")):
+                raise ValueError("Invalid path %r in: %s" % (info.filename, wheel_path))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+
+            if scheme == "scripts":
+                content = wheel.read(info)
+                for placeholder in (b"#!pythonw", b"#!python"):
+                    if content.startswith(placeholder):
+                        content = b"#!" + os.fsencode(str(python_exe)) + content[len(placeholder):]
+                        break
+                hash_value, size = _write_file(target, [content])
+                os.chmod(target, 0o755)
+            else:
+                executable = bool((info.external_attr >> 16) & 0o111)
+                hash_value = wheel_records.get(info.filename)
+                digest = _record_hexdigest(hash_value) if hash_value else None
+                shared = store is not None and not store.is_private(target)
+                if shared and digest is not None and store.link(digest, executable, target):
+                    size = info.file_size
+                else:
+                    hash_value, size = _write_file(target, _iter_member(wheel, info))
+                    if executable:
+                        os.chmod(target, 0o755)
+                    if shared:
+                        store.add_file(target, digest=_record_hexdigest(hash_value))
+
+            add_record(target, hash_value, size)
+
+        entry_points_path = "%s/entry_points.txt" % dist_info
+        if entry_points_path in wheel.namelist():
+            entry_points = configparser.ConfigParser(delimiters=("=",))
+            entry_points.optionxform = str # entry point names are case sensitive
+            entry_points.read_string(wheel.read(entry_points_path).decode("utf-8"))
+
+            for section in ("console_scripts", "gui_scripts"):
+                if not entry_points.has_section(section):
+                    continue
+                for script_name, entry_point in entry_points.items(section):
+                    module, _, func = entry_point.split("[")[0].strip().partition(":")
+                    content = ENTRY_POINT_SCRIPT % {
+                        "python": python_exe,
+                        "module": module,
+                        "import_name": func.split(".")[0],
+                        "func": func,
+                    }
+                    target = os.path.join(scheme_paths["scripts"], script_name)
+                    os.makedirs(scheme_paths["scripts"], exist_ok=True)
+                    hash_value, size = _write_file(target, [content.encode("utf-8")])
+                    os.chmod(target, 0o755)
+                    add_record(target, hash_value, size)
+
+        target = os.path.join(lib_dir, dist_info, "INSTALLER")
+        hash_value, size = _write_file(target, [b"bootstrap_env\n"])
+        add_record(target, hash_value, size)
+
+        with open(os.path.join(lib_dir, record_path), "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerows(records)
+            writer.writerow((record_path, "", ""))
+
+    return (Path(wheel_path).name, len(records))
+
+
+@traced("install_wheels")
+def install_wheels(wheel_paths, env_dir, python_exe, max_workers=None, store=None):
+    """
+    Install the given (already resolved) wheel files in parallel into a virtualenv.
+    All dependencies must be in 'wheel_paths': Nothing will be resolved here!
 
-        if self.env_updates is not None:
-            txt += colorizer.colorize(" env:", foreground="magenta", opts=("bold",))
-            txt += colorizer.colorize(repr(self.env_updates), opts=("bold",))
+    Projects that are already installed (e.g.: pip from ensurepip) are skipped:
+    Unpack a wheel over a existing installation would leave two *.dist-info and stale files.
 
-        print(txt)
-        print("", flush=True)
+    :param store: optional PackageStore to link/store the installed files
+    """
+    scheme_paths = get_scheme_paths(env_dir)
+    installed = get_installed_projects(scheme_paths)
+    skipped = [
+        wheel_path for wheel_path in wheel_paths
+        if normalize_project_name(Path(wheel_path).name.split("-", 1)[0]) in installed
+    ]
+    if skipped:
+        print(" * Skip already installed: %s" % ", ".join(Path(wheel_path).name for wheel_path in skipped))
+        wheel_paths = [wheel_path for wheel_path in wheel_paths if wheel_path not in skipped]
+    print(" * Install %i wheels in parallel into: %s" % (len(wheel_paths), env_dir))
+    start_time = time.time()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(install_wheel, str(wheel_path), scheme_paths, str(python_exe), store)
+            for wheel_path in wheel_paths
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            filename, file_count = future.result()
+            print("\t%s (%i files)" % (filename, file_count))
+    print(" * %i wheels installed in %.1f sec." % (len(wheel_paths), time.time() - start_time))
+
+
+def get_self_archive():
+    """
+    Returns the Path of the zipapp, if this file runs from a '.pyz' archive
+    (created with the 'export_zipapp' admin command) or None
+    """
+    archive_path = SELF_FILE_PATH.parent # e.g.: .../boot_foobar.pyz/__main__.py
+    if archive_path.is_file() and zipfile.is_zipfile(str(archive_path)):
+        return archive_path
 
-    def print_exit_code(self, exit_code):
-        txt = "\nExit code %r from %r\n" % (exit_code, self.args_str)
-        if exit_code:
-            colorizer.err(txt, foreground="red", flush=True)
-        else:
-            colorizer.out(txt, foreground="green", flush=True)
 
-    def verbose_call(self, check=True):
-        """
-        run subprocess.call()
+@traced("extract_zipapp_wheels")
+def extract_zipapp_wheels(archive_path):
+    """
+    Extract the embedded wheels of a zipapp into a wheelhouse directory in the cache, e.g.:
+        ~/.cache/bootstrap_env/zipapp/<hash of the embedded index>/
 
-        :param check: if True and subprocess exit_code !=0: sys.exit(exit_code) after run.
-        :return: process exit code
-        """
-        self.print_call_info()
+    The wheels are streamed from the archive and checked against the sha256 from the index.
+    The index file is written at last: A existing index marks a complete extraction,
+    so the next boot with the same zipapp extracts nothing.
 
-        try:
-            exit_code = subprocess.call(self.popenargs, **self.kwargs)
-        except KeyboardInterrupt:
-            print("\nExit %r\n" % self.args_str, flush=True)
-            exit_code=None # good idea?!?
+    :return: Path of the wheelhouse directory
+    """
+    with zipfile.ZipFile(str(archive_path)) as archive:
+        index_data = archive.read("%s/%s" % (ZIPAPP_WHEELS_DIR, WHEELHOUSE_INDEX_FILENAME))
+        wheelhouse = get_cache_path("zipapp", hashlib.sha256(index_data).hexdigest()[:16])
+        index_path = Path(wheelhouse, WHEELHOUSE_INDEX_FILENAME)
+        if index_path.is_file():
+            print(" * Use extracted wheels from: '%s'" % wheelhouse)
+            return wheelhouse
+
+        index = json.loads(index_data.decode("utf-8"))
+        print(" * Extract %i wheels into: '%s'" % (len(index["wheels"]), wheelhouse))
+        for wheel in index["wheels"]:
+            info = archive.getinfo("%s/%s" % (ZIPAPP_WHEELS_DIR, wheel["filename"]))
+            target = Path(wheelhouse, wheel["filename"])
+            temp_path = Path("%s.%i.tmp" % (target, os.getpid()))
+            hash_value, _ = _write_file(str(temp_path), _iter_member(archive, info))
+            if _record_hexdigest(hash_value) != wheel["sha256"]:
+                temp_path.unlink()
+                raise RuntimeError("Hash mismatch of %r in: %s" % (wheel["filename"], archive_path))
+            os.replace(str(temp_path), str(target))
+
+        temp_path = Path("%s.%i.tmp" % (index_path, os.getpid()))
+        with temp_path.open("wb") as f:
+            f.write(index_data)
+        os.replace(str(temp_path), str(index_path))
+    return wheelhouse
+
+
+def _replace_with_link(src, dst):
+    """
+    Replace 'dst' with a hardlink to 'src' (atomic, 'dst' may exist)
+    """
+    temp_path = "%s.%i.store" % (dst, os.getpid())
+    os.link(str(src), temp_path)
+    os.replace(temp_path, str(dst))
 
-        sys.stderr.flush()
 
-        self.print_exit_code(exit_code)
-        if check and exit_code:
-            sys.exit(exit_code)
+def _replace_with_copy(path):
+    """
+    Replace the hardlink 'path' with a private copy (atomic)
+    """
+    temp_path = "%s.%i.copy" % (path, os.getpid())
+    shutil.copy2(str(path), temp_path)
+    os.replace(temp_path, str(path))
 
-        return exit_code
 
-    def verbose_output(self, check=True):
-        """
-        run subprocess.check_output()
+class PackageStore:
+    """
+    Content-addressed file store, shared by all virtualenvs on this host.
+    (opt-in via: 'boot --package-store')
 
-        :param check: if True and subprocess exit_code !=0: sys.exit(exit_code) after run.
-        :return: process output
-        """
-        self.print_call_info()
+    Every installed file is stored once in: ~/.cache/bootstrap_env/store/<xx>/<sha256>[.x]
+    and hardlinked into the site-packages of all virtualenvs.
 
-        try:
-            return subprocess.check_output(self.popenargs, **self.kwargs)
-        except subprocess.CalledProcessError as err:
-            print("\n%s" % err)
-            if check:
-                sys.exit(err.returncode)
-            raise
+    The hardlink count is the reference count: A object with only one link
+    is not used by any virtualenv anymore and will be removed by gc()
 
-    def iter_output(self, check=True):
-        """
-        A subprocess with tee ;)
-        """
-        self.print_call_info()
+    Note: Works only if the store and the virtualenvs are on the same filesystem.
+    Stored files must never be modified in-place! (pip replace files)
+    Files that are written in-place (e.g.: easy-install.pth by setuptools) or
+    that are specific to one virtualenv are never stored, see: is_private()
+    """
+    # Marker file in the virtualenv, so 'update_env' will add new files to the store, too.
+    MARKER_FILENAME = "bootstrap_env_package_store"
 
-        orig_timeout = self.kwargs.pop("timeout")
+    # e.g.: *.pth and *.egg-link are rewritten in-place, *.pyc contains absolute paths
+    PRIVATE_SUFFIXES = (".pth", ".egg-link", ".pyc", ".pyo")
+    PRIVATE_DIST_INFO_FILES = ("RECORD", "INSTALLER")
 
-        self.kwargs.update({
-            "stdout":subprocess.PIPE,
-            "stderr":subprocess.STDOUT,
-        })
+    def __init__(self):
+        self.path = get_cache_path("store")
 
-        proc=subprocess.Popen(self.popenargs, **self.kwargs)
+    def get_object_path(self, digest, executable=False):
+        if executable:
+            # Same content but other file mode -> different object
+            return Path(self.path, digest[:2], "%s.x" % digest)
+        return Path(self.path, digest[:2], digest)
+
+    @classmethod
+    def is_private(cls, file_path):
+        """
+        :return: True, if the file must be a private copy in the virtualenv
+        """
+        parent, name = os.path.split(str(file_path))
+        parent_name = os.path.basename(parent)
+        if name.endswith(cls.PRIVATE_SUFFIXES) or parent_name == "__pycache__":
+            return True
+        return parent_name.endswith(".dist-info") and name in cls.PRIVATE_DIST_INFO_FILES
 
-        end_time = time.time() + orig_timeout
-        for line in iter(proc.stdout.readline, ''):
-            yield line
+    def link(self, digest, executable, target):
+        """
+        Hardlink a stored object to 'target'
+        :return: False, if the object is not in the store
+        """
+        try:
+            _replace_with_link(self.get_object_path(digest, executable), target)
+        except FileNotFoundError:
+            return False
+        return True
 
-            if time.time()>end_time:
-                raise subprocess.TimeoutExpired(self.popenargs, orig_timeout)
+    def add_file(self, file_path, digest=None):
+        """
+        Add one file to the store and replace it with a hardlink to the stored object.
+        :return: True, if the content was already in the store
+        """
+        file_stat = os.stat(str(file_path))
+        if digest is None:
+            hash_obj = hashlib.sha256()
+            with open(str(file_path), "rb") as f:
+                for chunk in iter(lambda: f.read(64 * 1024), b""):
+                    hash_obj.update(chunk)
+            digest = hash_obj.hexdigest()
+
+        object_path = self.get_object_path(digest, executable=bool(file_stat.st_mode & 0o111))
+        try:
+            object_stat = os.stat(str(object_path))
+        except FileNotFoundError:
+            object_path.parent.mkdir(exist_ok=True)
+            try:
+                os.link(str(file_path), str(object_path))
+            except FileExistsError:
+                pass # stored by a other process in the meantime
+            else:
+                return False
+        else:
+            if os.path.samestat(file_stat, object_stat):
+                return True # already linked
 
-        if check and proc.returncode:
-            sys.exit(proc.returncode)
+        _replace_with_link(object_path, file_path)
+        return True
 
-    def print_output(self, check=True):
-        for line in self.iter_output(check=check):
-            print(line, flush=True)
+    def add_tree(self, directory):
+        """
+        Add all files (no symlinks) under 'directory' to the store.
+        Private files are skipped (or replaced by a copy, if they are hardlinked).
+        :return: (number of files, number of files that were already in the store)
+        """
+        total = known = 0
+        for root, dirs, files in os.walk(str(directory)):
+            for name in files:
+                file_path = os.path.join(root, name)
+                if os.path.islink(file_path):
+                    continue
+                if self.is_private(file_path):
+                    if os.stat(file_path).st_nlink > 1:
+                        _replace_with_copy(file_path) # e.g.: linked by a older version
+                    continue
+                total += 1
+                if self.add_file(file_path):
+                    known += 1
+        return total, known
+
+    @traced("package store add_env")
+    def add_env(self, env_dir):
+        """
+        Add all site-packages files of the virtualenv to the store.
+        """
+        env_dir = Path(env_dir)
+        scheme_paths = get_scheme_paths(env_dir)
+        print(" * Add site-packages of '%s' to package store: %s" % (env_dir, self.path))
+        start_time = time.time()
+        total = known = 0
+        try:
+            for lib_dir in sorted(set([scheme_paths["purelib"], scheme_paths["platlib"]])):
+                count, stored = self.add_tree(lib_dir)
+                total += count
+                known += stored
+        except OSError as err:
+            if err.errno != errno.EXDEV:
+                raise
+            print("WARNING: Package store not usable (not on the same filesystem): %s" % err)
+            return
 
+        Path(env_dir, self.MARKER_FILENAME).touch()
+        print(" * %i files linked (%i already stored) in %.1f sec." % (total, known, time.time() - start_time))
 
-def get_pip_file_name():
-    if sys.platform == 'win32':
-        return "pip3.exe"
-    else:
-        return "pip3"
+    def iter_objects(self):
+        for item in os.scandir(str(self.path)):
+            if item.is_dir(follow_symlinks=False):
+                for entry in os.scandir(item.path):
+                    yield entry
 
+    def get_stats(self):
+        """
+        :return: (number of objects, used bytes, bytes saved by hardlinks)
+        """
+        count = used = saved = 0
+        for entry in self.iter_objects():
+            entry_stat = entry.stat(follow_symlinks=False)
+            count += 1
+            used += entry_stat.st_size
+            # The first link into a virtualenv is not saved space:
+            saved += entry_stat.st_size * max(entry_stat.st_nlink - 2, 0)
+        return count, used, saved
+
+    def gc(self):
+        """
+        Remove all objects that are not linked into any virtualenv anymore.
+        :return: (number of removed objects, freed bytes)
+        """
+        removed = freed = 0
+        for entry in self.iter_objects():
+            entry_stat = entry.stat(follow_symlinks=False)
+            if entry_stat.st_nlink == 1:
+                os.remove(entry.path)
+                removed += 1
+                freed += entry_stat.st_size
+        return removed, freed
 
 
 class DisplayErrors:
@@ -371,20 +2020,91 @@ class DisplayErrors:
     def __init__(self, func):
         self.func = func
 
+    def __get__(self, instance, owner):
+        # Bind the decorated method to the instance
+        if instance is None:
+            return self
+        return functools.partial(self.__call__, instance)
+
     def __call__(self, *args, **kwargs):
         try:
-            self.func(*args, **kwargs)
+            return self.func(*args, **kwargs)
         except Exception as err:
             traceback.print_exc(file=sys.stderr)
             return "%s: %s" % (err.__class__.__name__, err)
 
 
+class DirectoryListingCache:
+    """
+    Small TTL/LRU cache of the sorted sub directory names of a directory.
+    Used for path completion: Listing huge directories (or network mounts) is slow.
+
+    A entry is used again, if the directory mtime is the same and it's not older than 'ttl'.
+    """
+    def __init__(self, max_size=32, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl # sec.
+        self.entries = collections.OrderedDict() # path -> (mtime, timestamp, names)
+
+    def get_dir_names(self, path):
+        """
+        Returns a sorted list of all sub directory names in 'path'
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return []
+
+        now = time.monotonic()
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == mtime and now - entry[1] < self.ttl:
+            self.entries.move_to_end(path)
+            return entry[2]
+
+        names = []
+        try:
+            for dir_entry in os.scandir(path):
+                try:
+                    # Use d_type from scandir: stat() is only needed for symlinks
+                    if dir_entry.is_dir():
+                        names.append(dir_entry.name)
+                except OSError:
+                    pass # e.g.: broken symlink
+        except OSError:
+            return []
+        names.sort()
+
+        self.entries[path] = (mtime, now, names)
+        self.entries.move_to_end(path)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return names
+
+    def complete(self, path, prefix, max_count=None):
+        """
+        Returns the sorted sub directory names in 'path' that starts with 'prefix' (max. 'max_count')
+        """
+        names = self.get_dir_names(path)
+        # The names are sorted -> all matches are in one block:
+        index = bisect.bisect_left(names, prefix)
+        result = []
+        for name in itertools.islice(names, index, None):
+            if not name.startswith(prefix) or len(result) == max_count:
+                break
+            result.append(name)
+        return result
+
+
 
 class Cmd2(cmd.Cmd):
     """
     Enhanced version of 'Cmd' class:
         - command alias
         - methods can be called directly from commandline: e.g.: ./foobar.py --help
+        - batch mode: run many commands in one process, e.g.:
+            ./foobar.py "update_env; pip_freeze"
+            ./foobar.py --batch commands.txt    (use "-" for stdin)
+          Stop on the first failed command, or run all with: --keep-going
         - Display
     """
     version = __version__
@@ -401,6 +2121,10 @@ class Cmd2(cmd.Cmd):
     complete_hint="\nUse <{key}> to command completion.\n"
     missing_complete="\n(Sorry, no command completion available.)\n" # if 'readline' not available
 
+    # Used in self._complete_path() for all instances:
+    dir_listing_cache = DirectoryListingCache()
+    max_path_completions = 500
+
     def __init__(self, *args, self_filename=None, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -409,10 +2133,92 @@ class Cmd2(cmd.Cmd):
         self.prompt = self.get_prompt()
         self.doc_header = self.get_doc_header()
 
+        self.batch_mode = False
+        self.keep_going = False
+        self.exit_code = 0
+        self.failed_commands = [] # list of (command line, exit code)
+
         # e.g.: $ bootstrap_env_admin.py boot /tmp/bootstrap_env-env -> run self.do_boot("/tmp/bootstrap_env-env") on startup
         args = sys.argv[1:]
         if args:
-            self.cmdqueue = [" ".join(args)]
+            self.cmdqueue = self.get_batch_commands(args)
+            self.batch_mode = True
+
+    @staticmethod
+    def split_commands(line):
+        """
+        Split a command line on all ";" that are not quoted, e.g.:
+            update_env; pip_freeze -> ['update_env', ' pip_freeze']
+            pip_install "foo; python_version<'3.8'" -> not split
+        """
+        commands = []
+        start = 0
+        quote = None
+        escaped = False
+        for pos, char in enumerate(line):
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif quote is not None:
+                if char == quote:
+                    quote = None
+            elif char in ("'", '"'):
+                quote = char
+            elif char == ";":
+                commands.append(line[start:pos])
+                start = pos + 1
+        commands.append(line[start:])
+        return commands
+
+    def get_batch_commands(self, args):
+        """
+        Returns the commands from the commandline arguments, e.g.:
+            ["boot", "/tmp/foo"] -> ["boot /tmp/foo"]
+            ["update_env", ";", "pip_freeze"] -> ["update_env", "pip_freeze"]
+            ["update_env; pip_freeze"] -> ["update_env", "pip_freeze"]
+            ["--batch", "commands.txt"] -> all lines of 'commands.txt' (use "-" for stdin)
+            ["--keep-going", ...] -> Don't stop on the first failed command
+
+        Many arguments are only split on a standalone ";" argument, so a argument
+        can contain a ";", e.g.: ["pip_install", 'foo; python_version<"3.8"']
+        A single argument or a line of a batch file is split on every not quoted ";"
+        """
+        lines = []
+        while args and args[0] in ("--batch", "--keep-going"):
+            if args[0] == "--keep-going":
+                self.keep_going = True
+                args = args[1:]
+                continue
+
+            if len(args) < 2:
+                print("ERROR: Missing file name for '--batch'")
+                sys.exit(1)
+            if args[1] == "-":
+                lines += sys.stdin.read().splitlines()
+            else:
+                with open(args[1], "r") as f:
+                    lines += f.read().splitlines()
+            args = args[2:]
+
+        commands = []
+        for line in lines:
+            commands += self.split_commands(line)
+
+        if len(args) == 1:
+            # e.g.: ./foobar.py "update_env; pip_freeze"
+            commands += self.split_commands(args[0])
+        elif args:
+            command = []
+            for arg in args + [";"]:
+                if arg == ";":
+                    commands.append(" ".join(command))
+                    command = []
+                else:
+                    command.append(arg)
+
+        commands = [command.strip() for command in commands]
+        return [command for command in commands if command and not command.startswith("#")]
 
     def get_self_filename(self, self_filename):
         if self_filename is None:
@@ -444,6 +2250,7 @@ class Cmd2(cmd.Cmd):
     def default(self, line):
         """ Called on an input line when the command prefix is not recognized. """
         colorizer.err(self.unknown_command % line, foreground="red")
+        self.exit_code = 1
 
     @DisplayErrors
     def _complete_list(self, items, text, line, begidx, endidx):
@@ -473,22 +2280,14 @@ class Cmd2(cmd.Cmd):
         if destination=="~":
             return [os.sep]
 
-        destination = Path(destination).expanduser().resolve()
-
-        if not destination.is_dir():
-            destination = destination.parent.resolve()
-
-        if destination.is_dir():
-            complete_list = [x.stem + os.sep for x in destination.iterdir() if x.is_dir()]
-            if text:
-                if text in complete_list:
-                    return [text + os.sep]
-
-                complete_list = [x for x in complete_list if x.startswith(text)]
-        else:
-            complete_list = []
+        # 'text' is the last path component: complete in the directory before it
+        # Note: Don't use Path().resolve(): It's slow on network mounts
+        destination = os.path.abspath(os.path.dirname(os.path.expanduser(destination)))
 
-        return complete_list
+        return [
+            name + os.sep
+            for name in self.dir_listing_cache.complete(destination, text, max_count=self.max_path_completions)
+        ]
 
     def get_doc_line(self, command):
         """
@@ -539,6 +2338,23 @@ class Cmd2(cmd.Cmd):
         print("\n\nbye")
         return True
 
+    def onecmd(self, line):
+        self.exit_code = 0
+        with tracer.span("command: %s" % line.split(" ", 1)[0], category="command"):
+            if not self.batch_mode:
+                return super().onecmd(line)
+
+            try:
+                return super().onecmd(line)
+            except SystemExit as err:
+                # e.g.: sys.exit(1) on errors or sys.exit(0) after 'update_env'
+                # -> The next command should run, see self.postcmd()
+                if err.code is None or isinstance(err.code, int):
+                    self.exit_code = err.code or 0
+                else:
+                    print(err.code, file=sys.stderr)
+                    self.exit_code = 1
+
     def precmd(self, line):
         """
         1. Apply alias list
@@ -557,25 +2373,66 @@ class Cmd2(cmd.Cmd):
         return line
 
     def postcmd(self, stop, line):
-        # stop if we are called with commandline arguments
-        if len(sys.argv)>1:
+        if not self.batch_mode:
+            return stop
+
+        if self.exit_code:
+            self.failed_commands.append((line, self.exit_code))
+            if not self.keep_going:
+                stop = True
+
+        # stop if all commands from commandline arguments are done
+        if not self.cmdqueue:
             stop = True
+
+        if stop and self.failed_commands:
+            if self.cmdqueue or len(self.failed_commands) > 1:
+                colorizer.err("\nERROR: %i command(s) failed:\n" % len(self.failed_commands), foreground="red")
+                for command, exit_code in self.failed_commands:
+                    colorizer.err(" * %r (exit code: %r)\n" % (command, exit_code), foreground="red")
+                if self.cmdqueue:
+                    colorizer.err("%i command(s) not started.\n" % len(self.cmdqueue), foreground="red")
+            sys.exit(self.failed_commands[0][1])
+
         return stop
 
 
 class EnvBuilder(venv.EnvBuilder):
     """
     * Create new virtualenv
-    * install and update pip
+    * install and update pip (only if the bundled pip is older than MIN_PIP_VERSION)
     * install "{{cookiecutter.package_name}}"
-    * call "{{cookiecutter.package_name}}_admin.py update_env" to install all requirements
+    * install all requirements from the requirements file of the installed package
+      (or from the embedded REQUIREMENTS_LOCK with '--require-hashes --no-deps')
+
+    Only if the requirements file is not found or 'admin_update_env' is set:
+    call "{{cookiecutter.package_name}}_admin.py update_env" to install all requirements
+    (e.g.: to run project specific hooks)
+
+    With a 'wheelhouse' directory, all packages are installed only from there (no PyPi access)
+
+    With 'shared_pip' the virtualenv will be created without pip
+    and all packages are installed via the SharedPip.
+
+    With 'parallel_install' all wheels from the 'wheelhouse' are installed
+    in parallel via install_wheels(), before pip runs.
+    (With 'package_store': Use the PackageStore for these wheels)
     """
     verbose = True
 
-    def __init__(self, requirements):
-        super().__init__(with_pip=True)
+    def __init__(self, requirements, wheelhouse=None, shared_pip=False, parallel_install=False,
+                 admin_update_env=False, package_store=False):
+        super().__init__(with_pip=not shared_pip)
         self.requirements = requirements
-
+        self.wheelhouse = wheelhouse
+        self.pip_index_args = get_wheelhouse_args(wheelhouse)
+        self.shared_pip = shared_pip
+        self.parallel_install = parallel_install
+        self.admin_update_env = admin_update_env
+        self.package_store = package_store
+        self.use_lock = bool(REQUIREMENTS_LOCK.strip()) and "-e" not in requirements and not admin_update_env
+
+    @traced("create")
     def create(self, env_dir):
         print(" * Create new {{cookiecutter.project_name}} virtualenv here: %r" % env_dir)
 
@@ -586,14 +2443,17 @@ class EnvBuilder(venv.EnvBuilder):
 
         return super().create(env_dir)
 
+    @traced("ensure_directories")
     def ensure_directories(self, env_dir):
         print(" * Create the directories for the environment.")
         return super().ensure_directories(env_dir)
 
+    @traced("create_configuration")
     def create_configuration(self, context):
         print(" * Create 'pyvenv.cfg' configuration file.")
         return super().create_configuration(context)
 
+    @traced("setup_python")
     def setup_python(self, context):
         print(" * Set up a Python executable in the environment.")
         return super().setup_python(context)
@@ -612,16 +2472,23 @@ class EnvBuilder(venv.EnvBuilder):
             check=check # sys.exit(return_code) if return_code != 0
         )
 
+    @traced("setup_pip")
     def _setup_pip(self, context):
         print(" * Install pip in a virtual environment.")
         # install pip with ensurepip:
         super()._setup_pip(context)
 
-        print(" * Upgrades pip in a virtual environment.")
-        # Upgrade pip first (e.g.: running python 3.5)
-
         context.pip_bin=Path(context.bin_path, get_pip_file_name()) # e.g.: .../bin/pip3
         assert context.pip_bin.is_file(), "Pip not found here: %s" % context.pip_bin
+        context.pip_command = [str(context.pip_bin)]
+
+        bundled_pip_version = tuple(int(part) for part in re.findall(r"\d+", ensurepip.version())[:2])
+        if bundled_pip_version >= MIN_PIP_VERSION:
+            print(" * Bundled pip v%s is new enough: Skip pip upgrade." % ensurepip.version())
+            return
+
+        print(" * Upgrades pip in a virtual environment.")
+        # Upgrade pip first (e.g.: running python 3.5)
 
         if sys.platform == 'win32':
             # Note: On windows it will crash with a PermissionError: [WinError 32]
@@ -630,20 +2497,43 @@ class EnvBuilder(venv.EnvBuilder):
             # see also: https://github.com/pypa/pip/issues/3804
             self.call_new_python(
                 context,
-                context.env_exe, "-m", "pip", "install", "--upgrade", "pip",
+                context.env_exe, "-m", "pip", "install", "--upgrade", "pip", *self.pip_index_args,
                 check=False # Don't exit on errors
             )
         else:
             self.call_new_python(
                 context,
-                str(context.pip_bin), "install", "--upgrade", "pip",
+                str(context.pip_bin), "install", "--upgrade", "pip", *self.pip_index_args,
                 check=False # Don't exit on errors
             )
 
+    @traced("setup_scripts")
     def setup_scripts(self, context):
         print(" * Set up scripts into the created environment.")
         return super().setup_scripts(context)
 
+    def find_requirement_file(self, context):
+        """
+        Returns the requirements file from the just installed "{{cookiecutter.package_name}}"
+            in normal mode: .../site-packages/{{cookiecutter.package_name}}/requirements/normal_installation.txt
+            in dev. mode: .../src/<name>/{{cookiecutter.package_name}}/requirements/developer_installation.txt
+        or None if not found.
+        """
+        if "-e" in self.requirements:
+            candidates = Path(context.env_dir, "src").glob(
+                "*/%s/requirements/developer_installation.txt" % PACKAGE_NAME
+            )
+        else:
+            site_packages = get_scheme_paths(context.env_dir)["purelib"]
+            candidates = [Path(site_packages, PACKAGE_NAME, "requirements", "normal_installation.txt")]
+
+        for requirement_file in candidates:
+            if requirement_file.is_file():
+                return requirement_file
+
+        print(" * No requirements file found.")
+
+    @traced("post_setup")
     def post_setup(self, context):
         """
         Set up any packages which need to be pre-installed into the
@@ -654,13 +2544,34 @@ class EnvBuilder(venv.EnvBuilder):
         """
         print(" * post-setup modification")
 
+        if self.shared_pip:
+            # virtualenv was created without pip: Use the cached pip wheel
+            # No need to upgrade pip: The shared pip has at least MIN_PIP_VERSION
+            context.pip_command = SharedPip(wheelhouse=self.wheelhouse).get_pip_command(context.env_exe)
+
+        if self.parallel_install:
+            # The wheelhouse contains the complete, resolved set of wheels:
+            # Install them all in parallel. pip will find them as 'already satisfied'
+            install_wheels(
+                collect_wheels(self.wheelhouse), context.env_dir, context.env_exe,
+                store=PackageStore() if self.package_store else None
+            )
+
+        if self.use_lock:
+            # All dependencies are in the lock file
+            lock_args = ["--no-deps"]
+        else:
+            lock_args = []
+
         # Install "{{cookiecutter.package_name}}"
         #   in normal mode as package from PyPi
         #   in dev. mode as editable from github
         self.call_new_python(
             context,
-            str(context.pip_bin), "install",
+            *context.pip_command, "install",
             # "--verbose",
+            *lock_args,
+            *self.pip_index_args,
             *self.requirements
         )
 
@@ -671,12 +2582,50 @@ class EnvBuilder(venv.EnvBuilder):
             VerboseSubprocess("ls", "-la", str(context.bin_path)).verbose_call()
             sys.exit(-1)
 
+        if self.use_lock:
+            lock_file = Path(context.env_dir, REQUIREMENTS_LOCK_FILENAME)
+            print(" * Install requirements from embedded lock file: '%s'" % lock_file)
+            with lock_file.open("w") as f:
+                f.write(REQUIREMENTS_LOCK)
+
+            self.call_new_python(
+                context,
+                *context.pip_command, "install",
+                "--require-hashes", "--no-deps",
+                *self.pip_index_args,
+                "--requirement", str(lock_file),
+                timeout=4*60
+            )  # extended timeout for slow Travis ;)
+            return
+
+        requirement_file = None
+        if not self.admin_update_env:
+            requirement_file = self.find_requirement_file(context)
+
+        if requirement_file is not None:
+            # Install all requirements directly.
+            # No need for "{{cookiecutter.package_name}}_admin.py update_env", because
+            # pip is up-to-date and "{{cookiecutter.package_name}}" is just installed.
+            print(" * Install requirements from: '%s'" % requirement_file)
+            self.call_new_python(
+                context,
+                *context.pip_command, "install",
+                *self.pip_index_args,
+                "--requirement", str(requirement_file),
+                timeout=4*60
+            )  # extended timeout for slow Travis ;)
+            return
+
+        update_env_args = ["update_env"]
+        if self.wheelhouse:
+            update_env_args += ["--wheelhouse", str(self.wheelhouse)]
+
         # Install all requirements by call: "{{cookiecutter.package_name}}_admin.py update_env"
         self.call_new_python(
             context,
             context.env_exe,
             str(bootstrap_env_admin_path),
-            "update_env",
+            *update_env_args,
             timeout=4*60
         )  # extended timeout for slow Travis ;)
 
@@ -685,9 +2634,11 @@ class EnvBuilder(venv.EnvBuilder):
 class BootBootstrapEnvShell(Cmd2):
     """
     The bootstrap shell to start the virtualenv creation.
-    It's implement only two commands:
+    It's implement only four commands:
      * boot
      * boot_developer
+     * boot_many
+     * warm_pool
     """
     def _resolve_path(self, path):
         return Path(path).expanduser().resolve()
@@ -712,7 +2663,74 @@ class BootBootstrapEnvShell(Cmd2):
                     requirements.append(line)
         return requirements
 
-    def _boot(self, destination, requirements):
+    def _parse_boot_args(self, command, arg):
+        """
+        Parse the arguments of the 'boot' commands, e.g.:
+            boot --template-cache ~/foo/bar
+        """
+        parser = argparse.ArgumentParser(prog=command, add_help=False)
+        parser.add_argument("destination", nargs="?")
+        parser.add_argument(
+            "--template-cache", action="store_true",
+            help="Clone a cached virtualenv template, if exists. Otherwise create one."
+        )
+        parser.add_argument(
+            "--hardlink", action="store_true",
+            help="Hardlink files from the cached template instead of copying them."
+        )
+        parser.add_argument(
+            "--wheelhouse", metavar="DIR",
+            help="Install all packages only from this local wheelhouse directory (no PyPi access)"
+        )
+        parser.add_argument(
+            "--shared-pip", action="store_true",
+            help="Create the virtualenv without pip and use one pip wheel cached per host."
+        )
+        parser.add_argument(
+            "--parallel-install", action="store_true",
+            help="Install all wheels from the --wheelhouse in parallel (without pip)."
+        )
+        parser.add_argument(
+            "--admin-update-env", action="store_true",
+            help="Install the requirements via the admin 'update_env' command (e.g.: for project specific hooks)"
+        )
+        parser.add_argument(
+            "--package-store", action="store_true",
+            help="Hardlink all site-packages files from a content-addressed store shared by all virtualenvs."
+        )
+        parser.add_argument(
+            "--warm-pool", action="store_true",
+            help="Move a spare virtualenv from the warm pool (filled with 'warm_pool') into place."
+        )
+        return parser.parse_args(shlex.split(arg))
+
+    def _get_wheelhouse(self, options):
+        """
+        Returns the wheelhouse directory from the boot options (or the zipapp) or None
+        """
+        archive_path = get_self_archive()
+        if archive_path is not None and not options.wheelhouse:
+            # Install everything from the wheels embedded in this zipapp (no PyPi access)
+            return extract_zipapp_wheels(archive_path)
+        elif options.wheelhouse:
+            wheelhouse = Path(options.wheelhouse).expanduser().resolve()
+            if not wheelhouse.is_dir():
+                self.stdout.write("\nERROR: Wheelhouse directory '%s' not found!\n\n" % wheelhouse)
+                sys.exit(1)
+            if not Path(wheelhouse, WHEELHOUSE_INDEX_FILENAME).is_file():
+                self.stdout.write("WARNING: No %r in wheelhouse '%s'\n" % (WHEELHOUSE_INDEX_FILENAME, wheelhouse))
+            return wheelhouse
+
+    def _get_warm_pool(self, requirements, options, wheelhouse):
+        """
+        Returns the WarmPool for the given boot options.
+        """
+        spare_options = dict(vars(options), wheelhouse=None if wheelhouse is None else str(wheelhouse))
+        for name in ("destination", "warm_pool"):
+            spare_options.pop(name, None)
+        return WarmPool(requirements, shared_pip=options.shared_pip, wheelhouse=wheelhouse, options=spare_options)
+
+    def _boot(self, destination, requirements, options):
         """
         Create a {{cookiecutter.project_name}} virtualenv and install requirements.
         """
@@ -726,8 +2744,47 @@ class BootBootstrapEnvShell(Cmd2):
             self.stdout.write("\nERROR: Path '%s' already exists!\n\n" % destination)
             sys.exit(1)
 
-        builder = EnvBuilder(requirements)
-        builder.create(str(destination))
+        wheelhouse = self._get_wheelhouse(options)
+
+        if options.warm_pool:
+            warm_pool = self._get_warm_pool(requirements, options, wheelhouse)
+            used = warm_pool.take(destination)
+            warm_pool.start_refill()
+            if used:
+                self.stdout.write("\nvirtualenv created at: '%s'\n" % destination)
+                return
+
+        if options.parallel_install:
+            if wheelhouse is None:
+                self.stdout.write("\nERROR: --parallel-install needs a --wheelhouse!\n\n")
+                sys.exit(1)
+            if sys.platform == 'win32':
+                # We can't create the *.exe entry point launchers
+                self.stdout.write("WARNING: --parallel-install not supported on Windows: Use pip.\n")
+                options.parallel_install = False
+
+        template_cache = None
+        if options.template_cache:
+            template_cache = VenvTemplateCache(requirements, shared_pip=options.shared_pip, wheelhouse=wheelhouse)
+
+        if template_cache is not None and template_cache.is_filled():
+            template_cache.clone(destination, hardlink=options.hardlink)
+        else:
+            builder = EnvBuilder(
+                requirements,
+                wheelhouse=wheelhouse,
+                shared_pip=options.shared_pip,
+                parallel_install=options.parallel_install,
+                admin_update_env=options.admin_update_env,
+                package_store=options.package_store,
+            )
+            builder.create(str(destination))
+
+            if template_cache is not None and destination.is_dir():
+                template_cache.store(destination)
+
+        if options.package_store and destination.is_dir():
+            PackageStore().add_env(destination)
 
         self.stdout.write("\n")
 
@@ -737,24 +2794,47 @@ class BootBootstrapEnvShell(Cmd2):
         else:
             self.stdout.write("virtualenv created at: '%s'\n" % destination)
 
-    def do_boot(self, destination):
+    def do_boot(self, arg):
         """
         Bootstrap {{cookiecutter.project_name}} virtualenv in "normal" mode.
 
         usage:
-            {{cookiecutter.bootstrap_filename}}> boot [path]
+            {{cookiecutter.bootstrap_filename}}> boot [--template-cache [--hardlink]] [--wheelhouse DIR [--parallel-install]] [--shared-pip]
+                [--admin-update-env] [--package-store] [--warm-pool] [path]
 
         Create a {{cookiecutter.project_name}} virtualenv in the given [path].
         Install packages via PyPi and read-only sources from github.
 
         The destination path must not exist yet!
 
+        --template-cache: Reuse a cached, already booted virtualenv
+        (stored in ~/.cache/bootstrap_env/templates/)
+
+        --wheelhouse DIR: Install only from a local wheelhouse directory,
+        created with the 'export_wheelhouse' admin command. (e.g.: for air-gapped hosts)
+        With --parallel-install all wheels are installed in parallel, before pip runs.
+        Started from a zipapp (created with the 'export_zipapp' admin command)
+        all packages are installed from the embedded wheels.
+
+        --admin-update-env: Install the requirements via '{{cookiecutter.package_name}}_admin.py update_env'
+        and not directly. (Needed for project specific hooks)
+
+        --package-store: Store all site-packages files once in ~/.cache/bootstrap_env/store/
+        and hardlink them into the virtualenv. Use the admin command 'gc' to remove unused files.
+
+        --shared-pip: Create the virtualenv without pip. All packages are
+        installed with one pip wheel, cached in ~/.cache/bootstrap_env/pip/
+
+        --warm-pool: Move a spare virtualenv from the pool (filled with 'warm_pool') to [path]
+        and refill the pool in background. Boot normally, if the pool is empty.
+
         (used the requirements/normal_installation.txt)
         """
-        self._boot(destination, requirements=NORMAL_INSTALL)
+        options = self._parse_boot_args("boot", arg)
+        self._boot(options.destination, requirements=NORMAL_INSTALL, options=options)
     complete_boot = complete_boot
 
-    def do_boot_developer(self, destination):
+    def do_boot_developer(self, arg):
         """
         Bootstrap {{cookiecutter.project_name}} virtualenv in "developer" mode.
         All own projects installed as editables via github HTTPS (readonly)
@@ -762,7 +2842,8 @@ class BootBootstrapEnvShell(Cmd2):
         **Should be only used for developing/contributing. All others: Use normal 'boot' ;) **
 
         usage:
-            {{cookiecutter.bootstrap_filename}}> boot_developer [path]
+            {{cookiecutter.bootstrap_filename}}> boot_developer [--template-cache [--hardlink]] [--wheelhouse DIR [--parallel-install]]
+                [--shared-pip] [--admin-update-env] [--package-store] [--warm-pool] [path]
 
         Create a {{cookiecutter.project_name}} virtualenv in the given [path].
         Install packages via PyPi and read-only sources from github.
@@ -771,9 +2852,184 @@ class BootBootstrapEnvShell(Cmd2):
 
         (used the requirements/developer_installation.txt)
         """
-        self._boot(destination, requirements=DEVELOPER_INSTALL)
+        options = self._parse_boot_args("boot_developer", arg)
+        self._boot(options.destination, requirements=DEVELOPER_INSTALL, options=options)
     complete_boot_developer = complete_boot
 
+    def do_warm_pool(self, arg):
+        """
+        Fill the pool of spare virtualenvs for 'boot --warm-pool'
+
+        usage:
+            {{cookiecutter.bootstrap_filename}}> warm_pool [--size N] [--developer] [--background] [boot options]
+
+        Create spare virtualenvs until the pool contains N (default: 2) of them.
+        All 'boot' options can be used, e.g.: --template-cache --wheelhouse DIR
+        The pool is stored in ~/.cache/bootstrap_env/pool/
+
+        'boot --warm-pool DEST' moves a spare virtualenv to DEST (a fast rename
+        on the same filesystem) and refill the pool in background
+        with the arguments of the last 'warm_pool' call.
+
+        --developer: Create spare virtualenvs for 'boot_developer --warm-pool'
+        --background: Fill the pool in a background process (output in 'warm_pool.log' in the pool)
+        """
+        parser = argparse.ArgumentParser(prog="warm_pool", add_help=False)
+        parser.add_argument("--size", type=int, default=2)
+        parser.add_argument("--developer", action="store_true")
+        parser.add_argument("--background", action="store_true")
+        try:
+            pool_options, boot_args = parser.parse_known_args(shlex.split(arg))
+            options = self._parse_boot_args("warm_pool", " ".join(shlex.quote(item) for item in boot_args))
+        except SystemExit:
+            options = None
+        if options is None or options.destination or options.warm_pool:
+            self.stdout.write("\nERROR: Wrong arguments! (Hint: call 'help warm_pool')\n\n")
+            sys.exit(1)
+
+        if pool_options.developer:
+            requirements = DEVELOPER_INSTALL
+        else:
+            requirements = NORMAL_INSTALL
+
+        warm_pool = self._get_warm_pool(requirements, options, self._get_wheelhouse(options))
+
+        # Used for the refill after 'boot --warm-pool':
+        command = " ".join(["warm_pool"] + [shlex.quote(item) for item in shlex.split(arg) if item != "--background"])
+        warm_pool.write_config(pool_options.size, command)
+
+        if pool_options.background:
+            warm_pool.start_refill()
+            return
+
+        try:
+            count = warm_pool.fill(
+                pool_options.size,
+                boot_func=lambda env_dir: self._boot(str(env_dir), requirements, options)
+            )
+        except RuntimeError as err:
+            self.stdout.write("\nERROR: %s\n\n" % err)
+            sys.exit(1)
+
+        self.stdout.write("\n%i new spare virtualenvs, %i ready in warm pool: '%s'\n" % (
+            count, len(warm_pool.get_spares()), warm_pool.path
+        ))
+
+    def _read_boot_manifest(self, manifest_path):
+        """
+        Returns a list of (destination, command line) from the manifest file.
+        Exit on the first invalid line: Nothing should be started.
+        """
+        boot_commands = []
+        destinations = set()
+        with manifest_path.open("r") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+
+                command, _, arg = line.partition(" ")
+                error = None
+                if command not in ("boot", "boot_developer"):
+                    error = "Unknown command %r" % command
+                else:
+                    try:
+                        options = self._parse_boot_args(command, arg)
+                    except SystemExit:
+                        options = None
+                        error = "Wrong arguments"
+
+                    if options is not None:
+                        if not options.destination:
+                            error = "No destination path given"
+                        else:
+                            destination = Path(options.destination).expanduser().resolve()
+                            if destination.exists():
+                                error = "Path '%s' already exists" % destination
+                            elif destination in destinations:
+                                error = "Path '%s' used twice" % destination
+                            destinations.add(destination)
+
+                if error:
+                    self.stdout.write("\nERROR: %s in %s line %i: %r\n\n" % (error, manifest_path, line_no, line))
+                    sys.exit(1)
+                boot_commands.append((options.destination, line))
+        return boot_commands
+
+    def do_boot_many(self, arg):
+        """
+        Bootstrap many bootstrap_env virtualenvs concurrently from a manifest file.
+
+        usage:
+            {{cookiecutter.bootstrap_filename}}> boot_many [--workers N] [--timeout SEC] MANIFEST
+
+        The manifest contains one 'boot' or 'boot_developer' command per line
+        with all arguments, e.g.:
+
+            # comment
+            boot ~/envs/foo --template-cache
+            boot ~/envs/bar --template-cache --hardlink
+            boot_developer ~/envs/dev
+
+        Every virtualenv is created in a own process: A failed boot doesn't
+        abort the others. All pip processes use one shared download/wheel cache.
+        (~/.cache/bootstrap_env/pip_cache/ or $PIP_CACHE_DIR)
+
+        --workers N: max. number of concurrent boots (default: number of CPUs)
+        --timeout SEC: kill a boot after this time (default: 30 min.)
+        """
+        parser = argparse.ArgumentParser(prog="boot_many", add_help=False)
+        parser.add_argument("manifest")
+        parser.add_argument("--workers", type=int, default=None)
+        parser.add_argument("--timeout", type=int, default=30 * 60)
+        try:
+            options = parser.parse_args(shlex.split(arg))
+        except SystemExit:
+            self.stdout.write("\nERROR: Wrong arguments! (Hint: call 'help boot_many')\n\n")
+            sys.exit(1)
+
+        manifest_path = Path(options.manifest).expanduser().resolve()
+        if not manifest_path.is_file():
+            self.stdout.write("\nERROR: Manifest file '%s' not found!\n\n" % manifest_path)
+            sys.exit(1)
+
+        boot_commands = self._read_boot_manifest(manifest_path)
+        if not boot_commands:
+            self.stdout.write("\nERROR: No boot commands in '%s'\n\n" % manifest_path)
+            sys.exit(1)
+
+        env_updates = {
+            "PIP_CACHE_DIR": os.environ.get("PIP_CACHE_DIR") or str(get_cache_path("pip_cache")),
+        }
+
+        archive_path = get_self_archive()
+        if archive_path is not None:
+            # Extract the embedded wheels only once for all boots:
+            wheelhouse_arg = " --wheelhouse %s" % shlex.quote(str(extract_zipapp_wheels(archive_path)))
+            self_path = archive_path
+        else:
+            wheelhouse_arg = ""
+            self_path = SELF_FILE_PATH
+
+        runner = ConcurrentSubprocesses(max_workers=options.workers, timeout=options.timeout)
+        for destination, line in boot_commands:
+            if wheelhouse_arg and "--wheelhouse" not in shlex.split(line):
+                line += wheelhouse_arg
+            # The command line is one argument: paths with spaces keep their quotes
+            runner.add(sys.executable, str(self_path), line, name=destination, env_updates=env_updates)
+
+        self.stdout.write("Boot %i virtualenvs with max. %i workers:\n\n" % (len(boot_commands), runner.max_workers))
+        results = runner.run()
+
+        self.stdout.write("\nSummary:\n")
+        runner.print_summary(results)
+
+        failed = [result for result in results if result.exit_code]
+        self.stdout.write("\n%i virtualenvs created, %i failed.\n" % (len(results) - len(failed), len(failed)))
+        if failed:
+            sys.exit(1)
+    complete_boot_many = complete_boot
+
 
 def main():
     """
@@ -783,7 +3039,12 @@ def main():
         entry_points={'console_scripts': [
             "{{cookiecutter.project_name}}_boot = {{cookiecutter.project_name}}.{{cookiecutter.project_name}}_boot:main",
         ]},
+
+    Enable tracing with: --trace FILE (must be the first argument)
+
+    Run many commands with e.g.: "boot ~/foo; boot_developer ~/bar" or --batch FILE
     """
+    tracer.setup()
     BootBootstrapEnvShell().cmdloop()
 
 
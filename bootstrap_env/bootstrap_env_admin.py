@@ -10,21 +10,42 @@
 """
 
 
+import argparse
 import logging
 import os
+import sys
 from pathlib import Path
 
 # Bootstrap-Env
 import bootstrap_env
+from bootstrap_env.admin_shell.admin_daemon import DEFAULT_IDLE_TIMEOUT, AdminDaemon
 from bootstrap_env.admin_shell.normal_shell import AdminShell
 from bootstrap_env.admin_shell.path_helper import PathHelper
+from bootstrap_env.boot_bootstrap_env import tracer
 
 log = logging.getLogger(__name__)
 
 
+def parse_daemon_args(args):
+    parser = argparse.ArgumentParser(prog="bootstrap_env_admin.py --daemon")
+    parser.add_argument(
+        "--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT, metavar="SEC",
+        help="Exit the daemon after this seconds without a command (default: %(default)s)"
+    )
+    return parser.parse_args(args)
+
+
 def main():
     assert "VIRTUAL_ENV" in os.environ, "ERROR: Call me only in a activated virtualenv!"
 
+    # e.g.: bootstrap_env_admin.py --trace /tmp/trace.json update_env
+    tracer.setup()
+
+    # e.g.: bootstrap_env_admin.py --daemon [--idle-timeout SEC]
+    daemon_options = None
+    if sys.argv[1:2] == ["--daemon"]:
+        daemon_options = parse_daemon_args(sys.argv[2:])
+
     base_file = bootstrap_env.__file__
     # print("\nbootstrap_env.__file__: %r\n" % base_file)
 
@@ -46,10 +67,23 @@ def main():
         from bootstrap_env.admin_shell.developer_shell import DeveloperAdminShell
         ShellClass = DeveloperAdminShell
 
-    ShellClass(
-        path_helper,
-        self_filename=Path(__file__).name
-    ).cmdloop()
+    def run_shell():
+        ShellClass(
+            path_helper,
+            self_filename=Path(__file__).name
+        ).cmdloop()
+
+    if daemon_options is None:
+        run_shell()
+        return
+
+    def run_daemon_command():
+        # e.g.: bootstrap_env_admin_client.py --trace /tmp/trace.json update_env
+        tracer.setup()
+        run_shell()
+
+    # Keep this process warm and run the commands from bootstrap_env_admin_client.py
+    AdminDaemon(run_daemon_command, idle_timeout=daemon_options.idle_timeout).serve_forever()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+
+"""
+    Admin client
+    ~~~~~~~~~~~~
+
+    Run admin commands in the warm admin daemon (started on demand)
+    e.g.:
+        $ bootstrap_env_admin_client.py update_env
+        $ bootstrap_env_admin_client.py "pip_freeze; update_env"
+
+    The interactive shell (without arguments) is not supported by the daemon:
+    bootstrap_env_admin.py is started instead.
+
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import os
+import sys
+from pathlib import Path
+
+# Bootstrap-Env
+from bootstrap_env.admin_shell.admin_daemon import run_client
+
+ADMIN_PATH = Path(Path(__file__).resolve().parent, "bootstrap_env_admin.py")
+
+
+def main():
+    assert "VIRTUAL_ENV" in os.environ, "ERROR: Call me only in a activated virtualenv!"
+
+    argv = sys.argv[1:]
+    if not argv:
+        os.execv(sys.executable, [sys.executable, str(ADMIN_PATH)])
+
+    sys.exit(run_client(argv, admin_path=ADMIN_PATH))
+
+
+if __name__ == '__main__':
+    main()
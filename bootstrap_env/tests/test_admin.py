@@ -251,7 +251,8 @@ class TestBootstrapEnvAdmin(BootstrapEnvTestCase):
         self.assertNotIn("Error", output)
 
     def test_update_env(self):
-        output = self.bootstrap_env_admin_run("update_env")
+        # --force: Don't skip unchanged steps from a previous run
+        output = self.bootstrap_env_admin_run("update_env", "--force")
         print(output)
 
         if path_helper.normal_mode:
@@ -0,0 +1,168 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Bootstrap-Env
+from bootstrap_env.admin_shell.admin_daemon import (
+    EXIT, REQUEST, STDOUT, connect, recv_frame, run_client, send_frame
+)
+from bootstrap_env.tests.utils import IsolatedFilesystem
+
+DAEMON_SCRIPT = """
+import os
+import sys
+import time
+from pathlib import Path
+
+from bootstrap_env.admin_shell.admin_daemon import AdminDaemon
+from bootstrap_env.boot_bootstrap_env import Cmd2, tracer
+
+
+class TestShell(Cmd2):
+    def do_echo(self, arg):
+        "echo the argument"
+        print("echo: %s (cwd: %s, pid: %s)" % (arg, os.getcwd(), os.getpid()))
+
+    def do_fail(self, arg):
+        "fail"
+        print("Error!", file=sys.stderr)
+        sys.exit(3)
+
+    def do_wait(self, arg):
+        "wait until the file exists"
+        print("wait for: %s" % arg, flush=True)
+        while not Path(arg).exists():
+            time.sleep(0.05)
+        print("waited for: %s" % arg)
+
+
+def get_fingerprint():
+    return Path("fingerprint.txt").read_text()
+
+
+with open("starts.log", "a") as f:
+    f.write("%s\\n" % os.getpid())
+
+def run_shell():
+    tracer.setup()
+    TestShell().cmdloop()
+
+
+AdminDaemon(
+    run_shell,
+    socket_path=sys.argv[1],
+    idle_timeout=float(sys.argv[2]),
+    poll_interval=0.1,
+    get_fingerprint=get_fingerprint,
+).serve_forever()
+"""
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timeout!")
+        time.sleep(0.05)
+
+
+@unittest.skipIf(sys.platform == "win32", "unix sockets only")
+class TestAdminDaemon(unittest.TestCase):
+    def client(self, *argv, socket_path):
+        stdout = io.BytesIO()
+        stderr = io.BytesIO()
+        with mock.patch.object(sys, "stdout", types.SimpleNamespace(buffer=stdout)), \
+                mock.patch.object(sys, "stderr", types.SimpleNamespace(buffer=stderr)):
+            exit_code = run_client(list(argv), admin_path=None, socket_path=socket_path)
+        return exit_code, stdout.getvalue().decode("utf-8"), stderr.getvalue().decode("utf-8")
+
+    def test_daemon(self):
+        with IsolatedFilesystem(prefix="test_daemon"):
+            temp_path = Path().cwd()
+            socket_path = Path(temp_path, "admin.sock")
+            Path("daemon.py").write_text(DAEMON_SCRIPT)
+            Path("fingerprint.txt").write_text("1")
+            Path("sub").mkdir()
+
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+            process = subprocess.Popen([sys.executable, "daemon.py", str(socket_path), "2"], env=env)
+            try:
+                wait_for(lambda: connect(socket_path) is not None)
+
+                os.chdir("sub")
+                try:
+                    exit_code, stdout, stderr = self.client("echo", "foo", ";", "echo", "bar", socket_path=socket_path)
+                finally:
+                    os.chdir(str(temp_path))
+                self.assertEqual(exit_code, 0, stderr)
+                self.assertIn("echo: foo (cwd: %s" % Path(temp_path, "sub"), stdout)
+                self.assertIn("echo: bar", stdout)
+
+                # Every command runs in a forked child process:
+                self.assertNotIn("pid: %i)" % process.pid, stdout)
+
+                exit_code, stdout, stderr = self.client("fail; echo not called", socket_path=socket_path)
+                self.assertEqual(exit_code, 3)
+                self.assertIn("Error!", stderr)
+                self.assertNotIn("not called", stdout)
+
+                # The trace file is written by the forked child:
+                trace_path = Path(temp_path, "trace.json")
+                exit_code, stdout, stderr = self.client(
+                    "--trace", str(trace_path), "echo traced", socket_path=socket_path
+                )
+                self.assertEqual(exit_code, 0, stderr)
+                self.assertIn("Trace with 1 events written to", stdout)
+                with trace_path.open("r") as f:
+                    events = json.load(f)["traceEvents"]
+                self.assertEqual([event["name"] for event in events], ["command: echo"])
+
+                # A long running command doesn't block other clients:
+                with connect(socket_path) as sock:
+                    request = {"argv": ["wait go.txt"], "cwd": str(temp_path), "env": dict(os.environ)}
+                    send_frame(sock, REQUEST, json.dumps(request).encode("utf-8"))
+                    output = b""
+                    while b"wait for: go.txt" not in output:
+                        kind, data = recv_frame(sock)
+                        self.assertEqual(kind, STDOUT)
+                        output += data
+
+                    exit_code, stdout, stderr = self.client("echo concurrent", socket_path=socket_path)
+                    self.assertEqual(exit_code, 0, stderr)
+                    self.assertIn("echo: concurrent", stdout)
+
+                    Path("go.txt").touch()
+                    while True:
+                        kind, data = recv_frame(sock)
+                        if kind != STDOUT:
+                            break
+                        output += data
+                    self.assertEqual((kind, data), (EXIT, b"0"))
+                    self.assertIn(b"waited for: go.txt", output)
+
+                # re-exec on changed fingerprint:
+                Path("fingerprint.txt").write_text("2")
+                wait_for(lambda: len(Path("starts.log").read_text().splitlines()) == 2)
+                wait_for(lambda: connect(socket_path) is not None)
+                self.assertEqual(self.client("echo foo", socket_path=socket_path)[0], 0)
+
+                # exit after idle timeout:
+                self.assertEqual(process.wait(timeout=10), 0)
+                self.assertFalse(socket_path.exists())
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
@@ -6,14 +6,22 @@
 """
 
 
+import io
 import os
 import subprocess
+import sys
+import time
 import unittest
 from pathlib import Path
+from unittest import mock
 
 # Bootstrap-Env
 from bootstrap_env import boot_bootstrap_env
-from bootstrap_env.boot_bootstrap_env import VerboseSubprocess, DisplayErrors
+from bootstrap_env.boot_bootstrap_env import (
+    CACHE_DIR_ENV_NAME, MIN_PIP_VERSION, PACKAGE_NAME, BootBootstrapEnvShell, Cmd2, ConcurrentSubprocesses,
+    DirectoryListingCache, DisplayErrors, EnvBuilder, SharedPip, VerboseSubprocess, WarmPool, get_scheme_paths,
+    get_wheelhouse_args, parse_wheel_version
+)
 from bootstrap_env.tests.base import BootstrapEnvTestCase
 from bootstrap_env.tests.utils import IsolatedFilesystem, path_helper
 
@@ -41,6 +49,412 @@ class TestBootstrapEnvBoot(BootstrapEnvTestCase):
     def test_subprocess_accept_pathlib_kwargs(self):
         self.assertRaises(AssertionError, VerboseSubprocess, foo=Path("/foo/bar"))
 
+    @unittest.skipIf(sys.platform == "win32", "Needs a POSIX shell")
+    def test_iter_output_lines(self):
+        s = VerboseSubprocess("sh", "-c", "printf 'a\\r\\nb\\n'; sleep 0.1; printf 'c'")
+        self.assertEqual(list(s.iter_output()), ["a\n", "b\n", "c"])
+        self.assertEqual("".join(s.iter_output(lines=False)), "a\nb\nc")
+
+    @unittest.skipIf(sys.platform == "win32", "Needs a POSIX shell")
+    def test_iter_output_exit_code(self):
+        s = VerboseSubprocess("sh", "-c", "echo foo; exit 3")
+        self.assertEqual(list(s.iter_output(check=False)), ["foo\n"])
+        with self.assertRaises(SystemExit) as cm:
+            list(s.iter_output(check=True))
+        self.assertEqual(cm.exception.code, 3)
+
+    @unittest.skipIf(sys.platform == "win32", "Needs a POSIX shell")
+    def test_iter_output_timeout(self):
+        # A silent subprocess, that starts a child process:
+        s = VerboseSubprocess("sh", "-c", "echo start; sleep 30 & wait", timeout=0.5)
+        output = []
+        start_time = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            for line in s.iter_output():
+                output.append(line)
+        self.assertLess(time.monotonic() - start_time, 5)
+        self.assertEqual(output, ["start\n"])
+
+    @unittest.skipIf(sys.platform == "win32", "Needs a POSIX shell")
+    def test_concurrent_subprocesses(self):
+        runner = ConcurrentSubprocesses(max_workers=2, timeout=1)
+        runner.add("sh", "-c", "echo foo1; sleep 0.2; echo foo2", name="foo")
+        runner.add("sh", "-c", "echo bar; exit 3", name="bar")
+        runner.add("sh", "-c", "sleep 30", name="timeout")
+
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            start_time = time.monotonic()
+            results = runner.run()
+            self.assertLess(time.monotonic() - start_time, 5)
+
+        output = stdout.getvalue()
+        print(output)
+        lines = output.splitlines()
+        for line in ("foo     | foo1", "foo     | foo2", "bar     | bar", "timeout | Timeout after 1 sec.: kill it!"):
+            self.assertIn(line, lines)
+        self.assertLess(lines.index("foo     | foo1"), lines.index("foo     | foo2"))
+        self.assertIn("bar     | Exit code 3", output)
+
+        self.assertEqual([result.name for result in results], ["foo", "bar", "timeout"])
+        self.assertEqual([result.exit_code for result in results[:2]], [0, 3])
+        self.assertEqual([result.timed_out for result in results], [False, False, True])
+        self.assertNotEqual(results[2].exit_code, 0)
+        self.assertGreaterEqual(results[0].duration, 0.2)
+
+        with mock.patch("sys.stdout", new_callable=io.StringIO):
+            with self.assertRaises(SystemExit) as cm:
+                runner.run(check=True)
+        self.assertEqual(cm.exception.code, 3)
+
+    @unittest.skipIf(sys.platform == "win32", "Needs a POSIX shell")
+    def test_concurrent_subprocesses_errors(self):
+        runner = ConcurrentSubprocesses(max_workers=2, timeout=1)
+        runner.add("/does/not/exist", name="missing")
+        # The shell exits, but the background process still holds the stdout pipe:
+        runner.add("sh", "-c", "sleep 30 & echo started", name="orphan")
+        runner.add("sh", "-c", "echo ok", name="ok")
+
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            start_time = time.monotonic()
+            results = runner.run()
+            self.assertLess(time.monotonic() - start_time, 5)
+
+        output = stdout.getvalue()
+        print(output)
+        self.assertIn("missing | Error: [Errno 2]", output)
+        self.assertIn("orphan  | Timeout after 1 sec.: kill it!", output)
+        self.assertIn("ok      | ok", output.splitlines())
+
+        self.assertEqual([result.exit_code for result in results], [127, 0, 0])
+        self.assertEqual([result.timed_out for result in results], [False, True, False])
+
+    def test_wheelhouse_args(self):
+        self.assertEqual(get_wheelhouse_args(None), [])
+        self.assertEqual(
+            get_wheelhouse_args(Path("/foo/wheelhouse")),
+            ["--no-index", "--find-links", "/foo/wheelhouse"]
+        )
+
+    def test_parse_boot_args(self):
+        shell = BootBootstrapEnvShell()
+        options = shell._parse_boot_args("boot", "--wheelhouse '/foo/wheel house' ~/bar")
+        self.assertEqual(options.destination, "~/bar")
+        self.assertEqual(options.wheelhouse, "/foo/wheel house")
+        self.assertFalse(options.template_cache)
+
+    def test_boot_many(self):
+        with IsolatedFilesystem(prefix="test_boot_many"):
+            temp_path = Path().cwd()
+            # Fake boot file: print the command line and fail on request
+            fake_boot_file = Path(temp_path, "fake_boot.py")
+            with fake_boot_file.open("w") as f:
+                f.write(
+                    "import os, sys\n"
+                    "print('args: %r cache: %s' % (sys.argv[1], os.environ['PIP_CACHE_DIR']))\n"
+                    "sys.exit(3 if 'fail' in sys.argv[1] else 0)\n"
+                )
+
+            with Path(temp_path, "manifest.txt").open("w") as f:
+                f.write(
+                    "# comment\n"
+                    "boot '%(temp)s/env one' --template-cache\n"
+                    "\n"
+                    "boot %(temp)s/fail\n"
+                    "boot_developer %(temp)s/env2\n" % {"temp": temp_path}
+                )
+
+            def boot_many(arg):
+                shell = BootBootstrapEnvShell(stdout=io.StringIO())
+                with mock.patch.object(boot_bootstrap_env, "SELF_FILE_PATH", fake_boot_file), \
+                        mock.patch.dict(os.environ, {"PIP_CACHE_DIR": "/foo/cache"}), \
+                        mock.patch("sys.stdout", new_callable=io.StringIO) as stdout, \
+                        mock.patch.object(boot_bootstrap_env.colorizer, "_stdout", stdout), \
+                        mock.patch.object(boot_bootstrap_env.colorizer, "_stderr", stdout):
+                    try:
+                        shell.do_boot_many(arg)
+                    except SystemExit as err:
+                        exit_code = err.code
+                    else:
+                        exit_code = 0
+                return exit_code, shell.stdout.getvalue() + stdout.getvalue()
+
+            exit_code, output = boot_many("--workers 2 manifest.txt")
+            print(output)
+            self.assertEqual(exit_code, 1)
+            self.assertIn("Boot 3 virtualenvs with max. 2 workers", output)
+            self.assertIn(
+                "%s/env one | args: \"boot '%s/env one' --template-cache\" cache: /foo/cache" % (temp_path, temp_path),
+                output
+            )
+            self.assertIn("args: 'boot_developer %s/env2' cache: /foo/cache" % temp_path, output)
+            self.assertIn("%s/fail    exit code: 3" % temp_path, output)
+            self.assertIn("%s/env2    exit code: 0" % temp_path, output)
+            self.assertIn("2 virtualenvs created, 1 failed.", output)
+
+            # Invalid manifests: Nothing will be started
+            for line, error in (
+                ("update_env", "ERROR: Unknown command 'update_env'"),
+                ("boot", "ERROR: No destination path given"),
+                ("boot %s" % temp_path, "ERROR: Path '%s' already exists" % temp_path),
+                ("boot ~/foo\nboot_developer ~/foo", "used twice"),
+                ("boot --unknown ~/foo", "ERROR: Wrong arguments"),
+            ):
+                with Path(temp_path, "manifest.txt").open("w") as f:
+                    f.write(line)
+                exit_code, output = boot_many("manifest.txt")
+                self.assertEqual(exit_code, 1)
+                self.assertIn(error, output)
+                self.assertNotIn("Boot ", output)
+
+    def test_warm_pool(self):
+        def fake_boot(env_dir):
+            Path(env_dir, "bin").mkdir(parents=True)
+            with Path(env_dir, "pyvenv.cfg").open("w") as f:
+                f.write("command = python -m venv %s\n" % env_dir)
+            with Path(env_dir, "bin", "activate").open("w") as f:
+                f.write("VIRTUAL_ENV='%s'\n" % env_dir)
+
+        def failed_boot(env_dir):
+            Path(env_dir).mkdir()
+            sys.exit(1)
+
+        with IsolatedFilesystem(prefix="test_warm_pool"):
+            temp_path = Path().cwd()
+            with mock.patch.dict(os.environ, {CACHE_DIR_ENV_NAME: str(Path(temp_path, "cache"))}), \
+                    mock.patch("sys.stdout", new_callable=io.StringIO):
+                pool = WarmPool(["foo"])
+                self.assertEqual(pool.fill(2, fake_boot), 2)
+                self.assertEqual(len(pool.get_spares()), 2)
+                self.assertEqual(pool.fill(2, fake_boot), 0)
+                oldest = pool.get_spares()[0]
+
+                destination = Path(temp_path, "env")
+                self.assertTrue(pool.take(destination))
+                self.assertFalse(oldest.exists())
+                self.assertEqual(len(pool.get_spares()), 1)
+                self.assertFalse(Path(destination, WarmPool.META_FILENAME).exists())
+                with Path(destination, "bin", "activate").open("r") as f:
+                    self.assertEqual(f.read(), "VIRTUAL_ENV='%s'\n" % destination)
+                with Path(destination, "pyvenv.cfg").open("r") as f:
+                    self.assertEqual(f.read(), "command = python -m venv %s\n" % destination)
+
+                # Another requirement set -> another pool:
+                self.assertFalse(WarmPool(["bar"]).take(Path(temp_path, "env2")))
+
+                # Failed boots are removed:
+                with self.assertRaises(RuntimeError):
+                    pool.fill(3, failed_boot)
+                self.assertEqual([path.name for path in pool.path.glob("building-*")], [])
+
+                # Only one process fills the pool:
+                with pool.fill_lock() as locked:
+                    self.assertTrue(locked)
+                    if boot_bootstrap_env.fcntl is not None:
+                        self.assertEqual(WarmPool(["foo"]).fill(3, fake_boot), 0)
+
+                # Refill with the last 'warm_pool' command:
+                with mock.patch("subprocess.Popen") as popen:
+                    pool.start_refill() # no config
+                    popen.assert_not_called()
+
+                    pool.write_config(3, "warm_pool --size 3")
+                    pool.start_refill()
+                    self.assertEqual(popen.call_args[0][0][-1], "warm_pool --size 3")
+
+                    # Use a spare in 'boot':
+                    shell = BootBootstrapEnvShell(stdout=io.StringIO())
+                    boot_pool = shell._get_warm_pool(["foo"], shell._parse_boot_args("boot", ""), None)
+                    self.assertEqual(boot_pool.path, pool.path)
+                    self.assertEqual(boot_pool.get_spares(), []) # spare was created with other options
+                    self.assertEqual(boot_pool.fill(1, fake_boot), 1)
+                    with mock.patch.object(boot_bootstrap_env, "NORMAL_INSTALL", ["foo"]), \
+                            mock.patch.object(boot_bootstrap_env, "EnvBuilder") as env_builder:
+                        shell.do_boot("--warm-pool %s" % Path(temp_path, "env3"))
+                    env_builder.assert_not_called()
+                    self.assertEqual(popen.call_count, 2)
+                self.assertIn("virtualenv created at: '%s'" % Path(temp_path, "env3"), shell.stdout.getvalue())
+                self.assertEqual(boot_pool.get_spares(), [])
+                self.assertEqual(list(pool.path.glob("spare-*")), []) # spare with other options removed
+
+    def test_warm_pool_options_and_expiry(self):
+        def fake_boot(env_dir):
+            Path(env_dir).mkdir()
+
+        with IsolatedFilesystem(prefix="test_warm_pool_options"):
+            temp_path = Path().cwd()
+            with mock.patch.dict(os.environ, {CACHE_DIR_ENV_NAME: str(Path(temp_path, "cache"))}), \
+                    mock.patch("sys.stdout", new_callable=io.StringIO):
+                pool = WarmPool(["foo"], options={"package_store": True})
+                self.assertEqual(pool.fill(1, fake_boot), 1)
+
+                # Spares are only used with the same options:
+                other_pool = WarmPool(["foo"], options={"package_store": False})
+                self.assertEqual(other_pool.path, pool.path)
+                self.assertFalse(other_pool.take(Path(temp_path, "env1")))
+                self.assertEqual(len(pool.get_spares()), 1)
+
+                # A wheelhouse is part of the key:
+                wheelhouse = Path(temp_path, "wheelhouse")
+                wheelhouse.mkdir()
+                self.assertNotEqual(WarmPool(["foo"], wheelhouse=wheelhouse).path, pool.path)
+
+                # Not pinned spares expire:
+                with mock.patch.object(boot_bootstrap_env, "REQUIREMENTS_LOCK", ""):
+                    pool = WarmPool(["foo"], options={"package_store": True})
+                    self.assertEqual(pool.max_age, boot_bootstrap_env.TEMPLATE_MAX_AGE)
+                    created = time.time() - pool.max_age - 1
+                    with mock.patch("time.time", return_value=created):
+                        self.assertEqual(pool.fill(2, fake_boot), 1)
+                    self.assertEqual(len(pool.get_spares()), 1)
+                    self.assertEqual(pool.fill(2, fake_boot), 1) # expired spare replaced
+                    self.assertEqual(len(list(pool.path.glob("spare-*"))), 2)
+
+                    pinned_pool = WarmPool(["foo"], wheelhouse=wheelhouse)
+                    self.assertIsNone(pinned_pool.max_age)
+
+    def test_complete_path(self):
+        with IsolatedFilesystem(prefix="test_complete_path"):
+            temp_path = Path().cwd()
+            for name in ("foo", "foo.bar", "fuz", "other"):
+                Path(temp_path, name).mkdir()
+            Path(temp_path, "foo_file").touch()
+
+            shell = BootBootstrapEnvShell()
+            shell.dir_listing_cache = DirectoryListingCache()
+
+            line = "boot %s/f" % temp_path
+            self.assertEqual(shell.complete_boot("f", line, 0, 0), ["foo/", "foo.bar/", "fuz/"])
+            self.assertEqual(shell.complete_boot("foo", line + "oo", 0, 0), ["foo/", "foo.bar/"])
+            self.assertEqual(shell.complete_boot("", "boot %s/" % temp_path, 0, 0), [
+                "foo/", "foo.bar/", "fuz/", "other/"
+            ])
+
+            # The directory listing is cached:
+            with mock.patch("os.scandir") as scandir:
+                self.assertEqual(shell.complete_boot("fu", line + "u", 0, 0), ["fuz/"])
+            scandir.assert_not_called()
+
+            # ...until the directory changed:
+            Path(temp_path, "fuzz").mkdir()
+            os.utime(str(temp_path), ns=(0, 0)) # mtime resolution may be too coarse
+            self.assertEqual(shell.complete_boot("fu", line + "u", 0, 0), ["fuz/", "fuzz/"])
+
+            shell.max_path_completions = 2
+            self.assertEqual(shell.complete_boot("f", line, 0, 0), ["foo/", "foo.bar/"])
+
+    def test_batch_mode(self):
+        class BatchShell(Cmd2):
+            calls = []
+
+            def do_ok(self, arg):
+                "ok"
+                self.calls.append("ok %s" % arg)
+
+            def do_exit0(self, arg):
+                "exit0"
+                self.calls.append("exit0")
+                sys.exit(0) # e.g.: 'update_env' -> not failed
+
+            def do_fail(self, arg):
+                "fail"
+                self.calls.append("fail")
+                sys.exit(3)
+
+        def run(*args, stdin=""):
+            BatchShell.calls = []
+            with mock.patch.object(sys, "argv", ["foo.py", *args]), \
+                    mock.patch.object(sys, "stdin", io.StringIO(stdin)), \
+                    mock.patch.object(sys, "stdout", io.StringIO()), \
+                    mock.patch.object(sys, "stderr", io.StringIO()):
+                shell = BatchShell(stdout=io.StringIO())
+                try:
+                    shell.cmdloop()
+                except SystemExit as err:
+                    return err.code, BatchShell.calls
+                return 0, BatchShell.calls
+
+        self.assertEqual(run("ok", "a", "b"), (0, ["ok a b"]))
+        self.assertEqual(run("ok", "1", ";", "exit0", ";", "ok", "2"), (0, ["ok 1", "exit0", "ok 2"]))
+        # Only a standalone ";" argument separates commands:
+        self.assertEqual(run("ok", 'foo; python_version<"3.8"'), (0, ['ok foo; python_version<"3.8"']))
+        self.assertEqual(run("ok 'a;b'; ok \"c;d\""), (0, ["ok 'a;b'", 'ok "c;d"']))
+        self.assertEqual(run("ok 1; fail; ok 2"), (3, ["ok 1", "fail"]))
+        self.assertEqual(run("--keep-going", "ok 1; fail; unknown; ok 2"), (3, ["ok 1", "fail", "ok 2"]))
+        self.assertEqual(run("unknown; ok 2"), (1, []))
+
+        with IsolatedFilesystem(prefix="test_batch_mode"):
+            with open("commands.txt", "w") as f:
+                f.write("# comment\nok 1\n\nok 2; ok 3\n")
+            self.assertEqual(run("--batch", "commands.txt", "ok", "4"), (0, ["ok 1", "ok 2", "ok 3", "ok 4"]))
+
+        self.assertEqual(run("--batch", "-", stdin="ok 1\nfail\nok 2\n"), (3, ["ok 1", "fail"]))
+
+    def test_parse_wheel_version(self):
+        self.assertEqual(parse_wheel_version("pip-19.0.3-py2.py3-none-any.whl"), (19, 0, 3))
+        self.assertEqual(parse_wheel_version("/foo/pip-19.1b1-py2.py3-none-any.whl"), (19,))
+
+    def test_find_requirement_file(self):
+        with IsolatedFilesystem(prefix="test_find_requirement_file"):
+            env_dir = Path().cwd()
+            context = mock.Mock(env_dir=str(env_dir))
+
+            builder = EnvBuilder(requirements=[PACKAGE_NAME])
+            self.assertIsNone(builder.find_requirement_file(context))
+
+            req_path = Path(get_scheme_paths(env_dir)["purelib"], PACKAGE_NAME, "requirements")
+            req_path.mkdir(parents=True)
+            Path(req_path, "normal_installation.txt").touch()
+            self.assertEqual(builder.find_requirement_file(context), Path(req_path, "normal_installation.txt"))
+
+            builder = EnvBuilder(requirements=["-e", "git+https://example.org/foo.git#egg=%s" % PACKAGE_NAME])
+            self.assertIsNone(builder.find_requirement_file(context))
+
+            req_path = Path(env_dir, "src", "foo", PACKAGE_NAME, "requirements")
+            req_path.mkdir(parents=True)
+            Path(req_path, "developer_installation.txt").touch()
+            self.assertEqual(builder.find_requirement_file(context), Path(req_path, "developer_installation.txt"))
+
+    def test_use_requirements_lock(self):
+        # bootstrap_env doesn't pin requirements, so no lock is embedded:
+        self.assertFalse(EnvBuilder(requirements=[PACKAGE_NAME]).use_lock)
+
+        with mock.patch.object(boot_bootstrap_env, "REQUIREMENTS_LOCK", "foo==1.0 --hash=sha256:0123\n"):
+            self.assertTrue(EnvBuilder(requirements=[PACKAGE_NAME]).use_lock)
+            self.assertFalse(EnvBuilder(requirements=[PACKAGE_NAME], admin_update_env=True).use_lock)
+            self.assertFalse(EnvBuilder(requirements=["-e", "git+https://example.org/foo.git"]).use_lock)
+
+    def test_setup_pip_upgrade(self):
+        with IsolatedFilesystem(prefix="test_setup_pip_upgrade"):
+            bin_path = Path().cwd()
+            Path(bin_path, "pip3").touch()
+            context = mock.Mock(bin_path=str(bin_path), env_exe="python")
+
+            builder = EnvBuilder(requirements=[PACKAGE_NAME])
+            for bundled_version, upgrade in (("19.0.3", True), ("20.2.4", True), ("20.3", False), ("23.2.1", False)):
+                with mock.patch("venv.EnvBuilder._setup_pip"), \
+                        mock.patch("ensurepip.version", return_value=bundled_version), \
+                        mock.patch.object(builder, "call_new_python") as call_new_python:
+                    builder._setup_pip(context)
+                self.assertEqual(call_new_python.called, upgrade, bundled_version)
+
+    def test_shared_pip(self):
+        with IsolatedFilesystem(prefix="test_shared_pip"):
+            cache_path = Path().cwd()
+            with mock.patch.dict(os.environ, {CACHE_DIR_ENV_NAME: str(cache_path)}):
+                shared_pip = SharedPip()
+                bundled_wheel = shared_pip.get_bundled_wheel()
+                if bundled_wheel is None or parse_wheel_version(bundled_wheel) < MIN_PIP_VERSION:
+                    self.skipTest("No usable bundled pip wheel")
+
+                self.assertFalse(shared_pip.is_up_to_date())
+                pip_command = shared_pip.get_pip_command("python3")
+                self.assertTrue(shared_pip.is_up_to_date())
+
+                self.assertEqual(
+                    pip_command,
+                    ["python3", str(Path(cache_path, "pip", bundled_wheel.name, "pip"))]
+                )
+
     def boot_bootstrap_env_run(self, *args):
         return self._call(*args, filename="boot_bootstrap_env.py")
 
@@ -0,0 +1,174 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import io
+import os
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Bootstrap-Env
+from bootstrap_env import boot_bootstrap_env
+from bootstrap_env.boot_bootstrap_env import (
+    CACHE_DIR_ENV_NAME, TEMPLATE_MAX_AGE, WHEELHOUSE_INDEX_FILENAME, VenvTemplateCache, clone_tree, relocate_venv
+)
+from bootstrap_env.tests.utils import IsolatedFilesystem
+
+
+def create_fake_venv(env_dir):
+    """
+    Create a minimal directory structure, that looks like a virtualenv.
+    """
+    bin_path = Path(env_dir, "bin")
+    bin_path.mkdir(parents=True)
+    site_packages = Path(env_dir, "lib", "python3.6", "site-packages")
+    site_packages.mkdir(parents=True)
+
+    with Path(env_dir, "pyvenv.cfg").open("w") as f:
+        f.write("home = /usr/bin\ncommand = /usr/bin/python3 -m venv %s\n" % env_dir)
+
+    script = Path(bin_path, "foobar_admin.py")
+    with script.open("w") as f:
+        f.write("#!%s/bin/python\nprint('Hello World')\n" % env_dir)
+    script.chmod(0o755)
+
+    with Path(bin_path, "activate").open("w") as f:
+        f.write('VIRTUAL_ENV="%s"\nexport VIRTUAL_ENV\n' % env_dir)
+
+    with Path(bin_path, "binary").open("wb") as f:
+        f.write(b"\0%s\0" % os.fsencode(str(env_dir)))
+
+    os.symlink("/usr/bin/python3", str(Path(bin_path, "python")))
+
+    with Path(site_packages, "foobar.egg-link").open("w") as f:
+        f.write("%s/src/foobar\n." % env_dir)
+
+
+class TestVenvTemplateCache(unittest.TestCase):
+    def test_clone_and_relocate(self):
+        with IsolatedFilesystem(prefix="test_clone_and_relocate"):
+            old_env = Path().cwd() / "old_env"
+            new_env = Path().cwd() / "new_env"
+            create_fake_venv(old_env)
+
+            clone_tree(old_env, new_env, relocate=(str(old_env), str(new_env)))
+            changed = relocate_venv(new_env, old_env, new_env)
+            self.assertEqual(
+                sorted(path.name for path in changed),
+                ["activate", "foobar.egg-link", "foobar_admin.py", "pyvenv.cfg"]
+            )
+
+            script = Path(new_env, "bin", "foobar_admin.py")
+            with script.open("r") as f:
+                self.assertEqual(f.readline(), "#!%s/bin/python\n" % new_env)
+            self.assertTrue(os.access(str(script), os.X_OK))
+
+            with Path(new_env, "bin", "activate").open("r") as f:
+                self.assertIn('VIRTUAL_ENV="%s"' % new_env, f.read())
+
+            # Binaries are not touched:
+            with Path(new_env, "bin", "binary").open("rb") as f:
+                self.assertIn(os.fsencode(str(old_env)), f.read())
+
+            self.assertEqual(os.readlink(str(Path(new_env, "bin", "python"))), "/usr/bin/python3")
+
+            # The source is unchanged:
+            with Path(old_env, "bin", "foobar_admin.py").open("r") as f:
+                self.assertEqual(f.readline(), "#!%s/bin/python\n" % old_env)
+
+    def test_relocate_hardlinks(self):
+        with IsolatedFilesystem(prefix="test_relocate_hardlinks"):
+            old_env = Path().cwd() / "old_env"
+            new_env = Path().cwd() / "new_env"
+            create_fake_venv(old_env)
+
+            clone_tree(old_env, new_env, hardlink=True)
+            relocate_venv(new_env, old_env, new_env)
+
+            # relocated files are replaced and not changed in-place:
+            with Path(old_env, "bin", "activate").open("r") as f:
+                self.assertIn('VIRTUAL_ENV="%s"' % old_env, f.read())
+
+    def test_store_and_clone(self):
+        with IsolatedFilesystem(prefix="test_store_and_clone"):
+            temp_path = Path().cwd()
+            old_env = temp_path / "old_env"
+            create_fake_venv(old_env)
+
+            with mock.patch.dict(os.environ, {CACHE_DIR_ENV_NAME: str(temp_path / "cache")}):
+                cache = VenvTemplateCache(requirements=["foobar"])
+                self.assertFalse(cache.is_filled())
+                cache.store(old_env)
+                self.assertTrue(cache.is_filled())
+
+                self.assertEqual(VenvTemplateCache(requirements=["foobar"]).path, cache.path)
+                self.assertNotEqual(VenvTemplateCache(requirements=["other"]).path, cache.path)
+
+                new_env = temp_path / "new_env"
+                cache.clone(new_env)
+
+            self.assertFalse(Path(new_env, VenvTemplateCache.META_FILENAME).exists())
+            with Path(new_env, "pyvenv.cfg").open("r") as f:
+                self.assertIn("venv %s" % new_env, f.read())
+
+    def test_key(self):
+        with IsolatedFilesystem(prefix="test_template_key"):
+            wheelhouse = Path().cwd()
+            index_path = Path(wheelhouse, WHEELHOUSE_INDEX_FILENAME)
+            index_path.write_text('{"wheels": ["foo-1.0"]}')
+
+            key = VenvTemplateCache.get_key(["foobar"])
+            with mock.patch.object(boot_bootstrap_env, "REQUIREMENTS_LOCK", "foobar==1.0 --hash=sha256:abc\n"):
+                self.assertNotEqual(VenvTemplateCache.get_key(["foobar"]), key)
+
+            wheelhouse_key = VenvTemplateCache.get_key(["foobar"], wheelhouse=wheelhouse)
+            self.assertNotEqual(wheelhouse_key, key)
+            self.assertEqual(VenvTemplateCache.get_key(["foobar"], wheelhouse=wheelhouse), wheelhouse_key)
+
+            index_path.write_text('{"wheels": ["foo-1.1"]}')
+            self.assertNotEqual(VenvTemplateCache.get_key(["foobar"], wheelhouse=wheelhouse), wheelhouse_key)
+
+    def test_expired_template(self):
+        with IsolatedFilesystem(prefix="test_expired_template"):
+            temp_path = Path().cwd()
+            old_env = temp_path / "old_env"
+            create_fake_venv(old_env)
+
+            with mock.patch.dict(os.environ, {CACHE_DIR_ENV_NAME: str(temp_path / "cache")}), \
+                    mock.patch.object(boot_bootstrap_env, "REQUIREMENTS_LOCK", ""):
+                cache = VenvTemplateCache(requirements=["foobar"])
+                self.assertEqual(cache.max_age, TEMPLATE_MAX_AGE)
+                cache.store(old_env)
+                self.assertTrue(cache.is_filled())
+
+                with mock.patch.object(time, "time", return_value=time.time() + TEMPLATE_MAX_AGE + 1):
+                    self.assertFalse(cache.is_filled())
+                    cache.store(old_env) # replace the expired template
+                    self.assertTrue(cache.is_filled())
+                self.assertEqual(os.listdir(str(cache.path.parent)), [cache.path.name])
+
+                # Pinned requirements are never expired:
+                with mock.patch.object(boot_bootstrap_env, "REQUIREMENTS_LOCK", "foobar==1.0\n"):
+                    self.assertIsNone(VenvTemplateCache(requirements=["foobar"]).max_age)
+                self.assertIsNone(VenvTemplateCache(requirements=["foobar"], wheelhouse=temp_path).max_age)
+
+    def test_invalid_meta_of_pinned_template(self):
+        with IsolatedFilesystem(prefix="test_invalid_meta"):
+            temp_path = Path().cwd()
+            old_env = temp_path / "old_env"
+            create_fake_venv(old_env)
+
+            with mock.patch.dict(os.environ, {CACHE_DIR_ENV_NAME: str(temp_path / "cache")}):
+                cache = VenvTemplateCache(requirements=["foobar"], wheelhouse=temp_path)
+                self.assertIsNone(cache.max_age)
+                cache.store(old_env)
+                self.assertTrue(cache.is_filled())
+
+                cache.meta_path.write_text("{}")
+                with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                    self.assertFalse(cache.is_filled())
+                self.assertIn("meta file is missing or invalid", stdout.getvalue())
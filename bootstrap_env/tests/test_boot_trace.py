@@ -0,0 +1,82 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import json
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Bootstrap-Env
+from bootstrap_env import boot_bootstrap_env
+from bootstrap_env.boot_bootstrap_env import TRACE_ENV_NAME, Tracer, VerboseSubprocess
+from bootstrap_env.tests.utils import IsolatedFilesystem
+
+
+class TestTracer(unittest.TestCase):
+    def test_setup(self):
+        with mock.patch.dict(os.environ, clear=True):
+            tracer = Tracer()
+            argv = ["foo_admin.py", "update_env"]
+            tracer.setup(argv)
+            self.assertFalse(tracer.enabled)
+
+            with mock.patch("atexit.register") as register:
+                argv = ["foo_admin.py", "--trace", "/tmp/trace.json", "update_env", "--force"]
+                tracer.setup(argv)
+
+            self.assertEqual(argv, ["foo_admin.py", "update_env", "--force"])
+            self.assertTrue(tracer.enabled)
+            self.assertTrue(tracer.is_root)
+            register.assert_called_once_with(tracer.save)
+
+            # inherited by subprocesses:
+            self.assertEqual(os.environ[TRACE_ENV_NAME], str(Path("/tmp/trace.json").resolve()))
+            self.assertEqual(os.environ[Tracer.ROOT_PID_ENV_NAME], str(os.getpid()))
+
+    def test_spans_and_subprocess(self):
+        with IsolatedFilesystem(prefix="test_spans_and_subprocess"):
+            trace_path = Path().cwd() / "trace.json"
+            tracer = Tracer()
+
+            with mock.patch.dict(os.environ, clear=False), mock.patch("atexit.register"):
+                os.environ.pop(Tracer.ROOT_PID_ENV_NAME, None)
+                tracer.enable(trace_path)
+
+                with mock.patch.object(boot_bootstrap_env, "tracer", tracer):
+                    with tracer.span("outer") as args:
+                        args["foo"] = "bar"
+                        script = (
+                            "from bootstrap_env.boot_bootstrap_env import tracer\n"
+                            "tracer.setup()\n"
+                            "with tracer.span('child'):\n"
+                            "    print('Collecting foo')\n"
+                            "    print('Successfully installed foo')\n"
+                        )
+                        VerboseSubprocess(sys.executable, "-c", script).verbose_call(check=True)
+
+                tracer.save()
+
+            with trace_path.open("r") as f:
+                events = json.load(f)["traceEvents"]
+
+            self.assertEqual(list(trace_path.parent.glob("*.part")), [])
+
+            events = {event["name"]: event for event in events}
+            self.assertEqual(events["outer"]["args"], {"foo": "bar"})
+
+            subprocess_event = events["%s -c %s" % (sys.executable, script)]
+            self.assertEqual(subprocess_event["cat"], "subprocess")
+            self.assertEqual(subprocess_event["args"], {"exit_code": 0})
+            self.assertEqual(events["pip collect"]["cat"], "pip")
+
+            # merged from the *.part file of the traced python subprocess:
+            self.assertNotEqual(events["child"]["pid"], os.getpid())
+            self.assertEqual(events["outer"]["pid"], os.getpid())
+
+            self.assertLessEqual(events["outer"]["ts"], subprocess_event["ts"])
+            self.assertLessEqual(subprocess_event["ts"], events["child"]["ts"])
@@ -0,0 +1,157 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import base64
+import csv
+import hashlib
+import os
+import subprocess
+import sys
+import unittest
+import zipfile
+from pathlib import Path
+
+# Bootstrap-Env
+from bootstrap_env.boot_bootstrap_env import collect_wheels, get_scheme_paths, install_wheels, is_wheel_supported
+from bootstrap_env.tests.utils import IsolatedFilesystem
+
+
+def create_wheel(directory, name, version, tag="py3-none-any"):
+    """
+    Create a minimal pure python wheel with one console_scripts entry point.
+    """
+    dist_info = "%s-%s.dist-info" % (name, version)
+    wheel_path = Path(directory, "%s-%s-%s.whl" % (name, version, tag))
+    files = [
+        ("%s/__init__.py" % name, "def main():\n    print('Hello from %s')\n" % name),
+        ("%s/METADATA" % dist_info, "Metadata-Version: 2.1\nName: %s\nVersion: %s\n" % (name, version)),
+        ("%s/WHEEL" % dist_info, "Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n"),
+        ("%s/entry_points.txt" % dist_info, "[console_scripts]\n%s_cli = %s:main\n" % (name, name)),
+        ("%s.data/scripts/%s_script" % (dist_info[:-len(".dist-info")], name), "#!python\nprint(1)\n"),
+    ]
+    with zipfile.ZipFile(str(wheel_path), "w") as wheel:
+        records = []
+        for filename, content in files:
+            content = content.encode("utf-8")
+            wheel.writestr(filename, content)
+            hash_value = base64.urlsafe_b64encode(hashlib.sha256(content).digest()).rstrip(b"=").decode("ascii")
+            records.append("%s,sha256=%s,%i\n" % (filename, hash_value, len(content)))
+        records.append("%s/RECORD,,\n" % dist_info)
+        wheel.writestr("%s/RECORD" % dist_info, "".join(records))
+    return wheel_path
+
+
+class TestParallelWheelInstall(unittest.TestCase):
+    def test_collect_wheels(self):
+        with IsolatedFilesystem(prefix="test_collect_wheels"):
+            temp_path = Path().cwd()
+            create_wheel(temp_path, "foo", "1.0")
+            create_wheel(temp_path, "foo", "1.10")
+            create_wheel(temp_path, "bar", "2.0")
+
+            wheels = [path.name for path in collect_wheels(temp_path)]
+            self.assertEqual(wheels, ["bar-2.0-py3-none-any.whl", "foo-1.10-py3-none-any.whl"])
+
+    def test_collect_wheels_skips_unsupported_tags(self):
+        with IsolatedFilesystem(prefix="test_collect_wheels_tags"):
+            temp_path = Path().cwd()
+            create_wheel(temp_path, "foo", "1.0")
+            create_wheel(temp_path, "foo", "2.0", tag="cp27-cp27mu-manylinux1_x86_64")
+            create_wheel(temp_path, "bar", "1.0", tag="py2-none-any")
+
+            wheels = [path.name for path in collect_wheels(temp_path)]
+            self.assertEqual(wheels, ["foo-1.0-py3-none-any.whl"])
+
+    def test_is_wheel_supported(self):
+        self.assertTrue(is_wheel_supported("foo-1.0-py2.py3-none-any.whl"))
+        self.assertTrue(is_wheel_supported("foo-1.0-1build-py3-none-any.whl"))
+        self.assertTrue(is_wheel_supported("foo-1.0-py%i%i-none-any.whl" % sys.version_info[:2]))
+        self.assertFalse(is_wheel_supported("foo-1.0-py%i%i-none-any.whl" % (sys.version_info[0], 99)))
+        self.assertFalse(is_wheel_supported("foo-1.0-py3-none-unknown_platform.whl"))
+        self.assertFalse(is_wheel_supported("foo-1.0-cp27-cp27mu-any.whl"))
+        self.assertFalse(is_wheel_supported("invalid.whl"))
+
+    def test_install_wheels_skips_installed_projects(self):
+        with IsolatedFilesystem(prefix="test_install_wheels_installed"):
+            temp_path = Path().cwd()
+            old_wheelhouse = Path(temp_path, "old")
+            old_wheelhouse.mkdir()
+            create_wheel(old_wheelhouse, "foo", "1.0")
+
+            wheelhouse = Path(temp_path, "wheelhouse")
+            wheelhouse.mkdir()
+            create_wheel(wheelhouse, "foo", "2.0")
+            create_wheel(wheelhouse, "bar", "1.0")
+
+            env_dir = Path(temp_path, "env")
+            python_exe = Path(env_dir, "bin", "python")
+            install_wheels(collect_wheels(old_wheelhouse), env_dir, python_exe, max_workers=1)
+            install_wheels(collect_wheels(wheelhouse), env_dir, python_exe, max_workers=1)
+
+            site_packages = Path(get_scheme_paths(env_dir)["purelib"])
+            self.assertEqual(
+                sorted(path.name for path in site_packages.glob("*.dist-info")),
+                ["bar-1.0.dist-info", "foo-1.0.dist-info"]
+            )
+
+    def test_install_wheels(self):
+        with IsolatedFilesystem(prefix="test_install_wheels"):
+            temp_path = Path().cwd()
+            wheelhouse = Path(temp_path, "wheelhouse")
+            wheelhouse.mkdir()
+            for name in ("foo", "bar", "baz"):
+                create_wheel(wheelhouse, name, "1.0")
+
+            env_dir = Path(temp_path, "env")
+            python_exe = Path(env_dir, "bin", "python")
+            install_wheels(collect_wheels(wheelhouse), env_dir, python_exe, max_workers=2)
+
+            scheme_paths = get_scheme_paths(env_dir)
+            site_packages = Path(scheme_paths["purelib"])
+            bin_path = Path(scheme_paths["scripts"])
+
+            for name in ("foo", "bar", "baz"):
+                self.assertTrue(Path(site_packages, name, "__init__.py").is_file())
+
+                script = Path(bin_path, "%s_cli" % name)
+                with script.open("r") as f:
+                    content = f.read()
+                self.assertTrue(content.startswith("#!%s\n" % python_exe))
+                self.assertIn("from %s import main" % name, content)
+                self.assertTrue(os.access(str(script), os.X_OK))
+
+                with Path(bin_path, "%s_script" % name).open("r") as f:
+                    self.assertEqual(f.readline(), "#!%s\n" % python_exe)
+
+                dist_info = Path(site_packages, "%s-1.0.dist-info" % name)
+                with Path(dist_info, "INSTALLER").open("r") as f:
+                    self.assertEqual(f.read(), "bootstrap_env\n")
+
+                with Path(dist_info, "RECORD").open("r") as f:
+                    records = {row[0]: row for row in csv.reader(f)}
+
+                self.assertEqual(
+                    sorted(records),
+                    sorted([
+                        "%s/__init__.py" % name,
+                        "%s-1.0.dist-info/METADATA" % name,
+                        "%s-1.0.dist-info/WHEEL" % name,
+                        "%s-1.0.dist-info/entry_points.txt" % name,
+                        "%s-1.0.dist-info/INSTALLER" % name,
+                        "%s-1.0.dist-info/RECORD" % name,
+                        "../../../bin/%s_cli" % name,
+                        "../../../bin/%s_script" % name,
+                    ])
+                )
+                self.assertTrue(records["%s/__init__.py" % name][1].startswith("sha256="))
+
+            # The installed package is usable:
+            output = subprocess.check_output(
+                [sys.executable, "-c", "import foo;foo.main()"],
+                env={"PYTHONPATH": str(site_packages)},
+                universal_newlines=True,
+            )
+            self.assertEqual(output, "Hello from foo\n")
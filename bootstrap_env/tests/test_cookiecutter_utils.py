@@ -0,0 +1,106 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import io
+import json
+import os
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Bootstrap-Env
+import bootstrap_env
+from bootstrap_env.admin_shell.normal_shell import AdminShell
+from bootstrap_env.tests.utils import IsolatedFilesystem
+from bootstrap_env.version import __version__ as bootstrap_env_version
+
+try:
+    from bootstrap_env.utils.cookiecutter_utils import BootFileRenderer
+except ImportError: # cookiecutter not installed
+    BootFileRenderer = None
+
+PACKAGE_PATH = Path(bootstrap_env.__file__).parent
+BOOT_SOURCE_PATH = Path(PACKAGE_PATH, "boot_source")
+
+
+@unittest.skipIf(BootFileRenderer is None, "cookiecutter not installed")
+class TestBootFileRenderer(unittest.TestCase):
+    def test_render(self):
+        with IsolatedFilesystem(prefix="test_render"):
+            temp_path = Path().cwd()
+            renderer = BootFileRenderer(BOOT_SOURCE_PATH, extra_context={"_version": bootstrap_env_version})
+
+            output_path = Path(temp_path, "bootstrap_env", "boot_bootstrap_env.py")
+            self.assertEqual(renderer.render({}, temp_path), [(output_path, "created")])
+
+            # Same as the cookiecutter generated own boot file:
+            with output_path.open("rb") as f:
+                content = f.read()
+            with Path(PACKAGE_PATH, "boot_bootstrap_env.py").open("rb") as f:
+                self.assertEqual(content, f.read())
+            self.assertTrue(os.access(str(output_path), os.X_OK))
+
+            os.utime(str(output_path), (0, 0))
+            self.assertEqual(renderer.render({}, temp_path), [(output_path, "unchanged")])
+            self.assertEqual(output_path.stat().st_mtime, 0)
+
+            self.assertEqual(
+                renderer.render({"editable_url": "git+https://foo/bar.git"}, temp_path),
+                [(output_path, "updated")]
+            )
+            with output_path.open("r") as f:
+                self.assertIn("git+https://foo/bar.git", f.read())
+
+    def test_generate_bootstrap_prompt(self):
+        with IsolatedFilesystem(prefix="test_generate_bootstrap"):
+            shell = AdminShell.__new__(AdminShell)
+            shell.path_helper = types.SimpleNamespace(base=PACKAGE_PATH)
+            shell.confirm = lambda txt: True
+
+            asked = []
+
+            def fake_input(prompt):
+                asked.append(prompt.split(" ", 1)[0])
+                return ""
+
+            with mock.patch("builtins.input", fake_input), mock.patch("sys.stdout", new_callable=io.StringIO):
+                shell.do_generate_bootstrap(str(Path(Path().cwd(), "new_project")))
+
+            self.assertIn("project_name", asked)
+            self.assertNotIn("requirements_lock", asked)
+            self.assertTrue(Path("new_project", "bootstrap_env", "boot_bootstrap_env.py").is_file())
+
+    def test_generate_bootstraps(self):
+        with IsolatedFilesystem(prefix="test_generate_bootstraps"):
+            temp_path = Path().cwd()
+            with Path(temp_path, "manifest.csv").open("w") as f:
+                f.write(
+                    "project_name,package_name,bootstrap_filename,output_dir\n"
+                    "foo,foo,boot_foo,\n"
+                    "bar,bar_pkg,boot_bar,sub\n"
+                )
+            with Path(temp_path, "manifest.json").open("w") as f:
+                json.dump([{"project_name": "foo", "package_name": "foo", "bootstrap_filename": "boot_foo"}], f)
+
+            shell = AdminShell.__new__(AdminShell)
+            shell.stdout = io.StringIO()
+            shell.path_helper = types.SimpleNamespace(base=PACKAGE_PATH)
+
+            shell.do_generate_bootstraps("manifest.csv")
+            output = shell.stdout.getvalue()
+            print(output)
+            self.assertIn("created", output)
+            self.assertIn("2 projects rendered, 0 failed.", output)
+
+            with Path(temp_path, "sub", "bar", "boot_bar.py").open("r") as f:
+                self.assertIn('PACKAGE_NAME="bar_pkg"', f.read())
+
+            shell.stdout = io.StringIO()
+            shell.do_generate_bootstraps("manifest.json --output-dir %s" % temp_path)
+            output = shell.stdout.getvalue()
+            print(output)
+            self.assertIn("foo                  unchanged %s" % Path(temp_path, "foo", "boot_foo.py"), output)
@@ -0,0 +1,160 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import io
+import os
+import shutil
+import sys
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Bootstrap-Env
+from bootstrap_env.boot_bootstrap_env import CACHE_DIR_ENV_NAME, SubprocessResult
+from bootstrap_env.tests.utils import IsolatedFilesystem
+
+try:
+    from bootstrap_env.admin_shell import developer_shell
+except ImportError: # e.g.: cookiecutter not installed
+    developer_shell = None
+
+
+def get_shell(**path_helper_kwargs):
+    """
+    Returns a DeveloperAdminShell instance without the 'developer' mode checks
+    """
+    shell = developer_shell.DeveloperAdminShell.__new__(developer_shell.DeveloperAdminShell)
+    shell.stdout = io.StringIO()
+    shell.package_name = "foobar"
+    shell.path_helper = types.SimpleNamespace(**path_helper_kwargs)
+    return shell
+
+
+class FakeConcurrentSubprocesses:
+    """
+    Records all pip-compile calls and creates the *.txt output files.
+    """
+    calls = []
+
+    def __init__(self, *args, **kwargs):
+        self.commands = []
+
+    def add(self, *popenargs, name=None, cwd=None, env_updates=None):
+        self.commands.append((popenargs, name, cwd))
+
+    def run(self, check=False):
+        results = []
+        for popenargs, name, cwd in self.commands:
+            self.calls.append(name)
+            output_filename = popenargs[popenargs.index("-o") + 1]
+            with Path(cwd, output_filename).open("w") as f:
+                f.write("foo==1.0\n")
+            results.append(SubprocessResult(name, popenargs, 0, 0.1, False))
+        return results
+
+    def print_summary(self, results):
+        pass
+
+
+@unittest.skipIf(developer_shell is None, "developer shell not importable")
+class TestUpgradeRequirements(unittest.TestCase):
+    def test_skip_unchanged(self):
+        with IsolatedFilesystem(prefix="test_upgrade_requirements"):
+            temp_path = Path().cwd()
+            req_path = Path(temp_path, "requirements")
+            req_path.mkdir()
+            for filename, content in (
+                ("basic_requirements.in", "foo\n"),
+                ("normal_installation.in", "-r basic_requirements.in\n"),
+                ("test_requirements.in", "pytest\n"),
+            ):
+                with Path(req_path, filename).open("w") as f:
+                    f.write(content)
+
+            shell = get_shell(req_path=req_path)
+            FakeConcurrentSubprocesses.calls = []
+
+            def upgrade_requirements(arg=""):
+                FakeConcurrentSubprocesses.calls.clear()
+                with mock.patch.object(developer_shell, "ConcurrentSubprocesses", FakeConcurrentSubprocesses), \
+                        mock.patch.object(developer_shell, "OutdatedChecker") as checker, \
+                        mock.patch.object(sys, "prefix", str(temp_path)), \
+                        mock.patch.dict(os.environ, {CACHE_DIR_ENV_NAME: str(temp_path / "cache")}):
+                    checker.return_value.check.return_value = [("foo", "1.0", "1.1")]
+                    shell.do_upgrade_requirements(arg)
+                    for call in checker.return_value.check.call_args_list:
+                        self.assertEqual(call, mock.call({"foo": "1.0"}))
+                return sorted(FakeConcurrentSubprocesses.calls)
+
+            self.assertEqual(upgrade_requirements(), ["normal_installation.in", "test_requirements.in"])
+
+            with Path(req_path, "normal_installation.txt").open("r") as f:
+                self.assertIn("# foo (1.0) is out of date. Latest is 1.1", f.read())
+
+            self.assertEqual(upgrade_requirements(), [])
+
+            # Change in a included file:
+            with Path(req_path, "basic_requirements.in").open("w") as f:
+                f.write("foo\nbar\n")
+            self.assertEqual(upgrade_requirements(), ["normal_installation.in"])
+
+            # The package index snapshot is outdated:
+            with mock.patch("time.time", return_value=developer_shell.time.time() + 2 * shell.INDEX_SNAPSHOT_PERIOD):
+                self.assertEqual(upgrade_requirements(), ["normal_installation.in", "test_requirements.in"])
+
+            self.assertEqual(upgrade_requirements("--force"), ["normal_installation.in", "test_requirements.in"])
+
+
+@unittest.skipIf(developer_shell is None, "developer shell not importable")
+class TestUpdateOwnBootFile(unittest.TestCase):
+    def test_skip_unchanged(self):
+        source_path = Path(developer_shell.__file__).parent.parent
+        with IsolatedFilesystem(prefix="test_update_own_boot_file"):
+            base = Path(Path().cwd(), "bootstrap_env")
+            shutil.copytree(str(Path(source_path, "boot_source")), str(Path(base, "boot_source")))
+            boot_path = Path(base, "boot_bootstrap_env.py")
+
+            shell = get_shell(
+                base=base, boot_path=boot_path, lock_filepath=Path(base, "requirements", "lock.txt")
+            )
+
+            def update_own_boot_file():
+                with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                    shell.do_update_own_boot_file("")
+                return stdout.getvalue()
+
+            output = update_own_boot_file()
+            self.assertIn("bootstrap file created here: %s (created)" % boot_path, output)
+            with Path(source_path, "boot_bootstrap_env.py").open("rb") as f:
+                origin_content = f.read()
+            with boot_path.open("rb") as f:
+                self.assertEqual(f.read(), origin_content)
+
+            output = update_own_boot_file()
+            self.assertIn("skip rendering", output)
+            self.assertIn("bootstrap file created here: %s (unchanged)" % boot_path, output)
+
+            # Manual changes in the boot file will be overwritten:
+            with boot_path.open("a") as f:
+                f.write("# manual change\n")
+            output = update_own_boot_file()
+            self.assertIn("bootstrap file created here: %s (updated)" % boot_path, output)
+            with boot_path.open("rb") as f:
+                self.assertEqual(f.read(), origin_content)
+
+            # Changed template:
+            source_file = Path(
+                base, "boot_source", "{{cookiecutter.project_name}}", "{{cookiecutter.bootstrap_filename}}.py"
+            )
+            with source_file.open("a") as f:
+                f.write("# template change\n")
+            output = update_own_boot_file()
+            self.assertIn("bootstrap file created here: %s (updated)" % boot_path, output)
+            with boot_path.open("r") as f:
+                self.assertTrue(f.read().endswith("# template change\n"))
+
+            self.assertIn("skip rendering", update_own_boot_file())
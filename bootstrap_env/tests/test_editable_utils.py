@@ -0,0 +1,87 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import json
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Bootstrap-Env
+from bootstrap_env.tests.utils import IsolatedFilesystem
+from bootstrap_env.utils.editable_utils import (
+    EditableInfo, get_editable_info, get_install_levels, iter_git_checkouts
+)
+
+
+def write(path, content):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as f:
+        f.write(content)
+
+
+class TestEditableUtils(unittest.TestCase):
+    def test_get_editable_info(self):
+        with IsolatedFilesystem(prefix="test_get_editable_info"):
+            temp_path = Path().cwd()
+            src_path = Path(temp_path, "src")
+
+            # installed via 'setup.py develop':
+            write(src_path / "foo/.git/HEAD", "ref: refs/heads/master\n")
+            write(src_path / "foo/foo_bar.egg-info/requires.txt", "bar>=1.0\nbaz\n\n[docs]\nsphinx\n")
+
+            # installed via PEP 660:
+            write(src_path / "bar/.git/HEAD", "ref: refs/heads/master\n")
+            site_packages = Path(temp_path, "site-packages")
+            write(site_packages / "bar-1.0.dist-info/direct_url.json", json.dumps({
+                "url": (src_path / "bar").resolve().as_uri(), "dir_info": {"editable": True}
+            }))
+            write(site_packages / "bar-1.0.dist-info/METADATA", (
+                "Metadata-Version: 2.1\nName: bar\nVersion: 1.0\n"
+                "Requires-Dist: requests\nRequires-Dist: pytest ; extra == 'test'\n\nLong description\n"
+            ))
+
+            # never installed:
+            write(src_path / "new/.git/HEAD", "ref: refs/heads/master\n")
+
+            # no git checkouts:
+            (src_path / "other").mkdir()
+            write(src_path / "foo.bak/.git/HEAD", "ref: refs/heads/master\n")
+
+            checkouts = list(iter_git_checkouts(src_path))
+            self.assertEqual([path.name for path in checkouts], ["bar", "foo", "new"])
+
+            paths = {"purelib": str(site_packages), "platlib": str(site_packages)}
+            with mock.patch("sysconfig.get_paths", return_value=paths):
+                infos = [get_editable_info(path) for path in checkouts]
+
+            self.assertEqual(infos, [
+                EditableInfo(src_path / "bar", "bar", ["requests"]),
+                EditableInfo(src_path / "foo", "foo_bar", ["bar>=1.0", "baz"]),
+                EditableInfo(src_path / "new", "new", []),
+            ])
+
+    def test_get_install_levels(self):
+        editables = [
+            EditableInfo(Path("a"), "a", ["b>=1.0", "requests"]),
+            EditableInfo(Path("b"), "B", ["c_d ; python_version>'3'"]),
+            EditableInfo(Path("c"), "c.d", []),
+            EditableInfo(Path("e"), "e", []),
+        ]
+        levels = get_install_levels(editables)
+        self.assertEqual(
+            [[info.name for info in level] for level in levels],
+            [["c.d", "e"], ["B"], ["a"]]
+        )
+
+        # dependency cycle:
+        editables = [
+            EditableInfo(Path("a"), "a", ["b"]),
+            EditableInfo(Path("b"), "b", ["a"]),
+            EditableInfo(Path("c"), "c", []),
+        ]
+        levels = get_install_levels(editables)
+        self.assertEqual([[info.name for info in level] for level in levels], [["c"], ["a", "b"]])
@@ -0,0 +1,83 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+import subprocess
+import unittest
+from pathlib import Path
+
+# Bootstrap-Env
+from bootstrap_env.tests.utils import IsolatedFilesystem
+from bootstrap_env.utils.fingerprint_utils import StepFingerprints, get_requirements_hashes, iter_requirement_files
+from bootstrap_env.utils.git_utils import get_git_head
+
+
+class TestFingerprintUtils(unittest.TestCase):
+    def test_iter_requirement_files(self):
+        with IsolatedFilesystem(prefix="test_iter_requirement_files"):
+            temp_path = Path().cwd()
+            Path(temp_path, "sub").mkdir()
+            with Path(temp_path, "main.txt").open("w") as f:
+                f.write("-r basic.txt\n--requirement=sub/test.txt\n-e git+https://foo/bar.git#egg=bar\nfoo==1.0\n")
+            with Path(temp_path, "basic.txt").open("w") as f:
+                f.write("-c constraints.txt # pinned\n-r main.txt\n")
+            with Path(temp_path, "constraints.txt").open("w") as f:
+                f.write("bar<2\n")
+            with Path(temp_path, "sub", "test.txt").open("w") as f:
+                f.write("pytest\n")
+
+            files = [path.relative_to(temp_path) for path in iter_requirement_files("main.txt")]
+            self.assertEqual(files, [
+                Path("main.txt"), Path("basic.txt"), Path("constraints.txt"), Path("sub", "test.txt")
+            ])
+
+            hashes = get_requirements_hashes("main.txt")
+            with Path(temp_path, "constraints.txt").open("w") as f:
+                f.write("bar<3\n")
+            self.assertNotEqual(hashes, get_requirements_hashes("main.txt"))
+
+    def test_step_fingerprints(self):
+        with IsolatedFilesystem(prefix="test_step_fingerprints"):
+            path = Path(Path().cwd(), "fingerprints.json")
+            state = {"value": 1}
+
+            def inputs():
+                return dict(state)
+
+            fingerprints = StepFingerprints(path)
+            self.assertFalse(fingerprints.is_unchanged("step1", inputs))
+            fingerprints.succeeded("step1", inputs)
+            self.assertFalse(fingerprints.is_unchanged("step2", inputs)) # failed -> not stored
+            state["value"] = 2 # e.g.: changed by a later step
+            fingerprints.save()
+
+            fingerprints = StepFingerprints(path)
+            self.assertTrue(fingerprints.is_unchanged("step1", inputs))
+            self.assertFalse(fingerprints.is_unchanged("step2", inputs))
+            fingerprints.save()
+
+            self.assertFalse(StepFingerprints(path, force=True).is_unchanged("step1", inputs))
+
+            state["value"] = 3
+            self.assertFalse(StepFingerprints(path).is_unchanged("step1", inputs))
+
+    def test_get_git_head(self):
+        with IsolatedFilesystem(prefix="test_get_git_head"):
+            temp_path = Path().cwd()
+            self.assertIsNone(get_git_head(temp_path))
+
+            try:
+                subprocess.check_call(["git", "init", "--quiet", "."])
+                subprocess.check_call([
+                    "git", "-c", "user.name=test", "-c", "user.email=test@example.com",
+                    "commit", "--quiet", "--allow-empty", "-m", "test"
+                ])
+                head = subprocess.check_output(["git", "rev-parse", "HEAD"], universal_newlines=True).strip()
+            except (OSError, subprocess.CalledProcessError) as err:
+                self.skipTest("git not usable: %s" % err)
+
+            self.assertEqual(get_git_head(temp_path), head)
+
+            subprocess.check_call(["git", "pack-refs", "--all"])
+            self.assertEqual(get_git_head(temp_path), head)
@@ -0,0 +1,84 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import unittest
+from pathlib import Path
+
+# Bootstrap-Env
+from bootstrap_env.tests.utils import IsolatedFilesystem
+from bootstrap_env.utils.git_utils import UnsupportedGitConfig, read_git_remotes, set_git_remote_urls
+
+GIT_CONFIG = """\
+[core]
+\trepositoryformatversion = 0
+# A comment
+[remote "origin"]
+\turl = https://github.com/jedie/bootstrap_env.git
+\tfetch = +refs/heads/*:refs/remotes/origin/*
+[remote "upstream"]
+\turl = https://gitlab.com/foo/bar.git
+\tfetch = +refs/heads/*:refs/remotes/upstream/*
+[branch "master"]
+\tremote = origin
+"""
+
+
+def create_checkout(path, config):
+    git_dir = Path(path, ".git")
+    git_dir.mkdir(parents=True)
+    with Path(git_dir, "config").open("w") as f:
+        f.write(config)
+    return Path(git_dir, "config")
+
+
+class TestGitConfig(unittest.TestCase):
+    def test_read_and_set_remote_urls(self):
+        with IsolatedFilesystem(prefix="test_read_and_set_remote_urls"):
+            config_path = create_checkout("checkout", GIT_CONFIG)
+            config_path.chmod(0o640)
+
+            self.assertEqual(read_git_remotes("checkout"), {
+                "origin": "https://github.com/jedie/bootstrap_env.git",
+                "upstream": "https://gitlab.com/foo/bar.git",
+            })
+
+            set_git_remote_urls("checkout", {"origin": "git@github.com:jedie/bootstrap_env.git"})
+
+            with config_path.open("r") as f:
+                config = f.read()
+
+            # Only the url line is changed:
+            self.assertEqual(config, GIT_CONFIG.replace(
+                "https://github.com/jedie/bootstrap_env.git", "git@github.com:jedie/bootstrap_env.git"
+            ))
+            self.assertEqual(config_path.stat().st_mode & 0o777, 0o640)
+            self.assertFalse(Path("checkout/.git/config.lock").exists())
+
+    def test_unsupported(self):
+        with IsolatedFilesystem(prefix="test_unsupported"):
+            with self.assertRaises(UnsupportedGitConfig):
+                read_git_remotes(".")  # no git checkout
+
+            create_checkout("include", GIT_CONFIG + "[include]\n\tpath = ../other.config\n")
+            with self.assertRaises(UnsupportedGitConfig):
+                read_git_remotes("include")
+
+            create_checkout("quoted", GIT_CONFIG.replace("url = https", 'url = "https'))
+            with self.assertRaises(UnsupportedGitConfig):
+                read_git_remotes("quoted")
+
+    def test_locked_config(self):
+        with IsolatedFilesystem(prefix="test_locked_config"):
+            config_path = create_checkout("checkout", GIT_CONFIG)
+            Path("checkout/.git/config.lock").touch()
+
+            with self.assertRaises(UnsupportedGitConfig):
+                set_git_remote_urls("checkout", {"origin": "git@github.com:jedie/bootstrap_env.git"})
+
+            # The lock of the other process is not removed:
+            self.assertTrue(Path("checkout/.git/config.lock").exists())
+            with config_path.open("r") as f:
+                self.assertEqual(f.read(), GIT_CONFIG)
@@ -0,0 +1,180 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import http.server
+import json
+import os
+import socket
+import socketserver
+import threading
+import unittest
+import urllib.parse
+from pathlib import Path
+from unittest import mock
+
+# Bootstrap-Env
+from bootstrap_env.tests.utils import IsolatedFilesystem
+from bootstrap_env.utils.outdated_utils import (
+    IndexResponseCache, OutdatedChecker, get_pip_option, iter_pinned_requirements, version_from_filename
+)
+
+try:
+    import packaging
+except ImportError:
+    packaging = None
+
+
+PAGES = {
+    "/simple/foo-bar/": (
+        "text/html",
+        '<a href="../../packages/foo_bar-1.0-py3-none-any.whl#sha256=00">foo_bar-1.0-py3-none-any.whl</a>'
+        '<a href="../../packages/foo-bar-1.1.tar.gz">foo-bar-1.1.tar.gz</a>'
+        '<a href="../../packages/foo_bar-1.2-py3-none-any.whl" data-yanked="">foo_bar-1.2-py3-none-any.whl</a>'
+        '<a href="../../packages/foo_bar-2.0a1-py3-none-any.whl">foo_bar-2.0a1-py3-none-any.whl</a>'
+    ),
+    "/simple/baz/": (
+        "application/vnd.pypi.simple.v1+json",
+        json.dumps({"files": [{"filename": "baz-0.9.zip"}, {"filename": "baz-1.0.tar.gz", "yanked": True}]})
+    ),
+}
+
+
+class IndexHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive
+    requests = []
+
+    def do_GET(self):
+        if self.path.startswith("http://"):
+            # Request via proxy, e.g.: "http://index.invalid/simple/baz/"
+            self.path = urllib.parse.urlsplit(self.path).path
+        self.requests.append(self.path)
+        if self.path == "/simple/Foo_Bar/":
+            self.send_response(301)
+            self.send_header("Location", "/simple/foo-bar/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        try:
+            content_type, body = PAGES[self.path]
+        except KeyError:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class TestOutdatedUtils(unittest.TestCase):
+    def test_version_from_filename(self):
+        self.assertEqual(version_from_filename("foo-bar", "foo_bar-1.0-py3-none-any.whl"), "1.0")
+        self.assertEqual(version_from_filename("foo-bar", "Foo.Bar-1.0.post1.tar.gz"), "1.0.post1")
+        self.assertEqual(version_from_filename("foo-bar", "foo-bar-baz-1.0.tar.gz"), None)
+        self.assertEqual(version_from_filename("foo", "foo-1.0.exe"), None)
+
+    def test_iter_pinned_requirements(self):
+        with IsolatedFilesystem(prefix="test_iter_pinned_requirements"):
+            with Path("requirements.txt").open("w") as f:
+                f.write(
+                    "#\n# This file is autogenerated by pip-compile\n#\n"
+                    "-e git+https://github.com/foo/bar.git#egg=bar\n"
+                    "foo-bar[extra]==1.0 \\\n    --hash=sha256:00\n"
+                    "baz==0.9                  # via foo-bar\n"
+                    "other>=1.0\n"
+                )
+            self.assertEqual(
+                list(iter_pinned_requirements("requirements.txt")),
+                [("foo-bar", "1.0"), ("baz", "0.9")]
+            )
+
+    def test_get_pip_option(self):
+        config = {"global.index-url": "https://global.invalid/simple", "install.proxy": "http://proxy.invalid"}
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertEqual(get_pip_option(config, "index-url"), "https://global.invalid/simple")
+            self.assertEqual(get_pip_option(config, "proxy"), "http://proxy.invalid")
+            self.assertIsNone(get_pip_option(config, "timeout"))
+        with mock.patch.dict(os.environ, {"PIP_INDEX_URL": "https://env.invalid/simple"}):
+            self.assertEqual(get_pip_option(config, "index-url"), "https://env.invalid/simple")
+
+    @unittest.skipIf(packaging is None, "packaging not installed")
+    def test_network_errors(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1] # nothing is listening on this port
+
+        with IsolatedFilesystem(prefix="test_outdated_network_errors"):
+            cache = IndexResponseCache(path=Path().cwd())
+            checker = OutdatedChecker(index_url="http://127.0.0.1:%i/simple" % port, cache=cache)
+            self.assertEqual(checker.check({"foo": "1.0", "bar": "2.0"}), [])
+            self.assertEqual(sorted(checker.errors), ["bar", "foo"])
+            self.assertIsInstance(checker.errors["foo"], OSError)
+
+    @unittest.skipIf(packaging is None, "packaging not installed")
+    def test_proxy(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), IndexHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with IsolatedFilesystem(prefix="test_outdated_proxy"):
+                IndexHandler.requests = []
+                checker = OutdatedChecker(
+                    index_url="http://index.invalid/simple",
+                    cache=IndexResponseCache(path=Path().cwd()),
+                    proxy="http://127.0.0.1:%i" % server.server_address[1],
+                )
+                self.assertEqual(checker.check({"Foo_Bar": "1.0", "baz": "0.9"}), [("Foo_Bar", "1.0", "1.1")])
+                self.assertEqual(checker.errors, {})
+                self.assertEqual(sorted(IndexHandler.requests), ["/simple/baz/", "/simple/foo-bar/"])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @unittest.skipIf(packaging is None, "packaging not installed")
+    def test_check(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), IndexHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            index_url = "http://127.0.0.1:%i/simple" % server.server_address[1]
+            with IsolatedFilesystem(prefix="test_outdated_check"):
+                cache = IndexResponseCache(path=Path().cwd())
+                IndexHandler.requests = []
+
+                checker = OutdatedChecker(index_url=index_url, cache=cache, max_workers=1)
+                pinned = {"Foo_Bar": "1.0", "baz": "0.9", "unknown": "1.0"}
+                outdated = [("Foo_Bar", "1.0", "1.1")]
+
+                self.assertEqual(checker.check(pinned), outdated)
+                self.assertEqual(
+                    sorted(IndexHandler.requests), ["/simple/baz/", "/simple/foo-bar/", "/simple/unknown/"]
+                )
+
+                # Cached:
+                IndexHandler.requests = []
+                self.assertEqual(OutdatedChecker(index_url=index_url, cache=cache).check(pinned), outdated)
+                self.assertEqual(IndexHandler.requests, ["/simple/unknown/"]) # 404 are not cached
+
+                # Expired:
+                IndexHandler.requests = []
+                cache.ttl = -1
+                self.assertEqual(OutdatedChecker(index_url=index_url, cache=cache).check(pinned), outdated)
+                self.assertEqual(len(IndexHandler.requests), 3)
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,134 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import os
+import shutil
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Bootstrap-Env
+from bootstrap_env.boot_bootstrap_env import (
+    CACHE_DIR_ENV_NAME, PackageStore, collect_wheels, get_scheme_paths, install_wheels
+)
+from bootstrap_env.tests.test_boot_wheel_install import create_wheel
+from bootstrap_env.tests.utils import IsolatedFilesystem
+
+
+def create_files(directory, files):
+    for name, content in files.items():
+        file_path = Path(directory, name)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with file_path.open("w") as f:
+            f.write(content)
+
+
+def same_file(path1, path2):
+    return os.path.samefile(str(path1), str(path2))
+
+
+class TestPackageStore(unittest.TestCase):
+    def test_add_tree_and_gc(self):
+        with IsolatedFilesystem(prefix="test_add_tree_and_gc"):
+            temp_path = Path().cwd()
+            with mock.patch.dict(os.environ, {CACHE_DIR_ENV_NAME: str(temp_path / "cache")}):
+                store = PackageStore()
+
+                files = {"foo/__init__.py": "foo = 1\n", "foo/bar.py": "bar = 1\n"}
+                create_files(temp_path / "env1", files)
+                create_files(temp_path / "env2", files)
+                create_files(temp_path / "env2", {"foo/other.py": "foo = 1\n"})
+                Path(temp_path, "env2", "foo", "other.py").chmod(0o755)
+
+                self.assertEqual(store.add_tree(temp_path / "env1"), (2, 0))
+                self.assertEqual(store.add_tree(temp_path / "env2"), (3, 2))
+                self.assertEqual(store.add_tree(temp_path / "env2"), (3, 3))
+
+                self.assertTrue(same_file(temp_path / "env1/foo/bar.py", temp_path / "env2/foo/bar.py"))
+
+                # Same content, but executable -> other object:
+                self.assertFalse(same_file(temp_path / "env2/foo/other.py", temp_path / "env2/foo/__init__.py"))
+                self.assertTrue(os.access(str(temp_path / "env2/foo/other.py"), os.X_OK))
+                self.assertFalse(os.access(str(temp_path / "env2/foo/__init__.py"), os.X_OK))
+
+                count, used, saved = store.get_stats()
+                self.assertEqual(count, 3)
+                self.assertEqual(saved, len("foo = 1\n") + len("bar = 1\n"))
+
+                self.assertEqual(store.gc(), (0, 0))
+
+                shutil.rmtree(str(temp_path / "env2"))
+                self.assertEqual(store.gc(), (1, len("foo = 1\n")))
+
+                shutil.rmtree(str(temp_path / "env1"))
+                self.assertEqual(store.gc(), (2, len("foo = 1\n") + len("bar = 1\n")))
+                self.assertEqual(store.get_stats(), (0, 0, 0))
+
+    def test_private_files(self):
+        files = {
+            "foo/__init__.py": "foo = 1\n",
+            "foo/__pycache__/__init__.cpython-36.pyc": "pyc",
+            "easy-install.pth": "/src/foo\n",
+            "foo.egg-link": "/src/foo\n",
+            "foo-1.0.dist-info/METADATA": "Name: foo\n",
+            "foo-1.0.dist-info/RECORD": "foo/__init__.py,,\n",
+            "foo-1.0.dist-info/INSTALLER": "pip\n",
+        }
+        with IsolatedFilesystem(prefix="test_private_files"):
+            temp_path = Path().cwd()
+            with mock.patch.dict(os.environ, {CACHE_DIR_ENV_NAME: str(temp_path / "cache")}):
+                store = PackageStore()
+                create_files(temp_path / "env1", files)
+                create_files(temp_path / "env2", files)
+
+                # e.g.: 'easy-install.pth' hardlinked by a older version:
+                os.link(str(temp_path / "env1/easy-install.pth"), str(temp_path / "linked.pth"))
+
+                self.assertEqual(store.add_tree(temp_path / "env1"), (2, 0))
+                self.assertEqual(store.add_tree(temp_path / "env2"), (2, 2))
+                self.assertEqual(store.get_stats()[0], 2)
+
+                for filename in files:
+                    is_private = filename not in ("foo/__init__.py", "foo-1.0.dist-info/METADATA")
+                    self.assertEqual(PackageStore.is_private(Path("env1", filename)), is_private, filename)
+                    self.assertEqual(
+                        same_file(temp_path / "env1" / filename, temp_path / "env2" / filename),
+                        not is_private, filename
+                    )
+
+                self.assertFalse(same_file(temp_path / "env1/easy-install.pth", temp_path / "linked.pth"))
+                self.assertEqual(Path(temp_path, "env1", "easy-install.pth").read_text(), "/src/foo\n")
+
+    def test_install_wheels_with_store(self):
+        with IsolatedFilesystem(prefix="test_install_wheels_with_store"):
+            temp_path = Path().cwd()
+            wheelhouse = Path(temp_path, "wheelhouse")
+            wheelhouse.mkdir()
+            create_wheel(wheelhouse, "foo", "1.0")
+
+            with mock.patch.dict(os.environ, {CACHE_DIR_ENV_NAME: str(temp_path / "cache")}):
+                store = PackageStore()
+                for env_name in ("env1", "env2"):
+                    env_dir = Path(temp_path, env_name)
+                    install_wheels(
+                        collect_wheels(wheelhouse), env_dir, Path(env_dir, "bin", "python"), store=store
+                    )
+
+                # Stored files are linked via the RECORD hashes of the wheel, without extracting:
+                with mock.patch.object(PackageStore, "add_file"):
+                    env_dir = Path(temp_path, "env3")
+                    install_wheels(
+                        collect_wheels(wheelhouse), env_dir, Path(env_dir, "bin", "python"), store=store
+                    )
+
+            site_packages1 = get_scheme_paths(temp_path / "env1")["purelib"]
+            for env_name in ("env2", "env3"):
+                site_packages = get_scheme_paths(temp_path / env_name)["purelib"]
+                for filename in ("foo/__init__.py", "foo-1.0.dist-info/METADATA"):
+                    self.assertTrue(same_file(Path(site_packages1, filename), Path(site_packages, filename)))
+
+            # Scripts contains the path of the virtualenv -> not stored
+            self.assertFalse(same_file(temp_path / "env1/bin/foo_cli", temp_path / "env2/bin/foo_cli"))
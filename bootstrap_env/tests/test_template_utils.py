@@ -0,0 +1,174 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import concurrent.futures
+import json
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+# Bootstrap-Env
+import bootstrap_env
+from bootstrap_env.tests.utils import IsolatedFilesystem
+from bootstrap_env.utils.template_utils import (
+    SimpleBootFileRenderer, SimpleTemplate, UnsupportedTemplate, get_boot_file_renderer, template_cache,
+    write_if_changed
+)
+from bootstrap_env.version import __version__ as bootstrap_env_version
+
+try:
+    from cookiecutter.environment import StrictEnvironment
+    from bootstrap_env.utils.cookiecutter_utils import BootFileRenderer
+except ImportError: # cookiecutter not installed
+    StrictEnvironment = None
+    BootFileRenderer = None
+
+PACKAGE_PATH = Path(bootstrap_env.__file__).parent
+BOOT_SOURCE_PATH = Path(PACKAGE_PATH, "boot_source")
+
+TEMPLATES = (
+    "{{cookiecutter.foo}}",
+    "{{ cookiecutter.foo }} and {{cookiecutter.bar}}\n",
+    "A [\n    {%- if cookiecutter.foo == \"y\" %}\n    \"x\",\n    {%- endif %}\n    B\n]\n",
+    "{% if cookiecutter.foo != 'y' %}no{% else %}yes{% endif %}",
+    "{% if cookiecutter.foo == 'y' -%}\n  {% if cookiecutter.bar == 'y' %}both{% endif %}\n{%- endif %}!",
+    "a {# comment #} b {#- comment -#} c",
+)
+
+
+class TestSimpleTemplate(unittest.TestCase):
+    def test_render(self):
+        template = SimpleTemplate("{{cookiecutter.foo}}-{{ cookiecutter.bar }}")
+        self.assertEqual(template.render(cookiecutter={"foo": "1", "bar": "2"}), "1-2")
+
+        with self.assertRaises(KeyError):
+            template.render(cookiecutter={"foo": "1"})
+
+    @unittest.skipIf(StrictEnvironment is None, "cookiecutter not installed")
+    def test_same_as_jinja(self):
+        env = StrictEnvironment(keep_trailing_newline=True)
+        for source in TEMPLATES:
+            for foo in ("y", "n"):
+                for bar in ("y", "n"):
+                    context = {"foo": foo, "bar": bar}
+                    self.assertEqual(
+                        SimpleTemplate(source).render(cookiecutter=context),
+                        env.from_string(source).render(cookiecutter=context),
+                        "%r with %r" % (source, context)
+                    )
+
+    def test_unsupported(self):
+        for source in (
+            "{{ cookiecutter.foo|upper }}",
+            "{% for x in cookiecutter.foo %}{% endfor %}",
+            "{% if cookiecutter.foo %}x{% endif %}",
+            "{% if cookiecutter.foo == 'y' %}x",
+            "{% endif %}",
+            "{{ cookiecutter.foo %}",
+        ):
+            with self.assertRaises(UnsupportedTemplate, msg=source):
+                SimpleTemplate(source)
+
+
+class TestWriteIfChanged(unittest.TestCase):
+    def test_write_if_changed(self):
+        with IsolatedFilesystem(prefix="test_write_if_changed"):
+            path = Path(Path().cwd(), "sub", "foo.txt")
+            self.assertEqual(write_if_changed(path, b"foo", mode=0o755), "created")
+            self.assertTrue(os.access(str(path), os.X_OK))
+            self.assertEqual(write_if_changed(path, b"foo"), "unchanged")
+            self.assertEqual(write_if_changed(path, b"bar"), "updated")
+
+    def test_concurrent_writes(self):
+        with IsolatedFilesystem(prefix="test_concurrent_writes"):
+            path = Path(Path().cwd(), "foo.txt")
+            contents = [(b"%i" % number) * 100000 for number in range(8)]
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda content: write_if_changed(path, content), contents * 4))
+
+            with path.open("rb") as f:
+                self.assertIn(f.read(), contents)
+            self.assertEqual(os.listdir(str(path.parent)), ["foo.txt"])
+
+
+class TestSimpleBootFileRenderer(unittest.TestCase):
+    def test_own_boot_file(self):
+        renderer = SimpleBootFileRenderer(BOOT_SOURCE_PATH, extra_context={"_version": bootstrap_env_version})
+        self.assertNotIn("jinja2", repr(renderer.templates))
+
+        with IsolatedFilesystem(prefix="test_simple_renderer"):
+            temp_path = Path().cwd()
+            results = renderer.render({}, temp_path)
+            boot_path = Path(temp_path, "bootstrap_env", "boot_bootstrap_env.py")
+            self.assertEqual(results, [(boot_path, "created")])
+
+            with Path(PACKAGE_PATH, "boot_bootstrap_env.py").open("rb") as f:
+                origin_content = f.read()
+            with boot_path.open("rb") as f:
+                self.assertEqual(f.read(), origin_content)
+
+            self.assertEqual(renderer.render({}, temp_path), [(boot_path, "unchanged")])
+
+            results = renderer.render({"project_name": "foo", "bootstrap_filename": "boot_foo"}, temp_path)
+            self.assertEqual(results, [(Path(temp_path, "foo", "boot_foo.py"), "created")])
+
+    @unittest.skipIf(BootFileRenderer is None, "cookiecutter not installed")
+    def test_same_as_cookiecutter(self):
+        extra_context = {"_version": bootstrap_env_version}
+        values = {"project_name": "foo", "use_pre_release": "y", "requirements_lock": "foo==1.0 \\\n"}
+        with IsolatedFilesystem(prefix="test_simple_renderer"):
+            temp_path = Path().cwd()
+            SimpleBootFileRenderer(BOOT_SOURCE_PATH, extra_context).render(values, Path(temp_path, "simple"))
+            BootFileRenderer(BOOT_SOURCE_PATH, extra_context).render(values, Path(temp_path, "jinja"))
+
+            simple_path = Path(temp_path, "simple", "foo", "boot_bootstrap_env.py")
+            with simple_path.open("r") as f:
+                content = f.read()
+            self.assertIn('"--pre",', content)
+            with Path(temp_path, "jinja", "foo", "boot_bootstrap_env.py").open("r") as f:
+                self.assertEqual(content, f.read())
+
+    def test_get_boot_file_renderer(self):
+        renderer = get_boot_file_renderer(BOOT_SOURCE_PATH)
+        self.assertIs(type(renderer), SimpleBootFileRenderer)
+
+        with IsolatedFilesystem(prefix="test_get_boot_file_renderer"):
+            template_dir = Path(Path().cwd(), "template")
+            Path(template_dir, "{{cookiecutter.name}}").mkdir(parents=True)
+            with Path(template_dir, "cookiecutter.json").open("w") as f:
+                json.dump({"name": "foo", "choice": ["a", "b"]}, f)
+            with Path(template_dir, "{{cookiecutter.name}}", "foo.txt").open("w") as f:
+                f.write("{{ cookiecutter.choice }}")
+
+            with self.assertRaises(UnsupportedTemplate):
+                SimpleBootFileRenderer(template_dir)
+
+            if BootFileRenderer is not None:
+                renderer = get_boot_file_renderer(template_dir)
+                self.assertIs(type(renderer), BootFileRenderer)
+
+    def test_template_cache(self):
+        with IsolatedFilesystem(prefix="test_template_cache"):
+            path = Path(Path().cwd(), "template.txt")
+            with path.open("w") as f:
+                f.write("{{cookiecutter.foo}}")
+            template = template_cache.get(path)
+            self.assertIs(template_cache.get(path), template)
+
+            with path.open("w") as f:
+                f.write("changed: {{cookiecutter.foo}}")
+            self.assertEqual(template_cache.get(path).render(cookiecutter={"foo": "x"}), "changed: x")
+
+    def test_no_jinja_import(self):
+        code = (
+            "import sys;"
+            "from bootstrap_env.utils.template_utils import get_boot_file_renderer;"
+            "get_boot_file_renderer(%r).get_context({});"
+            "assert 'jinja2' not in sys.modules and 'cookiecutter' not in sys.modules, 'imported!'"
+        ) % str(BOOT_SOURCE_PATH)
+        subprocess.check_call([sys.executable, "-c", code], cwd=str(PACKAGE_PATH.parent))
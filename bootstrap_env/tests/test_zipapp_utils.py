@@ -0,0 +1,105 @@
+"""
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+# Bootstrap-Env
+import bootstrap_env
+from bootstrap_env.boot_bootstrap_env import (
+    CACHE_DIR_ENV_NAME, WHEELHOUSE_INDEX_FILENAME, extract_zipapp_wheels, get_self_archive
+)
+from bootstrap_env.tests.utils import IsolatedFilesystem
+from bootstrap_env.utils.zipapp_utils import create_boot_zipapp
+
+BOOT_FILE = Path(Path(bootstrap_env.__file__).parent, "boot_bootstrap_env.py")
+
+
+def create_wheelhouse(wheelhouse, wheels):
+    """
+    Create fake wheels and the wheelhouse index
+    """
+    wheelhouse.mkdir()
+    index = {"package_name": "foo", "wheels": []}
+    for filename, content in wheels:
+        with Path(wheelhouse, filename).open("wb") as f:
+            f.write(content)
+        index["wheels"].append({
+            "filename": filename,
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "size": len(content),
+        })
+    with Path(wheelhouse, WHEELHOUSE_INDEX_FILENAME).open("w") as f:
+        json.dump(index, f)
+
+
+class TestZipapp(unittest.TestCase):
+    def test_create_and_extract(self):
+        with IsolatedFilesystem(prefix="test_zipapp"):
+            temp_path = Path().cwd()
+            wheelhouse = Path(temp_path, "wheelhouse")
+            create_wheelhouse(wheelhouse, (
+                ("foo_bar-1.0-py3-none-any.whl", b"foo" * 1000),
+                ("pip-19.0.3-py2.py3-none-any.whl", b"pip"),
+            ))
+
+            archive_path = Path(temp_path, "boot_foo.pyz")
+            index = create_boot_zipapp(BOOT_FILE, wheelhouse, archive_path, exclude=("pip",))
+            self.assertEqual([wheel["filename"] for wheel in index["wheels"]], ["foo_bar-1.0-py3-none-any.whl"])
+
+            self.assertTrue(os.access(str(archive_path), os.X_OK))
+            with archive_path.open("rb") as f:
+                self.assertEqual(f.readline(), b"#!/usr/bin/env python3\n")
+            with zipfile.ZipFile(str(archive_path)) as archive:
+                self.assertEqual(archive.namelist(), [
+                    "__main__.py",
+                    "wheels/foo_bar-1.0-py3-none-any.whl",
+                    "wheels/%s" % WHEELHOUSE_INDEX_FILENAME,
+                ])
+
+            with mock.patch.dict(os.environ, {CACHE_DIR_ENV_NAME: str(Path(temp_path, "cache"))}):
+                extracted = extract_zipapp_wheels(archive_path)
+                wheel_path = Path(extracted, "foo_bar-1.0-py3-none-any.whl")
+                with wheel_path.open("rb") as f:
+                    self.assertEqual(f.read(), b"foo" * 1000)
+                self.assertFalse(Path(extracted, "pip-19.0.3-py2.py3-none-any.whl").exists())
+
+                # Extracted only once:
+                mtime = wheel_path.stat().st_mtime_ns
+                self.assertEqual(extract_zipapp_wheels(archive_path), extracted)
+                self.assertEqual(wheel_path.stat().st_mtime_ns, mtime)
+
+                # Hash mismatch:
+                with Path(wheelhouse, "foo_bar-1.0-py3-none-any.whl").open("wb") as f:
+                    f.write(b"modified")
+                create_boot_zipapp(BOOT_FILE, wheelhouse, archive_path)
+                with self.assertRaises(RuntimeError):
+                    extract_zipapp_wheels(archive_path)
+
+    def test_run_zipapp(self):
+        self.assertIsNone(get_self_archive())
+
+        with IsolatedFilesystem(prefix="test_run_zipapp"):
+            temp_path = Path().cwd()
+            wheelhouse = Path(temp_path, "wheelhouse")
+            create_wheelhouse(wheelhouse, ())
+            archive_path = Path(temp_path, "boot_foo.pyz")
+            create_boot_zipapp(BOOT_FILE, wheelhouse, archive_path)
+
+            env = dict(os.environ)
+            env.pop("VIRTUAL_ENV", None)
+            output = subprocess.check_output(
+                [sys.executable, str(archive_path), "help"],
+                universal_newlines=True, stderr=subprocess.STDOUT, env=env,
+            )
+            self.assertIn("boot_developer", output)
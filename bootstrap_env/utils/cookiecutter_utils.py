@@ -1,14 +1,52 @@
-from pprint import pprint
+import json
+from pathlib import Path
 
-from cookiecutter.main import cookiecutter
+from cookiecutter.environment import StrictEnvironment
+from cookiecutter.generate import generate_context
+from cookiecutter.prompt import prompt_for_config
 
+# Bootstrap-Env
+from bootstrap_env.utils.template_utils import SimpleBootFileRenderer
 
-def verbose_cookiecutter(**kwargs):
-    from cookiecutter.log import configure_logger
-    configure_logger(stream_level='DEBUG')
 
-    print("Run cookiecutter with:")
-    pprint(kwargs)
-    print()
-    result = cookiecutter(**kwargs)
-    return result
+class BootFileRenderer(SimpleBootFileRenderer):
+    """
+    Render a cookiecutter template (e.g.: 'boot_source') for many contexts
+    with the full jinja syntax and cookiecutter context handling.
+    The template files are loaded and compiled only once.
+    The render() method can be called from many threads.
+
+    Use get_boot_file_renderer() from 'template_utils': It use this renderer
+    only if the template needs more than the stdlib SimpleBootFileRenderer.
+
+    usage e.g.:
+        renderer = BootFileRenderer(template_dir, extra_context={"_version": "1.0"})
+        renderer.render({"project_name": "foo", ...}, output_dir="/foo/")
+    """
+    def __init__(self, template_dir, extra_context=None):
+        with Path(template_dir, "cookiecutter.json").open("r") as f:
+            context = json.load(f)
+        self.env = StrictEnvironment(context={"cookiecutter": context}, keep_trailing_newline=True)
+        super().__init__(template_dir, extra_context)
+
+    def check_context(self):
+        pass # everything is supported
+
+    def compile(self, source):
+        return self.env.from_string(source)
+
+    def compile_file(self, path):
+        with path.open("r", encoding="utf-8") as f:
+            return self.compile(f.read())
+
+    def get_context(self, values, prompt=None):
+        """
+        Returns the cookiecutter context with the defaults from cookiecutter.json
+
+        :param prompt: if not None: ask the user with the cookiecutter prompts
+        """
+        extra_context = dict(self.extra_context)
+        extra_context.update(values)
+        context = generate_context(context_file=str(self.context_file), extra_context=extra_context)
+        context["cookiecutter"] = prompt_for_config(context, no_input=prompt is None)
+        return context
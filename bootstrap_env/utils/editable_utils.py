@@ -0,0 +1,132 @@
+"""
+    editable utilities
+    ~~~~~~~~~~~~~~~~~~
+
+    Collect all editable checkouts in 'src' and their dependencies
+    from the installed metadata (without importing pkg_resources)
+
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+import collections
+import email.parser
+import json
+import re
+import sysconfig
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+# Bootstrap-Env
+from bootstrap_env.boot_bootstrap_env import normalize_project_name
+from bootstrap_env.utils.git_utils import get_git_dir
+
+# e.g.: "foo-bar[extra] >=1.0 ; python_version<'3.6'" -> "foo-bar"
+REQUIREMENT_NAME_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+EditableInfo = collections.namedtuple("EditableInfo", "path name requires")
+
+
+def iter_git_checkouts(src_path):
+    """
+    yield the Path of all git checkouts in 'src' (sorted, without *.bak backups)
+    """
+    for path in sorted(Path(src_path).iterdir()):
+        if path.is_dir() and not path.name.endswith(".bak") and get_git_dir(path) is not None:
+            yield path
+
+
+def _read_egg_info(checkout):
+    """
+    Returns (name, requires) from a '*.egg-info' (created by 'setup.py develop') or None
+    """
+    for egg_info in sorted(checkout.glob("*.egg-info")) + sorted(checkout.glob("src/*.egg-info")):
+        requires = []
+        requires_path = Path(egg_info, "requires.txt")
+        if requires_path.is_file():
+            with requires_path.open("r") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith("["):
+                        break # only the unconditional requirements, not the extras
+                    if line:
+                        requires.append(line)
+        return egg_info.name[:-len(".egg-info")], requires
+
+
+def _read_dist_info(checkout, site_packages):
+    """
+    Returns (name, requires) from a PEP 660 editable '*.dist-info' in site-packages or None
+    """
+    checkout_url = urllib.parse.urljoin("file:", urllib.request.pathname2url(str(checkout.resolve())))
+    for dist_info in sorted(Path(site_packages).glob("*.dist-info")):
+        try:
+            with Path(dist_info, "direct_url.json").open("r") as f:
+                direct_url = json.load(f)
+        except (FileNotFoundError, ValueError):
+            continue
+        if direct_url.get("url", "").rstrip("/") != checkout_url.rstrip("/"):
+            continue
+
+        with Path(dist_info, "METADATA").open("r", encoding="utf-8") as f:
+            metadata = email.parser.Parser().parse(f, headersonly=True)
+        requires = [
+            requirement for requirement in metadata.get_all("Requires-Dist") or []
+            if "extra" not in requirement.partition(";")[2]
+        ]
+        return metadata["Name"], requires
+
+
+def get_editable_info(checkout):
+    """
+    Returns EditableInfo of the checkout.
+    Use the directory name and no requirements, if it was never installed.
+    """
+    checkout = Path(checkout)
+    info = _read_egg_info(checkout)
+    if info is None:
+        paths = sysconfig.get_paths()
+        for site_packages in sorted(set((paths["purelib"], paths["platlib"]))):
+            info = _read_dist_info(checkout, site_packages)
+            if info is not None:
+                break
+    if info is None:
+        return EditableInfo(checkout, checkout.name, [])
+    return EditableInfo(checkout, *info)
+
+
+def get_requirement_name(requirement):
+    match = REQUIREMENT_NAME_RE.match(requirement)
+    if match:
+        return normalize_project_name(match.group(1))
+
+
+def get_install_levels(editables):
+    """
+    Group the editables into levels: every editable depends only on editables of previous levels.
+    All editables of one level can be installed in parallel.
+
+    :param editables: list of EditableInfo
+    :return: list of lists of EditableInfo
+    """
+    by_name = dict((normalize_project_name(info.name), info) for info in editables)
+    dependencies = {}
+    for name, info in by_name.items():
+        dependencies[name] = set(
+            get_requirement_name(requirement) for requirement in info.requires
+        ) & (set(by_name) - {name})
+
+    levels = []
+    done = set()
+    while len(done) < len(by_name):
+        level = sorted(
+            name for name in by_name
+            if name not in done and dependencies[name] <= done
+        )
+        if not level:
+            # dependency cycle: install the rest together
+            level = sorted(set(by_name) - done)
+        levels.append([by_name[name] for name in level])
+        done.update(level)
+    return levels
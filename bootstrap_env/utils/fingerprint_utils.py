@@ -0,0 +1,172 @@
+"""
+    fingerprint utilities
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Used to skip all 'update_env' steps whose inputs are unchanged.
+
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shlex
+import sysconfig
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+
+def hash_file(path):
+    """
+    Returns the sha256 hex digest of the file content or None if the file doesn't exists.
+    """
+    try:
+        with Path(path).open("rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def get_tree_hashes(path):
+    """
+    Returns a dict with the relative path -> hash of all files in the directory tree.
+    (without compiled python files)
+    """
+    path = Path(path)
+    return dict(
+        (item.relative_to(path).as_posix(), hash_file(item))
+        for item in sorted(path.rglob("*"))
+        if item.is_file() and item.suffix not in (".pyc", ".pyo")
+    )
+
+
+def iter_requirement_files(requirement_file, seen=None):
+    """
+    Yields the given requirement file and all included files (via '-r' and '-c')
+    """
+    requirement_file = Path(requirement_file).resolve()
+    if seen is None:
+        seen = set()
+    if requirement_file in seen:
+        return
+    seen.add(requirement_file)
+
+    yield requirement_file
+
+    if not requirement_file.is_file():
+        return
+
+    with requirement_file.open("r") as f:
+        for line in f:
+            line = line.split(" #", 1)[0].strip()
+            if not line.startswith("-"):
+                continue
+
+            option, _, value = line.partition("=")
+            if not value:
+                parts = shlex.split(line)
+                option, value = parts[0], " ".join(parts[1:])
+                if option.startswith(("-r", "-c")) and len(option) > 2:
+                    option, value = option[:2], option[2:] # e.g.: "-rfoo.txt"
+
+            if option in ("-r", "--requirement", "-c", "--constraint") and value:
+                yield from iter_requirement_files(Path(requirement_file.parent, value.strip()), seen)
+
+
+def get_requirements_hashes(requirement_file):
+    """
+    Returns a dict with the hashes of the requirement file and all included files.
+    """
+    return dict(
+        (str(path), hash_file(path))
+        for path in iter_requirement_files(requirement_file)
+    )
+
+
+def get_installed_distributions():
+    """
+    Returns a sorted list of all installed distributions in the current environment,
+    based only on the directory names, e.g.:
+        ['bootstrap_env.egg-link', 'pip-19.0.3.dist-info', ...]
+    """
+    paths = sysconfig.get_paths()
+    names = set()
+    for site_dir in set((paths["purelib"], paths["platlib"])):
+        if not os.path.isdir(site_dir):
+            continue
+        for entry in os.scandir(site_dir):
+            if entry.name.endswith((".dist-info", ".egg-info", ".egg-link")):
+                names.add(entry.name)
+    return sorted(names)
+
+
+class StepFingerprints:
+    """
+    Store a fingerprint of the inputs of every successful step in a JSON file.
+
+    usage e.g.:
+
+        fingerprints = StepFingerprints(path)
+        inputs = lambda: {"requirements": get_requirements_hashes(...)}
+        if fingerprints.is_unchanged("requirements", inputs):
+            print("skip")
+        else:
+            # run the step and on success:
+            fingerprints.succeeded("requirements", inputs)
+        fingerprints.save()
+
+    The fingerprints are created in save(): So they contain the
+    state after all steps are done (e.g.: new installed packages)
+    """
+    def __init__(self, path, force=False):
+        self.path = Path(path)
+        self.force = force
+        self.stored = self._load()
+        self.steps = {}
+
+    def _load(self):
+        try:
+            with self.path.open("r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError) as err:
+            log.debug("Can't load fingerprints: %s", err)
+            return {}
+
+    @staticmethod
+    def get_fingerprint(inputs):
+        data = json.dumps(inputs(), sort_keys=True)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def is_unchanged(self, step, inputs):
+        """
+        :param inputs: callable that returns all inputs as a JSON serializeable object
+        :return: True if the step can be skipped
+        """
+        if self.force or step not in self.stored:
+            return False
+
+        if self.get_fingerprint(inputs) != self.stored[step]:
+            return False
+
+        self.steps[step] = inputs # Store the fingerprint again
+        return True
+
+    def succeeded(self, step, inputs):
+        self.steps[step] = inputs
+
+    def save(self):
+        """
+        Save the fingerprints of all successful or skipped steps.
+        Failed steps will be run again on the next call.
+        """
+        fingerprints = dict(
+            (step, self.get_fingerprint(inputs))
+            for step, inputs in self.steps.items()
+        )
+        temp_path = Path("%s.tmp" % self.path)
+        with temp_path.open("w") as f:
+            json.dump(fingerprints, f, indent=4, sort_keys=True)
+        os.replace(str(temp_path), str(self.path))
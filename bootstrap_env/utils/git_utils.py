@@ -0,0 +1,186 @@
+"""
+    git utilities
+    ~~~~~~~~~~~~~
+
+    Read git repository information directly from the '.git' directory,
+    without starting a 'git' process.
+
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+import os
+import re
+import subprocess
+from pathlib import Path
+
+# e.g.: [remote "origin"]
+REMOTE_SECTION_RE = re.compile(r'^\s*\[remote\s+"(?P<name>[^"\\]+)"\s*\]\s*$')
+SECTION_RE = re.compile(r"^\s*\[(?P<section>[^\]]+)\]")
+# e.g.: url = https://github.com/jedie/bootstrap_env.git
+URL_RE = re.compile(r"^(?P<prefix>\s*url\s*=\s*)(?P<url>[^\s\"'\\;#]+)\s*$")
+
+
+def get_git_dir(path):
+    """
+    Returns the Path of the '.git' directory of the given checkout or None.
+    Supports '.git' files (e.g.: git worktrees and submodules)
+    """
+    git_path = Path(path, ".git")
+    if git_path.is_dir():
+        return git_path
+
+    if git_path.is_file():
+        with git_path.open("r") as f:
+            content = f.read().strip()
+        if content.startswith("gitdir:"):
+            git_dir = Path(path, content[len("gitdir:"):].strip())
+            if git_dir.is_dir():
+                return git_dir
+
+
+def get_git_head(path):
+    """
+    Returns the commit hash of HEAD or None if 'path' is not a git checkout.
+    Fallback to 'git rev-parse HEAD' if the refs can't be read directly.
+    """
+    git_dir = get_git_dir(path)
+    if git_dir is None:
+        return None
+
+    with Path(git_dir, "HEAD").open("r") as f:
+        head = f.read().strip()
+
+    if not head.startswith("ref:"):
+        return head # detached HEAD
+
+    ref = head[len("ref:"):].strip()
+
+    # In worktrees the refs are in the 'commondir':
+    ref_dirs = [git_dir]
+    common_dir_file = Path(git_dir, "commondir")
+    if common_dir_file.is_file():
+        with common_dir_file.open("r") as f:
+            ref_dirs.append(Path(git_dir, f.read().strip()))
+
+    for ref_dir in ref_dirs:
+        ref_path = Path(ref_dir, ref)
+        if ref_path.is_file():
+            with ref_path.open("r") as f:
+                return f.read().strip()
+
+        packed_refs = Path(ref_dir, "packed-refs")
+        if packed_refs.is_file():
+            with packed_refs.open("r") as f:
+                for line in f:
+                    parts = line.strip().split(" ", 1)
+                    if len(parts) == 2 and parts[1] == ref:
+                        return parts[0]
+
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=str(path), universal_newlines=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class UnsupportedGitConfig(Exception):
+    """
+    The git config can't be handled directly -> use 'git' instead.
+    """
+    pass
+
+
+def get_git_config_path(path):
+    """
+    Returns the Path of the git config file of the given checkout.
+    """
+    git_dir = get_git_dir(path)
+    if git_dir is None:
+        raise UnsupportedGitConfig("No git checkout: %s" % path)
+
+    common_dir_file = Path(git_dir, "commondir")
+    if common_dir_file.is_file():
+        # worktree: The config is in the main repository
+        with common_dir_file.open("r") as f:
+            git_dir = Path(git_dir, f.read().strip())
+
+    config_path = Path(git_dir, "config")
+    if not config_path.is_file():
+        raise UnsupportedGitConfig("No git config: %s" % config_path)
+    return config_path
+
+
+def _iter_remote_urls(lines):
+    """
+    yield (line number, remote name, url match) for all remote urls in the config lines.
+    Raise UnsupportedGitConfig for everything that we can't handle safely.
+    """
+    remote_name = None
+    seen = set()
+    for number, line in enumerate(lines):
+        if SECTION_RE.match(line):
+            section = SECTION_RE.match(line).group("section").strip().lower()
+            if section.startswith(("include", "url ")):
+                # e.g.: [include], [includeIf ...], [url "..."] insteadOf
+                raise UnsupportedGitConfig("Unsupported section: %s" % line.strip())
+
+            match = REMOTE_SECTION_RE.match(line)
+            remote_name = match.group("name") if match else None
+            continue
+
+        if remote_name is None or not line.strip().lower().startswith("url"):
+            continue
+
+        match = URL_RE.match(line)
+        if match is None or remote_name in seen:
+            # e.g.: quoted values or more than one url for one remote
+            raise UnsupportedGitConfig("Unsupported url for remote %r: %s" % (remote_name, line.strip()))
+
+        seen.add(remote_name)
+        yield number, remote_name, match
+
+
+def read_git_remotes(path):
+    """
+    Returns a dict with remote name -> url of the given checkout, read directly from the git config.
+    Raise UnsupportedGitConfig if the config can't be parsed directly.
+    """
+    with get_git_config_path(path).open("r") as f:
+        lines = f.readlines()
+    return dict((name, match.group("url")) for number, name, match in _iter_remote_urls(lines))
+
+
+def set_git_remote_urls(path, new_urls):
+    """
+    Change the urls of the given remotes directly in the git config.
+    All other lines (and comments) are not changed.
+
+    Like git, the config is written into 'config.lock' and then renamed.
+
+    :param new_urls: dict with remote name -> new url
+    """
+    config_path = get_git_config_path(path)
+
+    lock_path = Path(str(config_path) + ".lock")
+    try:
+        fd = os.open(str(lock_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    except FileExistsError:
+        raise UnsupportedGitConfig("git config is locked: %s" % lock_path)
+
+    try:
+        with os.fdopen(fd, "w") as f:
+            with config_path.open("r") as config_file:
+                lines = config_file.readlines()
+
+            for number, name, match in list(_iter_remote_urls(lines)):
+                if name in new_urls:
+                    lines[number] = "%s%s\n" % (match.group("prefix"), new_urls[name])
+
+            f.writelines(lines)
+        os.chmod(str(lock_path), config_path.stat().st_mode & 0o777)
+        os.replace(str(lock_path), str(config_path))
+    except BaseException:
+        lock_path.unlink()
+        raise
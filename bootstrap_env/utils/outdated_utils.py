@@ -0,0 +1,459 @@
+"""
+    outdated package utilities
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Check pinned requirements against the package index (replacement for 'piprot')
+
+    All projects are fetched concurrently from the "simple" API (PEP 503 HTML
+    or PEP 691 JSON) of the configured index. Every thread reuse one HTTP
+    connection per host. The index responses are cached in a JSON file.
+
+    The index url and proxy are taken from $PIP_INDEX_URL/$PIP_PROXY or
+    the pip configuration files ('pip config list'). Requests via a proxy
+    (incl. $HTTP_PROXY/$HTTPS_PROXY) are made with urllib, without the
+    connection pool.
+
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+import ast
+import base64
+import concurrent.futures
+import hashlib
+import html.parser
+import http.client
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+# Bootstrap-Env
+from bootstrap_env.boot_bootstrap_env import get_cache_path, normalize_project_name
+from bootstrap_env.utils.import_utils import LazyImportError
+
+# External libs:
+try:
+    from packaging.version import InvalidVersion, Version
+except ImportError as err:
+    # Re-Raise ImportError on first usage
+    InvalidVersion = LazyImportError(err)
+    Version = LazyImportError(err)
+
+log = logging.getLogger(__name__)
+
+DEFAULT_INDEX_URL = "https://pypi.org/simple/"
+
+# e.g.: "foo-bar[extra]==1.2.3 \" or "foo==1.0  # via bar"
+PINNED_RE = re.compile(r"^(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)(\[[^\]]*\])?\s*==\s*(?P<version>[^\s;\\#]+)")
+
+# e.g.: "foo_bar-1.0-py3-none-any.whl" or "foo-bar-1.0.tar.gz"
+ARCHIVE_EXTENSIONS = (".whl", ".tar.gz", ".tar.bz2", ".tgz", ".zip")
+
+SIMPLE_JSON_TYPE = "application/vnd.pypi.simple.v1+json"
+
+
+def get_pip_config():
+    """
+    Returns the merged pip configuration as dict, e.g.: {"global.index-url": "https://..."}
+    """
+    try:
+        output = subprocess.check_output(
+            [sys.executable, "-m", "pip", "config", "list"],
+            universal_newlines=True, stderr=subprocess.DEVNULL, timeout=30
+        )
+    except (OSError, subprocess.SubprocessError) as err:
+        log.debug("Can't read pip config: %s", err)
+        return {}
+
+    config = {}
+    for line in output.splitlines():
+        # e.g.: global.index-url='https://example.org/simple'
+        key, sep, value = line.partition("=")
+        if not sep:
+            continue
+        try:
+            value = ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError):
+            value = value.strip()
+        config[key.strip()] = value
+    return config
+
+
+def get_pip_option(config, name):
+    """
+    Returns the value of the pip option from the environment or the pip config, e.g.:
+    >>> get_pip_option({"global.index-url": "https://example.org/simple"}, "index-url")
+    'https://example.org/simple'
+    """
+    value = os.environ.get("PIP_%s" % name.upper().replace("-", "_"))
+    if value:
+        return value
+    for section in ("install", "global"):
+        value = config.get("%s.%s" % (section, name))
+        if value:
+            return value
+
+
+def iter_pinned_requirements(requirement_file):
+    """
+    yield (name, version) of all '==' pinned requirements, e.g.: from a pip-compile output file.
+    """
+    with Path(requirement_file).open("r") as f:
+        for line in f:
+            match = PINNED_RE.match(line.strip())
+            if match:
+                yield match.group("name"), match.group("version")
+
+
+def version_from_filename(project_name, filename):
+    """
+    Returns the version string of a distribution filename or None, e.g.:
+    >>> version_from_filename("foo-bar", "foo_bar-1.0-py3-none-any.whl")
+    '1.0'
+    >>> version_from_filename("foo-bar", "foo-bar-1.0.tar.gz")
+    '1.0'
+    """
+    if not filename.endswith(ARCHIVE_EXTENSIONS):
+        return None
+
+    if filename.endswith(".whl"):
+        parts = filename.split("-")
+        if len(parts) < 5:
+            return None
+        name, version = "-".join(parts[:-4]), parts[-4]
+    else:
+        stem = filename
+        for extension in ARCHIVE_EXTENSIONS:
+            if stem.endswith(extension):
+                stem = stem[:-len(extension)]
+                break
+        # The project name may contain "-", but not the version:
+        name, _, version = stem.rpartition("-")
+
+    if normalize_project_name(name) != project_name:
+        return None
+    return version
+
+
+class SimpleIndexParser(html.parser.HTMLParser):
+    """
+    Collect (filename, yanked) from all links of a PEP 503 project page.
+    """
+    def __init__(self):
+        super().__init__()
+        self.links = []
+        self._attrs = None
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self._attrs = dict(attrs)
+            self._text = []
+
+    def handle_data(self, data):
+        if self._attrs is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._attrs is not None:
+            filename = "".join(self._text).strip()
+            if not filename:
+                path = urllib.parse.urlsplit(self._attrs.get("href") or "").path
+                filename = urllib.parse.unquote(path.rsplit("/", 1)[-1])
+            self.links.append((filename, "data-yanked" in self._attrs))
+            self._attrs = None
+
+
+def parse_simple_response(project_name, content_type, body):
+    """
+    Returns a sorted list of all not yanked versions from a PEP 503/PEP 691 response.
+    """
+    if content_type.startswith(SIMPLE_JSON_TYPE):
+        data = json.loads(body)
+        links = [
+            (item["filename"], bool(item.get("yanked")))
+            for item in data.get("files", [])
+        ]
+    else:
+        parser = SimpleIndexParser()
+        parser.feed(body)
+        parser.close()
+        links = parser.links
+
+    versions = set()
+    for filename, yanked in links:
+        if yanked:
+            continue
+        version = version_from_filename(project_name, filename)
+        if version is not None:
+            versions.add(version)
+    return sorted(versions)
+
+
+class IndexResponseCache:
+    """
+    On-disk JSON cache of the index responses, e.g.:
+        ~/.cache/bootstrap_env/index/<sha256 of the project url>.json
+    """
+    def __init__(self, path=None, ttl=60 * 60):
+        """
+        :param ttl: max. age of a cache entry in seconds
+        """
+        self.path = Path(path) if path is not None else get_cache_path("index")
+        self.ttl = ttl
+
+    def _get_path(self, url):
+        return Path(self.path, "%s.json" % hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def get(self, url):
+        """
+        Returns the cached versions or None if not cached or expired.
+        """
+        try:
+            with self._get_path(url).open("r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if data.get("url") != url or time.time() - data.get("fetched", 0) > self.ttl:
+            return None
+        return data["versions"]
+
+    def set(self, url, versions):
+        path = self._get_path(url)
+        temp_path = Path("%s.%i.tmp" % (path, threading.get_ident()))
+        with temp_path.open("w") as f:
+            json.dump({"url": url, "fetched": time.time(), "versions": versions}, f)
+        os.replace(str(temp_path), str(path))
+
+
+class OutdatedChecker:
+    """
+    Check pinned versions against the latest release on the package index.
+
+    usage e.g.:
+
+        checker = OutdatedChecker() # index url and proxy from the pip config
+        for name, version, latest in checker.check({"foo": "1.0", "bar": "2.0"}):
+            print("%s (%s) is out of date. Latest is %s" % (name, version, latest))
+        for name, err in checker.errors.items():
+            print("%s: latest version unknown (%s)" % (name, err))
+    """
+    def __init__(self, index_url=None, cache=None, max_workers=16, timeout=30, proxy=None):
+        """
+        :param index_url: default: index url and proxy from the pip config
+        :param proxy: default: $PIP_PROXY, from the pip config or $HTTP_PROXY/$HTTPS_PROXY
+        """
+        pip_config = get_pip_config() if index_url is None else {}
+        self.index_url = index_url or get_pip_option(pip_config, "index-url") or DEFAULT_INDEX_URL
+        if not self.index_url.endswith("/"):
+            self.index_url += "/"
+        self.cache = cache if cache is not None else IndexResponseCache()
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+        proxy = proxy or get_pip_option(pip_config, "proxy")
+        if proxy:
+            self.proxies = {"http": proxy, "https": proxy}
+        else:
+            self.proxies = urllib.request.getproxies()
+        self._opener = urllib.request.build_opener(urllib.request.ProxyHandler(self.proxies))
+
+        self.latest = {} # project name -> latest version of all fetched projects
+        self.errors = {} # project name -> exception of all projects that can't be fetched
+
+        self._local = threading.local() # HTTP connections of the current thread
+        self._connections = [] # all HTTP connections of all threads
+        self._lock = threading.Lock()
+
+    def _use_proxy(self, parts):
+        if parts.scheme not in self.proxies:
+            return False
+        return not urllib.request.proxy_bypass(parts.hostname or "")
+
+    def _proxy_request(self, parts, headers):
+        """
+        GET the url via the proxy with urllib (follow redirects, too)
+
+        :return: (status, content type, body)
+        """
+        # The credentials are in the 'Authorization' header:
+        netloc = parts.netloc.rpartition("@")[2]
+        url = urllib.parse.urlunsplit((parts.scheme, netloc, parts.path or "/", parts.query, ""))
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            response = self._opener.open(request, timeout=self.timeout)
+        except urllib.error.HTTPError as err:
+            response = err
+        with response:
+            body = response.read()
+            content_type = response.headers.get("Content-Type") or "text/html"
+            charset = response.headers.get_content_charset() or "utf-8"
+            return response.getcode(), content_type, body.decode(charset, errors="replace")
+
+    def _get_connection(self, scheme, netloc):
+        """
+        Returns a HTTP connection to 'netloc' for the current thread (created on demand)
+        """
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        key = (scheme, netloc)
+        if key not in connections:
+            host = netloc.rpartition("@")[2]
+            if scheme == "https":
+                connections[key] = http.client.HTTPSConnection(host, timeout=self.timeout)
+            else:
+                connections[key] = http.client.HTTPConnection(host, timeout=self.timeout)
+            with self._lock:
+                self._connections.append(connections[key])
+        return connections[key]
+
+    def close(self):
+        """
+        Close all pooled HTTP connections.
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    def _request(self, url):
+        """
+        GET 'url' via the pooled connection, follow redirects.
+
+        :return: (status, content type, body)
+        """
+        for _ in range(5): # max. redirects
+            parts = urllib.parse.urlsplit(url)
+            headers = {"Accept": "%s, text/html;q=0.1" % SIMPLE_JSON_TYPE}
+            if parts.username:
+                credentials = "%s:%s" % (
+                    urllib.parse.unquote(parts.username), urllib.parse.unquote(parts.password or "")
+                )
+                headers["Authorization"] = "Basic %s" % base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+
+            if self._use_proxy(parts):
+                return self._proxy_request(parts, headers)
+
+            path = parts.path or "/"
+            if parts.query:
+                path += "?%s" % parts.query
+
+            for retry in (False, True):
+                connection = self._get_connection(parts.scheme, parts.netloc)
+                try:
+                    connection.request("GET", path, headers=headers)
+                    response = connection.getresponse()
+                    body = response.read()
+                    break
+                except (http.client.HTTPException, OSError):
+                    # e.g.: connection closed by the server while idle -> reconnect once
+                    connection.close()
+                    del self._local.connections[(parts.scheme, parts.netloc)]
+                    with self._lock:
+                        self._connections.remove(connection)
+                    if retry:
+                        raise
+
+            if response.status in (301, 302, 303, 307, 308):
+                url = urllib.parse.urljoin(url, response.getheader("Location"))
+                continue
+
+            content_type = response.getheader("Content-Type") or "text/html"
+            charset = response.headers.get_content_charset() or "utf-8"
+            return response.status, content_type, body.decode(charset, errors="replace")
+
+        raise http.client.HTTPException("Too many redirects: %s" % url)
+
+    def get_versions(self, name):
+        """
+        Returns all versions of the project (cached) or None if not found on the index.
+        """
+        project_name = normalize_project_name(name)
+        url = urllib.parse.urljoin(self.index_url, "%s/" % project_name)
+
+        versions = self.cache.get(url)
+        if versions is not None:
+            return versions
+
+        status, content_type, body = self._request(url)
+        if status == 404:
+            log.debug("Project %r not found on %s", project_name, self.index_url)
+            return None
+        if status != 200:
+            raise http.client.HTTPException("HTTP status %i for: %s" % (status, url))
+
+        versions = parse_simple_response(project_name, content_type, body)
+        self.cache.set(url, versions)
+        return versions
+
+    def get_latest(self, name):
+        """
+        Returns the latest release (no pre-release) of the project or None
+        """
+        versions = []
+        for version in self.get_versions(name) or []:
+            try:
+                version = Version(version)
+            except InvalidVersion:
+                continue
+            if not version.is_prerelease:
+                versions.append(version)
+        if versions:
+            return max(versions)
+
+    def _fetch_latest(self, name):
+        """
+        Same as get_latest(), but network errors (e.g.: timeout, DNS) are stored in self.errors
+        """
+        try:
+            return self.get_latest(name)
+        except (http.client.HTTPException, OSError) as err:
+            log.warning("Can't fetch %r from %s: %s", name, self.index_url, err)
+            with self._lock:
+                self.errors[name] = err
+
+    def get_latest_versions(self, names):
+        """
+        Fetch all projects concurrently. Every project is fetched only once.
+
+        :return: dict with project name -> latest version or None (not found or see: self.errors)
+        """
+        names = sorted(set(names))
+        missing = [name for name in names if name not in self.latest and name not in self.errors]
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                self.latest.update(zip(missing, executor.map(self._fetch_latest, missing)))
+        finally:
+            self.close()
+        return dict((name, self.latest.get(name)) for name in names)
+
+    def check(self, pinned):
+        """
+        :param pinned: dict with project name -> pinned version
+        :return: sorted list of (name, pinned version, latest version) of all outdated packages
+        """
+        latest = self.get_latest_versions(pinned)
+
+        outdated = []
+        for name, version in sorted(pinned.items()):
+            try:
+                pinned_version = Version(version)
+            except InvalidVersion:
+                log.warning("Skip %r: invalid version %r", name, version)
+                continue
+            if latest[name] is not None and latest[name] > pinned_version:
+                outdated.append((name, version, str(latest[name])))
+        return outdated
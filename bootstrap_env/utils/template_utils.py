@@ -0,0 +1,313 @@
+"""
+    template utilities
+    ~~~~~~~~~~~~~~~~~~
+
+    Render the boot file template without cookiecutter/jinja.
+
+    The template in 'boot_source' needs only a tiny subset of jinja:
+
+        {{cookiecutter.foo}}
+        {%- if cookiecutter.foo == "y" %}...{%- else %}...{%- endif %}
+        {# comments #}
+
+    incl. the whitespace control with "-". Every other jinja syntax raise
+    UnsupportedTemplate: Use get_boot_file_renderer() to fall back to the
+    cookiecutter based renderer in this case.
+
+    Only stdlib imports here!
+
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+# e.g.: "{{cookiecutter.foo}}", "{%- if ... %}" or "{# comment #}"
+TAG_RE = re.compile(r"(\{\{|\{%|\{#)(-?)(.*?)(-?)(\}\}|%\}|#\})", re.DOTALL)
+CLOSE_TAGS = {"{{": "}}", "{%": "%}", "{#": "#}"}
+
+VARIABLE_RE = re.compile(r"^cookiecutter\.(\w+)$")
+IF_RE = re.compile(r"""^if\s+cookiecutter\.(\w+)\s*(==|!=)\s*(?:"([^"]*)"|'([^']*)')$""")
+
+
+class UnsupportedTemplate(ValueError):
+    """
+    The template uses jinja syntax that is not supported by SimpleTemplate
+    """
+    pass
+
+
+class SimpleTemplate:
+    """
+    Compiled template of the supported jinja subset.
+
+    usage e.g.:
+        template = SimpleTemplate('{{cookiecutter.foo}}')
+        template.render(cookiecutter={"foo": "bar"})
+    """
+    def __init__(self, source):
+        self.nodes = self._compile(source)
+
+    def _tokenize(self, source):
+        """
+        Returns a list of literal strings and (kind, content) tuples of all tags,
+        with applied whitespace control.
+        """
+        tokens = []
+        literal_start = 0
+        lstrip = False # strip the whitespace after the previous tag
+        for match in TAG_RE.finditer(source):
+            opener, strip_before, content, strip_after, closer = match.groups()
+            if CLOSE_TAGS[opener] != closer:
+                raise UnsupportedTemplate("Mismatched tag: %r" % match.group(0))
+
+            literal = source[literal_start:match.start()]
+            if lstrip:
+                literal = literal.lstrip()
+            if strip_before:
+                literal = literal.rstrip()
+            tokens.append(literal)
+            tokens.append((opener, content.strip()))
+            lstrip = bool(strip_after)
+            literal_start = match.end()
+
+        literal = source[literal_start:]
+        if lstrip:
+            literal = literal.lstrip()
+        tokens.append(literal)
+        return tokens
+
+    def _compile(self, source):
+        """
+        :return: list of nodes: literal strings, ("var", name) and
+            ("if", name, equal, value, body nodes, else nodes)
+        """
+        root = []
+        stack = [] # (if node, parent nodes) of all open "if" blocks
+        nodes = root
+        for token in self._tokenize(source):
+            if isinstance(token, str):
+                if token:
+                    nodes.append(token)
+                continue
+
+            kind, content = token
+            if kind == "{#":
+                continue
+
+            if kind == "{{":
+                match = VARIABLE_RE.match(content)
+                if match is None:
+                    raise UnsupportedTemplate("Unsupported expression: %r" % content)
+                nodes.append(("var", match.group(1)))
+                continue
+
+            match = IF_RE.match(content)
+            if match is not None:
+                name, operator, value1, value2 = match.groups()
+                node = ("if", name, operator == "==", value1 if value1 is not None else value2, [], [])
+                nodes.append(node)
+                stack.append((node, nodes))
+                nodes = node[4]
+            elif content == "else" and stack and nodes is stack[-1][0][4]:
+                nodes = stack[-1][0][5]
+            elif content == "endif" and stack:
+                nodes = stack.pop()[1]
+            else:
+                raise UnsupportedTemplate("Unsupported statement: %r" % content)
+
+        if stack:
+            raise UnsupportedTemplate("Missing 'endif'")
+        return root
+
+    def _render(self, nodes, context, parts):
+        for node in nodes:
+            if isinstance(node, str):
+                parts.append(node)
+            elif node[0] == "var":
+                parts.append(str(context[node[1]]))
+            else:
+                _, name, equal, value, body, else_body = node
+                if (context[name] == value) == equal:
+                    self._render(body, context, parts)
+                else:
+                    self._render(else_body, context, parts)
+
+    def render(self, cookiecutter):
+        """
+        :param cookiecutter: the context dict
+        """
+        parts = []
+        try:
+            self._render(self.nodes, cookiecutter, parts)
+        except KeyError as err:
+            raise KeyError("'cookiecutter' has no attribute %s" % err)
+        return "".join(parts)
+
+
+class TemplateCache:
+    """
+    Cache of compiled template files. A file is compiled again if it's changed.
+    """
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """
+        :return: SimpleTemplate of the file
+        """
+        path = Path(path)
+        stat = path.stat()
+        key = str(path.resolve())
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and entry[0] == (stat.st_mtime_ns, stat.st_size):
+            return entry[1]
+
+        with path.open("r", encoding="utf-8") as f:
+            template = SimpleTemplate(f.read())
+        with self._lock:
+            self._cache[key] = ((stat.st_mtime_ns, stat.st_size), template)
+        return template
+
+
+template_cache = TemplateCache()
+
+
+def write_if_changed(path, content, mode=None):
+    """
+    Write the bytes 'content' into 'path' only if the file content is not the same.
+    So the mtime of unchanged files will not be touched.
+
+    :return: "created", "updated" or "unchanged"
+    """
+    path = Path(path)
+    try:
+        with path.open("rb") as f:
+            if f.read() == content:
+                return "unchanged"
+        status = "updated"
+    except FileNotFoundError:
+        status = "created"
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per thread: e.g.: 'generate_bootstraps' renders in a thread pool
+    temp_path = Path("%s.%i.%i.tmp" % (path, os.getpid(), threading.get_ident()))
+    with temp_path.open("wb") as f:
+        f.write(content)
+    if mode is not None:
+        os.chmod(str(temp_path), mode)
+    os.replace(str(temp_path), str(path))
+    return status
+
+
+class SimpleBootFileRenderer:
+    """
+    Render a cookiecutter template (e.g.: 'boot_source') for many contexts
+    without cookiecutter/jinja: The template files are compiled only once.
+    The render() method can be called from many threads.
+
+    Raise UnsupportedTemplate if the template needs more than SimpleTemplate.
+
+    usage e.g.:
+        renderer = SimpleBootFileRenderer(template_dir, extra_context={"_version": "1.0"})
+        renderer.render({"project_name": "foo", ...}, output_dir="/foo/")
+    """
+    def __init__(self, template_dir, extra_context=None):
+        self.template_dir = Path(template_dir)
+        self.extra_context = extra_context or {}
+        self.context_file = Path(self.template_dir, "cookiecutter.json")
+        with self.context_file.open("r") as f:
+            self.context = json.load(f, object_pairs_hook=OrderedDict)
+        self.check_context()
+
+        # list of (compiled path template, compiled content template, file mode)
+        self.templates = []
+        for path in sorted(self.template_dir.glob("*/**/*")):
+            if not path.is_file() or path.suffix in (".pyc", ".pyo"):
+                continue
+            self.templates.append((
+                self.compile(path.relative_to(self.template_dir).as_posix()),
+                self.compile_file(path),
+                path.stat().st_mode & 0o777,
+            ))
+
+    def check_context(self):
+        """
+        Raise UnsupportedTemplate if cookiecutter.json needs cookiecutter.
+        """
+        for key, value in self.context.items():
+            # e.g.: choice variables (list) or dicts
+            if not isinstance(value, str):
+                raise UnsupportedTemplate("Unsupported variable type: %s=%r" % (key, value))
+            if not key.startswith("_") or key.startswith("__"):
+                SimpleTemplate(value)
+
+    def compile(self, source):
+        return SimpleTemplate(source)
+
+    def compile_file(self, path):
+        return template_cache.get(path)
+
+    def get_context(self, values, prompt=None):
+        """
+        Returns the cookiecutter context with the defaults from cookiecutter.json
+
+        :param prompt: optional callable(key, default) -> value to ask the user
+        """
+        context = OrderedDict(self.context)
+        for overwrites in (self.extra_context, values):
+            for key, value in overwrites.items():
+                if key in context: # like cookiecutter: ignore unknown keys
+                    context[key] = value
+
+        result = OrderedDict()
+        for key, value in context.items():
+            if key.startswith("_") and not key.startswith("__"):
+                result[key] = value # private variables are not rendered
+                continue
+
+            # The defaults can refer to previous values, e.g.: "boot_{{cookiecutter.project_name}}"
+            value = SimpleTemplate(str(value)).render(result)
+            if prompt is not None and not key.startswith("__"):
+                value = prompt(key, value)
+            result[key] = value
+        return {"cookiecutter": result}
+
+    def render(self, values, output_dir, prompt=None):
+        """
+        Render all template files with the given context values into 'output_dir'.
+        Files with unchanged content are not written.
+
+        :return: list of (output file path, status: "created", "updated" or "unchanged")
+        """
+        context = self.get_context(values, prompt=prompt)
+        results = []
+        for path_template, template, mode in self.templates:
+            output_path = Path(output_dir, path_template.render(**context))
+            content = template.render(**context).encode("utf-8")
+            results.append((output_path, write_if_changed(output_path, content, mode)))
+        return results
+
+
+def get_boot_file_renderer(template_dir, extra_context=None):
+    """
+    Returns a SimpleBootFileRenderer or the cookiecutter based BootFileRenderer,
+    if the template needs more than the supported jinja subset.
+    """
+    try:
+        return SimpleBootFileRenderer(template_dir, extra_context)
+    except UnsupportedTemplate as err:
+        log.info("Use cookiecutter to render %s: %s", template_dir, err)
+
+    from bootstrap_env.utils.cookiecutter_utils import BootFileRenderer
+    return BootFileRenderer(template_dir, extra_context)
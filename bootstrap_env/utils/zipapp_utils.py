@@ -0,0 +1,66 @@
+"""
+    zipapp utilities
+    ~~~~~~~~~~~~~~~~
+
+    Create a self-contained '.pyz' boot file: The boot file is the __main__.py
+    of the zipapp and all wheels of a wheelhouse are embedded in 'wheels/'.
+    'boot' extracts the wheels and installs everything without network access.
+
+    :copyleft: 2019 by the bootstrap_env team, see AUTHORS for more details.
+    :license: GNU General Public License v3 or later (GPLv3+), see LICENSE for more details.
+"""
+
+import json
+import os
+import zipfile
+from pathlib import Path
+
+# Bootstrap-Env
+from bootstrap_env.boot_bootstrap_env import WHEELHOUSE_INDEX_FILENAME, ZIPAPP_WHEELS_DIR, normalize_project_name
+
+SHEBANG = b"#!/usr/bin/env python3\n"
+
+
+def create_boot_zipapp(boot_file, wheelhouse, output_path, exclude=()):
+    """
+    Create the zipapp 'output_path' from the boot file and the wheels from the wheelhouse index.
+
+    :param exclude: project names of wheels that should not be embedded, e.g.: ("pip",)
+    :return: the embedded wheelhouse index
+    """
+    wheelhouse = Path(wheelhouse)
+    output_path = Path(output_path)
+    with Path(wheelhouse, WHEELHOUSE_INDEX_FILENAME).open("r") as f:
+        index = json.load(f)
+
+    exclude = set(normalize_project_name(name) for name in exclude)
+    index["wheels"] = [
+        wheel for wheel in index["wheels"]
+        if normalize_project_name(wheel["filename"].split("-", 1)[0]) not in exclude
+    ]
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = Path("%s.%i.tmp" % (output_path, os.getpid()))
+    try:
+        with temp_path.open("wb") as f:
+            f.write(SHEBANG)
+            with zipfile.ZipFile(f, "w") as archive:
+                archive.write(str(boot_file), "__main__.py", compress_type=zipfile.ZIP_DEFLATED)
+                for wheel in index["wheels"]:
+                    # Wheels are already compressed: Store them as they are
+                    archive.write(
+                        str(Path(wheelhouse, wheel["filename"])),
+                        "%s/%s" % (ZIPAPP_WHEELS_DIR, wheel["filename"]),
+                        compress_type=zipfile.ZIP_STORED,
+                    )
+                archive.writestr(
+                    "%s/%s" % (ZIPAPP_WHEELS_DIR, WHEELHOUSE_INDEX_FILENAME),
+                    json.dumps(index, indent=4, sort_keys=True),
+                )
+        os.chmod(str(temp_path), 0o755)
+        os.replace(str(temp_path), str(output_path))
+    except BaseException:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+    return index
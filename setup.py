@@ -279,7 +279,11 @@ setup(
     packages=find_packages(),
     include_package_data=True,  # include package data under version control
     # https://python-packaging.readthedocs.io/en/latest/command-line-scripts.html#the-scripts-keyword-argument
-    scripts=["bootstrap_env/boot_bootstrap_env.py", "bootstrap_env/bootstrap_env_admin.py"],
+    scripts=[
+        "bootstrap_env/boot_bootstrap_env.py",
+        "bootstrap_env/bootstrap_env_admin.py",
+        "bootstrap_env/bootstrap_env_admin_client.py",
+    ],
     #
     # We don"t set "install_requires", because the requirements.txt files should be used!
     # Bootstrap works in this way: